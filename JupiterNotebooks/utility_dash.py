@@ -2,6 +2,15 @@ import dash
 from dash import dcc, html, Input, Output
 import plotly.graph_objs as go
 import numpy as np
+from functools import lru_cache
+
+BEHAVIORS = ["Rest", "Forage", "Thermoregulate"]
+CALORIES_PER_GRAM = 1.38
+EXPECTED_PREY_BODY_SIZE = 65
+# Resolution of the precomputed (U_rest, U_thermo) probability tables.
+LUT_SIZE = 501
+M_GRID = np.arange(0, 301, 1.0)
+T_B_GRID = np.arange(5, 40.5, 0.5)
 
 def initialize_max_metabolic_state(max_meals, calories_per_gram, expected_prey_body_size):
     return max_meals * calories_per_gram * expected_prey_body_size
@@ -40,6 +49,108 @@ def sparsemax(x):
     return np.maximum(x - tau, 0)
 
 
+def utility_matrix(M, T_b, T_opt, T_max, max_meals):
+    """
+    Utilities of every state at once, as a rows x behaviors array in
+    BEHAVIORS order. Arguments are scalars or arrays that broadcast together.
+    """
+    M, T_b, T_opt, T_max, max_meals = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in
+                                                             (M, T_b, T_opt, T_max, max_meals)))
+    M_max = initialize_max_metabolic_state(max_meals.ravel(), CALORIES_PER_GRAM, EXPECTED_PREY_BODY_SIZE)
+    U_rest = np.minimum(M.ravel() / M_max, 1.0)
+    U_thermo = np.minimum(np.abs(T_b.ravel() - T_opt.ravel()) / T_max.ravel(), 1.0)
+    return np.column_stack([U_rest, 1 - U_rest, U_thermo])
+
+
+def softmax_rows(U, temperature=1.0):
+    z = (U - U.max(axis=1, keepdims=True)) / temperature
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def sparsemax_rows(U):
+    """
+    Row-wise sparsemax of a rows x behaviors array, same result as sparsemax.
+    """
+    z = U - U.mean(axis=1, keepdims=True)
+    z_sorted = -np.sort(-z, axis=1)
+    z_cumsum = np.cumsum(z_sorted, axis=1)
+    k = np.arange(1, z.shape[1] + 1)
+    support = z_sorted + (1 - z_cumsum) / k > 0
+    k_max = support.sum(axis=1)
+    tau = (np.take_along_axis(z_cumsum, k_max[:, None] - 1, axis=1) - 1) / k_max[:, None]
+    return np.maximum(z - tau, 0)
+
+
+def behavior_probabilities(U, method="sparsemax", temperature=1.0):
+    if method == "softmax":
+        return softmax_rows(U, temperature)
+    return sparsemax_rows(U)
+
+
+@lru_cache(maxsize=4)
+def probability_table(method="sparsemax", temperature=1.0):
+    """
+    Probabilities over a LUT_SIZE x LUT_SIZE grid of (U_rest, U_thermo).
+    Every state maps onto this plane, so one table serves all slider values.
+    """
+    u = np.linspace(0, 1, LUT_SIZE)
+    U_rest, U_thermo = np.meshgrid(u, u, indexing="ij")
+    U = np.column_stack([U_rest.ravel(), 1 - U_rest.ravel(), U_thermo.ravel()])
+    return behavior_probabilities(U, method, temperature).reshape(LUT_SIZE, LUT_SIZE, len(BEHAVIORS))
+
+
+def lookup_probabilities(M, T_b, T_opt, T_max, max_meals, method="sparsemax", temperature=1.0):
+    """
+    rows x behaviors probabilities read from probability_table, for large
+    batches of states (e.g. rattlesnake_db rows) or whole slider grids.
+    States off the table (M < 0, as for starving snakes) are computed
+    directly with behavior_probabilities.
+    """
+    U = utility_matrix(M, T_b, T_opt, T_max, max_meals)
+    on_table = (U[:, 0] >= 0) & (U[:, 0] <= 1) & (U[:, 2] >= 0) & (U[:, 2] <= 1)
+    P = np.empty((len(U), len(BEHAVIORS)))
+    i = np.rint(U[on_table, 0] * (LUT_SIZE - 1)).astype(np.int64)
+    j = np.rint(U[on_table, 2] * (LUT_SIZE - 1)).astype(np.int64)
+    P[on_table] = probability_table(method, temperature)[i, j]
+    P[~on_table] = behavior_probabilities(U[~on_table], method, temperature)
+    return P
+
+
+@lru_cache(maxsize=32)
+def state_grid_table(max_meals, T_opt, T_max, method="sparsemax"):
+    """
+    Probabilities over the M x T_b slider grid for one set of model inputs,
+    shaped (len(T_B_GRID), len(M_GRID), behaviors).
+    """
+    M, T_b = np.meshgrid(M_GRID, T_B_GRID)
+    P = lookup_probabilities(M, T_b, T_opt, T_max, max_meals, method)
+    return P.reshape(len(T_B_GRID), len(M_GRID), len(BEHAVIORS))
+
+
+def compare_to_observed(M, T_b, behavior, T_opt, T_max, max_meals, method="sparsemax"):
+    """
+    Share of observed behaviors (e.g. Metabolic_State, Body_Temperature and
+    Behavior columns of rattlesnake_db) matching the most probable modelled
+    behavior, and the predicted x observed counts, for the three modelled
+    behaviors.
+    """
+    behavior = np.asarray(behavior)
+    modelled = np.isin(behavior, BEHAVIORS)
+    P = lookup_probabilities(np.asarray(M)[modelled], np.asarray(T_b)[modelled], T_opt, T_max, max_meals, method)
+    predicted = np.array(BEHAVIORS)[P.argmax(axis=1)]
+    observed = behavior[modelled]
+    counts = {(p, o): int(np.sum((predicted == p) & (observed == o))) for p in BEHAVIORS for o in BEHAVIORS}
+    agreement = float(np.mean(predicted == observed)) if len(observed) else None
+    return agreement, counts
+
+
+def behavior_colorscale():
+    colors = ['#1f77b4', '#2ca02c', '#d62728']
+    n = len(colors)
+    return [[pos, c] for i, c in enumerate(colors) for pos in (i / n, (i + 1) / n)]
+
+
 app = dash.Dash(__name__)
 
 app.layout = html.Div([
@@ -70,11 +181,19 @@ app.layout = html.Div([
     html.Div(id='T_max-value', style={'margin-bottom': '3px'}),
     dcc.Slider(id='T_max', min=1, max=20, step=0.5, value=5, marks={1:'1',5:'5',10:'10',20:'20'}),
 
+    html.Label("Probability model"),
+    dcc.RadioItems(id='method', options=['sparsemax', 'softmax'], value='sparsemax', inline=True),
+
     html.H3(id='preferred-behavior'),
 
     html.Div([
         dcc.Graph(id='utility-graph', style={'width': '45%', 'margin-right': '10px'}),
         dcc.Graph(id='probability-graph', style={'width': '45%', 'margin-left': '10px'})
+    ], style={'display': 'flex', 'flex-direction': 'row'}),
+
+    html.Div([
+        dcc.Graph(id='state-heatmap', style={'width': '45%', 'margin-right': '10px'}),
+        dcc.Graph(id='phase-diagram', style={'width': '45%', 'margin-left': '10px'})
     ], style={'display': 'flex', 'flex-direction': 'row'})
 ])
 
@@ -86,23 +205,14 @@ app.layout = html.Div([
      Input('M_max', 'value'),
      Input('T_b', 'value'),
      Input('T_opt', 'value'),
-     Input('T_max', 'value')]
+     Input('T_max', 'value'),
+     Input('method', 'value')]
 )
-def update_graph(M, max_meals, T_b, T_opt, T_max, temperature=1.0):
-    # Calculate maximum metabolic state
-    M_max = initialize_max_metabolic_state(max_meals=max_meals, calories_per_gram=1.38, expected_prey_body_size=65)
-    db = thermal_accuracy_calculator(T_b, T_opt)
-
-    U_rest = scale_value(M, M_max)
-    U_forage = 1 - U_rest
-    U_thermo = scale_value(db, T_max)
-
-    utilities = [U_rest, U_forage, U_thermo]
-    labels = ["Rest", "Forage", "Thermoregulate"]
-
-    # Compute behavior probabilities with softmax
-    #behavior_probs = softmax(utilities, temperature=temperature)
-    behavior_probs = sparsemax(utilities)
+def update_graph(M, max_meals, T_b, T_opt, T_max, method='sparsemax', temperature=1.0):
+    utilities = utility_matrix(M, T_b, T_opt, T_max, max_meals)
+    behavior_probs = behavior_probabilities(utilities, method, temperature)[0]
+    utilities = utilities[0]
+    labels = BEHAVIORS
 
     # Randomly choose preferred behavior based on probabilities
     preferred_idx = np.random.choice(len(labels), p=behavior_probs)
@@ -124,6 +234,46 @@ def update_graph(M, max_meals, T_b, T_opt, T_max, temperature=1.0):
 
     return fig_utilities, fig_probs, f"Preferred Behavior: {preferred} (P={behavior_probs[preferred_idx]:.2f})"
 
+@app.callback(
+    [Output('state-heatmap', 'figure'),
+     Output('phase-diagram', 'figure')],
+    [Input('M', 'value'),
+     Input('M_max', 'value'),
+     Input('T_b', 'value'),
+     Input('T_opt', 'value'),
+     Input('T_max', 'value'),
+     Input('method', 'value')]
+)
+def update_maps(M, max_meals, T_b, T_opt, T_max, method='sparsemax'):
+    # The M x T_b grid only changes with the model inputs; M and T_b just move the marker.
+    P = state_grid_table(max_meals, T_opt, T_max, method)
+    fig_states = go.Figure(data=[
+        go.Heatmap(x=M_GRID, y=T_B_GRID, z=P.argmax(axis=2), zmin=-0.5, zmax=len(BEHAVIORS) - 0.5,
+                   colorscale=behavior_colorscale(), customdata=P.max(axis=2),
+                   colorbar=dict(tickvals=list(range(len(BEHAVIORS))), ticktext=BEHAVIORS),
+                   hovertemplate='M=%{x}<br>T_b=%{y}<br>P=%{customdata:.2f}<extra></extra>'),
+        go.Scatter(x=[M], y=[T_b], mode='markers', marker=dict(color='black', size=12, symbol='x'),
+                   showlegend=False)
+    ])
+    fig_states.update_layout(xaxis_title='Metabolic state (M)', yaxis_title='Body temperature (T_b)',
+                             title="Most probable behavior by state")
+
+    table = probability_table(method)
+    u = np.linspace(0, 1, LUT_SIZE)
+    current = utility_matrix(M, T_b, T_opt, T_max, max_meals)[0]
+    fig_phase = go.Figure(data=[
+        go.Heatmap(x=u, y=u, z=table.argmax(axis=2).T, zmin=-0.5, zmax=len(BEHAVIORS) - 0.5,
+                   colorscale=behavior_colorscale(), showscale=False),
+        go.Contour(x=u, y=u, z=table.max(axis=2).T, contours_coloring='none', showscale=False,
+                   line=dict(color='white', width=1)),
+        go.Scatter(x=[current[0]], y=[current[2]], mode='markers',
+                   marker=dict(color='black', size=12, symbol='x'), showlegend=False)
+    ])
+    fig_phase.update_layout(xaxis_title='U_rest = min(M / M_max, 1)',
+                            yaxis_title='U_thermo = min(|T_b - T_opt| / T_max, 1)',
+                            title="Phase diagram of the behavior model")
+    return fig_states, fig_phase
+
 # Single callback to update all slider value displays
 @app.callback(
     [Output('M-value', 'children'),
@@ -0,0 +1,201 @@
+#!/usr/bin/python
+import meta_utilz
+
+SPANS_TABLE = "agent_spans"
+EVENTS_TABLE = "agent_events"
+VIEW = "agent_lifecycle"
+
+
+class AgentLifecycle:
+    '''
+    Per-agent index of the rattlesnakes, keyed by (site, experiment,
+    sim_id, Agent_id):
+        agent_spans      first and last Time_Step of the agent's hourly rows,
+                         its last step alive and its number of rows
+        agent_events     birth and death Time_Step and cause of death from
+                         the BirthDeath events, with Agent_id as INTEGER
+        agent_lifecycle  view joining the two
+    Both tables are refreshed from each committed ingest batch, so no pass
+    over the hourly table is needed. An agent's span bounds where its rows
+    sit in the table: a lookup filtering on the sim keys and the span's
+    Time_Step range lets zone maps skip the other row groups.
+    '''
+    def __init__(self, con, site_column="Study_Site"):
+        self.con = con
+        self.site_column = site_column
+
+    def keys(self):
+        return [self.site_column, "Experiment", "sim_id", "Agent_id"]
+
+    def table_names(self, spans=True, events=True):
+        return [table for table, selected in ((SPANS_TABLE, spans), (EVENTS_TABLE, events)) if selected]
+
+    def key_columns(self):
+        return [f"{self.site_column} TEXT", "Experiment TEXT", "sim_id INTEGER", "Agent_id INTEGER"]
+
+    def create_tables(self, spans=True, events=True, replace=True):
+        """
+        Create both tables if missing; with replace, recreate the spans
+        and/or events table empty.
+        """
+        tables = [
+            (SPANS_TABLE, spans, ["first_step INTEGER", "last_step INTEGER", "last_alive_step INTEGER",
+                                  "n_rows BIGINT"]),
+            (EVENTS_TABLE, events, ["birth_step INTEGER", "death_step INTEGER", "cause_of_death TEXT"]),
+        ]
+        for table, selected, columns in tables:
+            clause = "CREATE OR REPLACE TABLE" if replace and selected else "CREATE TABLE IF NOT EXISTS"
+            self.con.execute(f"{clause} {table} ({', '.join(self.key_columns() + columns)});")
+        self.create_view()
+        return
+
+    def tables_exist(self):
+        names = {r[0] for r in self.con.execute("SELECT table_name FROM duckdb_tables()").fetchall()}
+        return SPANS_TABLE in names and EVENTS_TABLE in names
+
+    def create_view(self, temp=False):
+        keys = ", ".join(self.keys())
+        self.con.execute(f"""
+            CREATE OR REPLACE {"TEMP " if temp else ""}VIEW {VIEW} AS
+            SELECT {keys},
+                COALESCE(e.birth_step, s.first_step) AS birth_step,
+                e.death_step,
+                e.cause_of_death,
+                s.first_step, s.last_step, s.last_alive_step, s.n_rows,
+                e.birth_step IS NOT NULL AS born_in_sim,
+                e.death_step IS NOT NULL AS died
+            FROM {SPANS_TABLE} s
+            FULL OUTER JOIN {EVENTS_TABLE} e USING ({keys})
+        """)
+        return
+
+    def spans_sql(self, source, site_column):
+        return f"""
+            SELECT {site_column} AS {self.site_column}, Experiment, sim_id, Agent_id,
+                MIN(Time_Step) AS first_step,
+                MAX(Time_Step) AS last_step,
+                MAX(Time_Step) FILTER (WHERE Alive) AS last_alive_step,
+                COUNT(*) AS n_rows
+            FROM {source}
+            GROUP BY ALL
+        """
+
+    def events_sql(self, source, site_column):
+        return f"""
+            SELECT {site_column} AS {self.site_column}, Experiment, sim_id,
+                TRY_CAST(Agent_id AS INTEGER) AS Agent_id,
+                MIN(Time_Step) FILTER (WHERE Event_Type = 'Birth') AS birth_step,
+                MIN(Time_Step) FILTER (WHERE Event_Type = 'Death') AS death_step,
+                arg_min(Cause_Of_Death, Time_Step) FILTER (WHERE Event_Type = 'Death') AS cause_of_death
+            FROM {source}
+            WHERE Species = 'Rattlesnake' AND TRY_CAST(Agent_id AS INTEGER) IS NOT NULL
+            GROUP BY ALL
+        """
+
+    def replace_rows(self, table, select_sql, csv_list):
+        self.con.execute(f"""
+            DELETE FROM {table} t
+            USING ({meta_utilz.path_keys_sql(csv_list)}) k
+            WHERE t.{self.site_column} = k.site
+              AND t.Experiment = k.experiment
+              AND t.sim_id = k.sim_id
+        """)
+        self.con.execute(f"INSERT INTO {table} {select_sql}")
+        return
+
+    def span_refresher(self, site_column="Study_Site"):
+        """
+        on_commit hook replacing the spans of the sims behind a Rattlesnake batch.
+        """
+        def refresh(staging_table, csv_list):
+            if csv_list:
+                self.replace_rows(SPANS_TABLE, self.spans_sql(staging_table, site_column), csv_list)
+        return refresh
+
+    def event_refresher(self, site_column="Site_Name"):
+        """
+        on_commit hook replacing the events of the sims behind a BirthDeath batch.
+        """
+        def refresh(staging_table, csv_list):
+            if csv_list:
+                self.replace_rows(EVENTS_TABLE, self.events_sql(staging_table, site_column), csv_list)
+        return refresh
+
+    def rebuild(self, rattlesnake_table="rattlesnake_db", birthdeath_table="birthdeath_db"):
+        """
+        Recompute the index from the full tables; pass None to leave a part as is.
+        """
+        self.create_tables(spans=bool(rattlesnake_table), events=bool(birthdeath_table), replace=True)
+        if rattlesnake_table:
+            self.con.execute(f"INSERT INTO {SPANS_TABLE} {self.spans_sql(rattlesnake_table, 'Study_Site')}")
+        if birthdeath_table:
+            self.con.execute(f"INSERT INTO {EVENTS_TABLE} {self.events_sql(birthdeath_table, 'Site_Name')}")
+        return
+
+    def history_sql(self, agent_id, site=None, experiment=None, sim_id=None, table="rattlesnake_db"):
+        """
+        All rows of one agent in table (in every sim matching the optional
+        keys), restricted to the sims and Time_Step spans in the index.
+        """
+        clauses, params = ["Agent_id = ?"], [int(agent_id)]
+        for column, value in ((self.site_column, site), ("Experiment", experiment), ("sim_id", sim_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(str(value) if column != "sim_id" else int(value))
+        spans = self.con.execute(f"""
+            SELECT {self.site_column}, Experiment, sim_id, first_step, last_step
+            FROM {SPANS_TABLE}
+            WHERE {" AND ".join(clauses)}
+            ORDER BY ALL
+        """, params).fetchall()
+        if not spans:
+            return None
+        where = " OR ".join(
+            f"({self.site_column} = '{s}' AND Experiment = '{e}' AND sim_id = {sim} "
+            f"AND Time_Step BETWEEN {first} AND {last})"
+            for s, e, sim, first, last in spans)
+        return f"""
+            SELECT * FROM {table}
+            WHERE Agent_id = {int(agent_id)} AND ({where})
+            ORDER BY {self.site_column}, Experiment, sim_id, Time_Step
+        """
+
+    def survival_sql(self, where=None, by=None):
+        """
+        Kaplan-Meier survival of the agents matching `where` (a predicate
+        on agent_lifecycle) by age in time steps, per group of `by` columns
+        (default site and experiment). Agents alive at their last row are
+        censored there.
+        """
+        by = list(by or [self.site_column, "Experiment"])
+        keys = ", ".join(by)
+        where_sql = f"WHERE {where}" if where else ""
+        return f"""
+            WITH agents AS (
+                SELECT {keys},
+                    COALESCE(death_step, last_alive_step, last_step) - birth_step AS age,
+                    died
+                FROM {VIEW}
+                {where_sql}
+            ),
+            ages AS (
+                SELECT {keys}, age,
+                    COUNT(*) FILTER (WHERE died) AS deaths,
+                    COUNT(*) AS leaving
+                FROM agents
+                WHERE age IS NOT NULL
+                GROUP BY ALL
+            ),
+            at_risk AS (
+                SELECT *,
+                    CAST(SUM(leaving) OVER (PARTITION BY {keys} ORDER BY age DESC) AS BIGINT) AS n_at_risk
+                FROM ages
+            )
+            SELECT {keys}, age, n_at_risk, deaths,
+                CASE WHEN bool_or(deaths = n_at_risk) OVER w THEN 0.0
+                     ELSE exp(SUM(CASE WHEN deaths < n_at_risk THEN ln(1 - deaths / n_at_risk) ELSE 0 END) OVER w)
+                END AS survival
+            FROM at_risk
+            WINDOW w AS (PARTITION BY {keys} ORDER BY age)
+            ORDER BY {keys}, age
+        """
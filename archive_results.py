@@ -0,0 +1,146 @@
+#!/usr/bin/python
+import argparse
+import os
+import pathlib as pl
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import duckdb
+import meta_utilz
+import schemas
+from file_index import FileIndex
+from ingest_manifest import file_hash
+
+
+def read_sql(path, schema):
+    """
+    Scan of one csv output: with the declared column types when its type is
+    registered in schemas.py, otherwise with sniffed types.
+    """
+    files = meta_utilz.sql_file_list([path])
+    if schema is None:
+        return f"read_csv_auto({files})"
+    return (f"read_csv({files}, columns={schema.csv_columns_sql()}, header=true, auto_detect=false, "
+            f"delim=',', quote='\"', strict_mode=true)")
+
+
+def fingerprint(con, source):
+    """
+    Row count and an order-independent checksum of every row of source. The
+    row hashes are summed rather than XORed, so a duplicated row standing in
+    for another does not cancel out.
+    """
+    return con.execute(f"SELECT COUNT(*), COALESCE(SUM(CAST(hash(t) AS HUGEINT)), 0) FROM {source} t").fetchone()
+
+
+def convert_file(con, csv_path, compression="zstd", delete=True):
+    """
+    Convert one csv output to <csv_type>.parquet next to it, verify that the
+    parquet holds the same rows, then delete the csv if asked. The parquet
+    keeps the csv column names and records the csv's blake2b hash.
+    Returns a dict describing the outcome.
+    """
+    csv_path = pl.Path(csv_path)
+    csv_type = meta_utilz.split_output_name(csv_path.name)[0]
+    out = csv_path.with_name(f"{csv_type}.parquet")
+    tmp = out.with_name(out.name + ".tmp")
+    report = {"path": str(csv_path), "parquet": str(out), "csv_bytes": csv_path.stat().st_size}
+    schema = schemas.REGISTRY.get(csv_type)
+    if schema is not None:
+        header = con.execute(f"""
+            SELECT * FROM read_csv({meta_utilz.sql_file_list([csv_path])}, header=false, all_varchar=true,
+                                   delim=',')
+            LIMIT 1
+        """).fetchone()
+        if header is None or list(header) != schema.csv_names:
+            return dict(report, status="skipped", error=f"header does not match the {csv_type} schema")
+    source = read_sql(csv_path, schema)
+    try:
+        source_hash = file_hash(csv_path)
+        con.execute(f"""
+            COPY (SELECT * FROM {source}) TO '{tmp}' (
+                FORMAT parquet,
+                COMPRESSION {compression},
+                KV_METADATA {{source_file: '{csv_path.name}', source_blake2b: '{source_hash}'}}
+            )
+        """)
+        expected = fingerprint(con, source)
+        written = fingerprint(con, f"read_parquet('{tmp}')")
+        if expected != written:
+            raise RuntimeError(f"verification failed: csv {expected} vs parquet {written}")
+        if file_hash(csv_path) != source_hash:
+            raise RuntimeError("csv changed during conversion")
+    except Exception as e:
+        tmp.unlink(missing_ok=True)
+        return dict(report, status="failed", error=str(e))
+    os.replace(tmp, out)
+    if delete:
+        csv_path.unlink()
+    return dict(report, status="converted", rows=expected[0], parquet_bytes=out.stat().st_size)
+
+
+def convert_replicate(rep_dir, compression="zstd", delete=True):
+    """
+    Worker: convert every csv output (plain or compressed) of one rep folder.
+    """
+    con = duckdb.connect(database=":memory:")
+    con.execute("SET threads TO 1")
+    reports = []
+    with os.scandir(rep_dir) as it:
+        names = sorted(e.name for e in it if e.is_file())
+    for name in names:
+        csv_type, suffix = meta_utilz.split_output_name(name)
+        if csv_type is None or suffix == ".parquet":
+            continue
+        reports.append(convert_file(con, pl.Path(rep_dir) / name, compression, delete))
+    con.close()
+    return reports
+
+
+class ResultsArchiver:
+    '''
+    Converts the csv outputs of every replicate under parent_directory to
+    compressed parquet in place, one process per replicate folder. A csv is
+    only deleted after its parquet has been read back with the same row
+    count and row checksum. The scanner and Collate classes read the
+    parquet files directly afterwards.
+    '''
+    def __init__(self, parent_directory, site_names, workers=None, compression="zstd"):
+        self.index = FileIndex(parent_directory, site_names)
+        self.workers = workers or os.cpu_count()
+        self.compression = compression
+
+    def replicate_dirs(self):
+        self.index.scan()
+        return sorted({os.path.dirname(p) for p in self.index.files["path"].to_list()
+                       if not meta_utilz.is_parquet(p)})
+
+    def run(self, delete=True):
+        """
+        Convert all replicates and return the per-file reports.
+        """
+        rep_dirs = self.replicate_dirs()
+        print(f"[INFO] Archiving {len(rep_dirs)} replicate folders on {self.workers} workers")
+        reports = []
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(convert_replicate, d, self.compression, delete) for d in rep_dirs]
+            for future in as_completed(futures):
+                for report in future.result():
+                    if report["status"] != "converted":
+                        print(f"[WARN] Did not archive {report['path']}: {report['error']}")
+                    reports.append(report)
+        converted = [r for r in reports if r["status"] == "converted"]
+        csv_bytes = sum(r["csv_bytes"] for r in converted)
+        parquet_bytes = sum(r["parquet_bytes"] for r in converted)
+        print(f"[INFO] Archived {len(converted)}/{len(reports)} files: "
+              f"{csv_bytes / 1e6:.1f} MB -> {parquet_bytes / 1e6:.1f} MB")
+        return reports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert replicate csv outputs to compressed parquet in place.")
+    parser.add_argument("parent_directory")
+    parser.add_argument("--sites", nargs="+", default=["Texas", "Nebraska", "Canada"])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--compression", default="zstd")
+    parser.add_argument("--keep-csv", action="store_true", help="verify but keep the original csvs")
+    args = parser.parse_args()
+    ResultsArchiver(args.parent_directory, args.sites, args.workers, args.compression).run(delete=not args.keep_csv)
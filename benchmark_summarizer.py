@@ -0,0 +1,149 @@
+#!/usr/bin/python
+import argparse
+import json
+import os
+import pathlib as pl
+import shutil
+import tempfile
+import time
+import main
+import synthetic_results
+from file_index import FileIndex
+
+# The hourly daily-average query main.py used to run before the rollups.
+HOURLY_DAILY_SUMMARY = """
+    SELECT Study_Site, Experiment, Year, Month, Day,
+        AVG(Rattlesnakes) AS Avg_Rattlesnakes,
+        AVG(Krats) AS Avg_Krats,
+        AVG(Rattlesnakes_Density) AS Avg_Rattlesnakes_Density,
+        AVG(Krats_Density) AS Avg_Krats_Density,
+        AVG(Rattlesnakes_Active) AS Avg_Rattlesnakes_Active,
+        AVG(Krats_Active) AS Avg_Krats_Active,
+        AVG(Foraging) AS Avg_Foraging,
+        AVG(Thermoregulating) AS Avg_Thermoregulating,
+        AVG(Resting) AS Avg_Resting,
+        AVG(Searching) AS Avg_Searching,
+        AVG(Brumating) AS Avg_Brumating,
+        AVG(Snakes_in_Burrow) AS Avg_Snakes_in_Burrow,
+        AVG(Snakes_in_Open) AS Avg_Snakes_in_Open,
+        AVG(mean_thermal_quality) AS Avg_Mean_Thermal_Quality,
+        AVG(mean_thermal_accuracy) AS Avg_Mean_Thermal_Accuracy,
+        SUM(count_interactions) AS Total_Interactions,
+        SUM(count_successful_interactions) AS Total_Successful_Interactions,
+        SUM(mean_thermal_accuracy * Rattlesnakes) / SUM(Rattlesnakes) AS Weighted_Mean_Thermal_Accuracy,
+        SUM(mean_thermal_quality * Rattlesnakes) / SUM(Rattlesnakes) AS Weighted_Mean_Thermal_Quality,
+        COUNT(DISTINCT Sim_ID) AS Num_Sims
+    FROM model_db
+    GROUP BY Study_Site, Experiment, Year, Month, Day
+"""
+
+# The death-cause summary from the commented-out block in main.py.
+DEATH_CAUSE_SUMMARY = """
+    SELECT Site_Name, Experiment, Cause_Of_Death, Time_Step, Species,
+        AVG(Mass) AS mean_mass,
+        COUNT(DISTINCT Agent_id) AS num_agents,
+        AVG(Age) AS mean_age,
+        AVG(Body_Temperature) AS mean_body_temp
+    FROM birthdeath_db
+    WHERE Event_Type = 'Death' AND Species = 'Rattlesnake'
+    GROUP BY Site_Name, Experiment, Cause_Of_Death, Time_Step, Species
+"""
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - start
+
+
+def tree_bytes(paths):
+    return sum(os.path.getsize(p) for p in paths)
+
+
+def run(results_dir, site_names, work_dir, workers=1, repeats=3):
+    """
+    Benchmark scanning, per-table ingest and the standard summaries over an
+    existing results tree. Returns a dict of measurements.
+    """
+    work_dir = pl.Path(work_dir)
+    db_path = work_dir / "bench.duckdb"
+    for stale in work_dir.glob("bench*"):
+        stale.unlink()
+    report = {"results_dir": str(results_dir), "workers": workers}
+
+    index = FileIndex(results_dir, site_names, cache_path=work_dir / "bench_index.parquet")
+    _, report["scan_cold_s"] = timed(index.scan)
+    _, report["scan_cached_s"] = timed(index.scan)
+    report["files"] = index.files.height
+
+    simsum = main.SimSummarizer(results_dir, site_names, db_path=db_path,
+                                index_cache=work_dir / "bench_index.parquet")
+    report["tables"] = {}
+    for name, flags in [("model_db", dict(model=True, rattlesnake=False, bd=False)),
+                        ("rattlesnake_db", dict(model=False, rattlesnake=True, bd=False)),
+                        ("birthdeath_db", dict(model=False, rattlesnake=False, bd=True))]:
+        csv_key = {"model_db": "model", "rattlesnake_db": "rattlesnake", "birthdeath_db": "birthdeath"}[name]
+        _, seconds = timed(simsum.initialize_tables, workers=workers, **flags)
+        rows = simsum.con.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+        nbytes = tree_bytes(simsum.results_paths[csv_key])
+        report["tables"][name] = {
+            "files": len(simsum.results_paths[csv_key]),
+            "rows": rows,
+            "seconds": seconds,
+            "rows_per_s": rows / seconds if seconds else None,
+            "mb_per_s": nbytes / 1e6 / seconds if seconds else None,
+        }
+    simsum.con.execute("CHECKPOINT")
+    report["db_bytes"] = os.path.getsize(db_path)
+
+    queries = {
+        "daily_summary_hourly": lambda: simsum.query_sim_table(HOURLY_DAILY_SUMMARY),
+        "daily_summary_rollup": lambda: simsum.summarize_model("daily"),
+        "monthly_summary_rollup": lambda: simsum.summarize_model("monthly"),
+        "death_cause_summary": lambda: simsum.query_sim_table(DEATH_CAUSE_SUMMARY),
+    }
+    report["queries_s"] = {}
+    for name, fn in queries.items():
+        report["queries_s"][name] = min(timed(fn)[1] for _ in range(repeats))
+    simsum.con.close()
+    return report
+
+
+def print_report(report):
+    print(f"scan: cold {report['scan_cold_s']:.3f}s, cached {report['scan_cached_s']:.3f}s "
+          f"({report['files']} files)")
+    for name, t in report["tables"].items():
+        print(f"ingest {name}: {t['files']} files, {t['rows']} rows in {t['seconds']:.2f}s "
+              f"= {t['rows_per_s']:,.0f} rows/s, {t['mb_per_s']:.1f} MB/s")
+    print(f"database size: {report['db_bytes'] / 1e6:.1f} MB")
+    for name, seconds in report["queries_s"].items():
+        print(f"query {name}: {seconds * 1000:.1f} ms")
+    return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark scanning, ingest and summary queries.")
+    parser.add_argument("--results-dir", help="existing results tree; a synthetic one is generated if omitted")
+    parser.add_argument("--sites", nargs="+", default=["Texas", "Nebraska", "Canada"])
+    parser.add_argument("--experiments", nargs="+", default=["Current", "1", "2"])
+    parser.add_argument("--replicates", type=int, default=10)
+    parser.add_argument("--years", type=float, default=1)
+    parser.add_argument("--agents", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", help="also write the measurements to this file")
+    args = parser.parse_args()
+
+    work_dir = pl.Path(tempfile.mkdtemp(prefix="thermasim_bench_"))
+    try:
+        results_dir = args.results_dir
+        if results_dir is None:
+            results_dir = work_dir / "results"
+            synthetic_results.generate(results_dir, args.sites, args.experiments,
+                                       args.replicates, args.years, args.agents)
+        report = run(results_dir, args.sites, work_dir, workers=args.workers, repeats=args.repeats)
+        print_report(report)
+        if args.json:
+            pl.Path(args.json).write_text(json.dumps(report, indent=2))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,140 @@
+#!/usr/bin/python
+import datetime as dt
+from schemas import CALENDAR_FIELDS
+
+
+class CalendarDimension:
+    '''
+    The simulation calendar: Hour, Day, Month and Year of every
+    (site, Time_Step). Ingest with calendar=True stores the fact tables
+    without these fields and exposes model_db, rattlesnake_db and
+    birthdeath_db as views joining them back in, with the original column
+    order. Each ingest batch adds the time steps not seen before and is
+    rejected if it disagrees with the stored calendar, so all experiments
+    and replicates of a site must share one clock.
+    Date ranges translate into per-site Time_Step ranges (step_filter),
+    which the fact tables' zone maps can prune on.
+    '''
+    def __init__(self, con, table_name="calendar"):
+        self.con = con
+        self.table_name = table_name
+
+    def create_table(self, replace=False):
+        clause = "CREATE OR REPLACE TABLE" if replace else "CREATE TABLE IF NOT EXISTS"
+        self.con.execute(f"""
+        {clause} {self.table_name} (
+            Study_Site TEXT,
+            Time_Step INTEGER,
+            {", ".join(f"{field} INTEGER" for field in CALENDAR_FIELDS)},
+            PRIMARY KEY (Study_Site, Time_Step)
+        );
+        """)
+        return
+
+    def exists(self):
+        return self.con.execute(
+            "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = ?", [self.table_name]).fetchone()[0] > 0
+
+    def object_type(self, name):
+        row = self.con.execute("""
+            SELECT 'table' FROM duckdb_tables() WHERE table_name = ? AND database_name = current_database()
+            UNION ALL
+            SELECT 'view' FROM duckdb_views() WHERE view_name = ? AND database_name = current_database()
+        """, [name, name]).fetchone()
+        return row[0] if row else None
+
+    def absorb(self, source, site_column):
+        """
+        Add the time steps of source (a staging table with the full layout)
+        missing from the calendar, after checking the others agree with it.
+        """
+        fields = ", ".join(CALENDAR_FIELDS)
+        steps = f"SELECT DISTINCT {site_column} AS Study_Site, Time_Step, {fields} FROM {source}"
+        differs = " OR ".join(f"s.{f} IS DISTINCT FROM c.{f}" for f in CALENDAR_FIELDS)
+        conflict = self.con.execute(f"""
+            SELECT s.Study_Site, s.Time_Step
+            FROM ({steps}) s JOIN {self.table_name} c USING (Study_Site, Time_Step)
+            WHERE {differs}
+            UNION ALL
+            SELECT Study_Site, Time_Step FROM ({steps}) GROUP BY ALL HAVING COUNT(*) > 1
+            LIMIT 1
+        """).fetchone()
+        if conflict:
+            raise ValueError(f"{source}: Time_Step {conflict[1]} of {conflict[0]} does not match the calendar "
+                             f"of the site's other outputs")
+        self.con.execute(f"INSERT OR IGNORE INTO {self.table_name} {steps}")
+        return
+
+    def prepare(self, collator, incremental=False):
+        """
+        Make the collator's table name fit its layout before loading. With
+        calendar=True a table left under the view name by an earlier ingest
+        is split into the fact table and the calendar when incremental, and
+        dropped otherwise; returns True if it was split. Without calendar
+        the view of an earlier calendar ingest is dropped.
+        """
+        existing = self.object_type(collator.view_name)
+        if not collator.calendar:
+            if existing == "view":
+                if incremental:
+                    raise ValueError(f"{collator.view_name} was ingested with calendar=True; "
+                                     f"pass calendar=True or incremental=False")
+                self.con.execute(f"DROP VIEW {collator.view_name}")
+            return False
+        if existing != "table":
+            return False
+        if incremental:
+            self.absorb(collator.view_name, collator.site_column)
+            self.con.execute(f"""
+                CREATE OR REPLACE TABLE {collator.table_name} AS
+                SELECT {", ".join(collator.stored_columns())} FROM {collator.view_name}
+            """)
+            print(f"[INFO] Split {collator.view_name} into {collator.table_name} and {self.table_name}")
+        self.con.execute(f"DROP TABLE {collator.view_name}")
+        return incremental
+
+    def create_view(self, schema, temp=False):
+        """
+        (Re)create the schema's table_name as a view over its fact table and
+        the calendar.
+        """
+        columns = [f"c.{name}" if name in CALENDAR_FIELDS else f"f.{name}"
+                   for name, _, _ in schema.table_columns]
+        self.con.execute(f"""
+            CREATE OR REPLACE {"TEMP " if temp else ""}VIEW {schema.table_name} AS
+            SELECT {", ".join(columns)}
+            FROM {schema.fact_table} f
+            JOIN {self.table_name} c ON c.Study_Site = f.{schema.site_column} AND c.Time_Step = f.Time_Step
+        """)
+        return
+
+    def step_ranges(self, start=None, end=None):
+        """
+        {site: (first, last Time_Step)} of the days from start to end, inclusive.
+        """
+        clauses, params = [], []
+        if start:
+            clauses.append("make_date(Year, Month, Day) >= ?")
+            params.append(dt.date.fromisoformat(str(start)[:10]))
+        if end:
+            clauses.append("make_date(Year, Month, Day) <= ?")
+            params.append(dt.date.fromisoformat(str(end)[:10]))
+        rows = self.con.execute(f"""
+            SELECT Study_Site, MIN(Time_Step), MAX(Time_Step)
+            FROM {self.table_name}
+            WHERE {" AND ".join(clauses) or "true"}
+            GROUP BY Study_Site
+        """, params).fetchall()
+        return {site: (first, last) for site, first, last in rows}
+
+    def step_filter(self, site_column="Study_Site", start=None, end=None):
+        """
+        SQL predicate selecting the rows dated start to end as Time_Step
+        ranges per site.
+        """
+        ranges = self.step_ranges(start, end)
+        if not ranges:
+            return "false"
+        return "(" + " OR ".join(
+            f"({site_column} = '{site}' AND Time_Step BETWEEN {first} AND {last})"
+            for site, (first, last) in sorted(ranges.items())) + ")"
@@ -0,0 +1,197 @@
+#!/usr/bin/python
+import pathlib as pl
+import time
+import pyarrow.parquet as pq
+import meta_utilz
+
+
+class CollateBase:
+    '''
+    Shared ingest logic for the Collate* table builders.
+
+    Subclasses set `schema` to their schemas.OutputSchema, which drives both
+    the table DDL and the csv reader. With declared=True (default) files are
+    read with the declared column types and no sniffing; strict=True also
+    rejects files whose header does not match the declared columns.
+    With calendar=True the rows are stored in the schema's fact table
+    without the calendar fields, and view_name is a view rejoining them
+    (see calendar_dim); rows must then be loaded through a staging table
+    with the full layout.
+    '''
+    schema = None
+    bulk_batch_size = 500
+
+    def __init__(self, path_db, con, declared=True, strict=False, calendar=False):
+        self.path_db = path_db
+        self.con = con
+        self.declared = declared
+        self.strict = strict
+        self.calendar = calendar
+        self.errors = {}
+        self.file_seconds = {}
+        self.view_name = self.schema.table_name
+        self.table_name = self.schema.fact_table if calendar else self.schema.table_name
+        self.site_column = self.schema.site_column
+
+    def reader_options(self):
+        return {"declared": self.declared, "strict": self.strict}
+
+    def create_clause(self, replace=True):
+        return "CREATE OR REPLACE TABLE" if replace else "CREATE TABLE IF NOT EXISTS"
+
+    def stored_columns(self):
+        columns = self.schema.fact_columns if self.calendar else self.schema.table_columns
+        return [name for name, _, _ in columns]
+
+    def create_table(self, replace=True):
+        columns = self.schema.fact_columns if self.calendar else None
+        self.con.execute(self.schema.ddl(self.create_clause(replace), self.table_name, columns))
+        return
+
+    def select_sql(self, source):
+        return f"""
+            SELECT
+                {self.schema.select_list()}
+            FROM {source}
+        """
+
+    def csv_source(self, csv_list):
+        """
+        Table expression reading csv_list. Plain and .gz/.zst compressed csvs
+        go through read_csv; archived .parquet outputs, which keep the csv
+        columns, through read_parquet.
+        """
+        parquet = [f for f in csv_list if meta_utilz.is_parquet(f)]
+        csvs = [f for f in csv_list if not meta_utilz.is_parquet(f)]
+        sources = []
+        if csvs:
+            files = meta_utilz.sql_file_list(csvs)
+            if not self.declared:
+                sources.append(f"read_csv_auto({files}, filename=true)")
+            else:
+                strict = "true" if self.strict else "false"
+                sources.append(f"read_csv({files}, columns={self.schema.csv_columns_sql()}, header=true, "
+                               f"auto_detect=false, delim=',', quote='\"', filename=true, strict_mode={strict})")
+        if parquet:
+            sources.append(f"read_parquet({meta_utilz.sql_file_list(parquet)}, filename=true)")
+        if len(sources) == 1:
+            return sources[0]
+        return "(" + " UNION ALL BY NAME ".join(f"SELECT * FROM {s}" for s in sources) + ")"
+
+    def file_columns(self, path):
+        """
+        Column names of an output file, read from its header or parquet schema.
+        """
+        name = str(path)
+        if meta_utilz.is_parquet(name):
+            return pq.read_schema(name).names
+        if name.endswith('.csv'):
+            with open(name, 'r', newline='') as f:
+                return f.readline().strip().split(',')
+        row = self.con.execute(f"""
+            SELECT * FROM read_csv({meta_utilz.sql_file_list([name])}, header=false, all_varchar=true, delim=',')
+            LIMIT 1
+        """).fetchone()
+        return list(row) if row else []
+
+    def header_matches(self, csv_path):
+        return self.file_columns(csv_path) == self.schema.csv_names
+
+    def split_by_header(self, csv_list):
+        good, bad = [], []
+        for file in csv_list:
+            try:
+                (good if self.header_matches(file) else bad).append(file)
+            except Exception:
+                bad.append(file)
+        for file in bad:
+            print(f"[WARN] Rejected {file}: header does not match the {self.schema.csv_type} schema")
+            self.errors[str(file)] = f"header does not match the {self.schema.csv_type} schema"
+        return good, bad
+
+    def insert_csv_list(self, csv_list, table=None):
+        """
+        Insert every file in csv_list with one multi-file scan.
+        """
+        self.con.execute(f"""
+            INSERT INTO {table or self.table_name}
+            {self.select_sql(self.csv_source(csv_list))}
+        """)
+        return
+
+    def insert_csv(self, csv_path, site=None, experiment=None, sim_id=None, table=None):
+        """
+        Insert a single csv. Site, experiment and sim_id are derived from
+        the path inside the query; the arguments are kept for compatibility.
+        """
+        self.insert_csv_list([csv_path], table=table)
+        return
+
+    def insert_each(self, csv_list, table=None):
+        failed = []
+        for file in csv_list:
+            start = time.perf_counter()
+            try:
+                self.insert_csv(str(file), table=table)
+                self.file_seconds[str(file)] = time.perf_counter() - start
+            except Exception as e:
+                print(f"[WARN] Failed to process {file}: {e}")
+                self.errors[str(file)] = str(e)
+                failed.append(file)
+        return failed
+
+    def insert_all(self, csv_list, bulk=True, batch_size=None, table=None):
+        """
+        Load csv_list into the table (or into `table`, e.g. a staging copy).
+        In bulk mode files are read in batches of batch_size with one INSERT
+        each; a batch that fails is retried file by file so only the broken
+        files are skipped. Returns the list of files that could not be loaded.
+        """
+        failed = []
+        if self.strict:
+            csv_list, failed = self.split_by_header(csv_list)
+        if not bulk:
+            return failed + self.insert_each(csv_list, table=table)
+        batch_size = batch_size or self.bulk_batch_size
+        for start in range(0, len(csv_list), batch_size):
+            batch = csv_list[start:start + batch_size]
+            began = time.perf_counter()
+            try:
+                self.insert_csv_list(batch, table=table)
+                if len(batch) == 1:
+                    self.file_seconds[str(batch[0])] = time.perf_counter() - began
+            except Exception as e:
+                print(f"[WARN] Bulk insert of {len(batch)} files into {table or self.table_name} failed, "
+                      f"falling back to per-file inserts: {e}")
+                failed.extend(self.insert_each(batch, table=table))
+        return failed
+
+    def delete_csv_rows(self, csv_list):
+        """
+        Delete the rows previously loaded from csv_list, matched on the
+        site, experiment and sim_id encoded in each path.
+        """
+        self.con.execute(f"""
+            DELETE FROM {self.table_name} t
+            USING ({meta_utilz.path_keys_sql(csv_list)}) k
+            WHERE t.{self.site_column} = k.site
+              AND t.Experiment = k.experiment
+              AND t.sim_id = k.sim_id
+        """)
+        return
+
+    def insert_test(self):
+        list_of_csv_paths = [self.test_path_1,
+                             self.test_path_2]
+        for path in list_of_csv_paths:
+            path = pl.Path(path)
+            site = meta_utilz.extract_site(path)
+            experiment = meta_utilz.extract_experiment_name(path)
+            sim_id = meta_utilz.extract_sim_id(path)
+            print(f'file {path}, site {site}, experiment {experiment}, simid {sim_id}')
+            try:
+                self.insert_csv(str(path), site, experiment, sim_id)
+            except Exception as e:
+                print(f"[WARN] Failed to process {path}: {e}")
+            print(f"Inserted {path} into {self.table_name}")
+        return
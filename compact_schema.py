@@ -0,0 +1,196 @@
+#!/usr/bin/python
+
+# Low-cardinality text columns stored as per-table ENUM types.
+ENUM_COLUMNS = [
+    "Study_Site",
+    "Site_Name",
+    "Experiment",
+    "Behavior",
+    "Microhabitat",
+    "Species",
+    "Sex",
+    "Event_Type",
+    "Cause_Of_Death",
+]
+# Calendar columns whose range is fixed by the simulation clock.
+NARROW_TYPES = {
+    "Hour": "UTINYINT",
+    "Day": "UTINYINT",
+    "Month": "UTINYINT",
+    "Year": "USMALLINT",
+}
+# Key columns that must have the same type in every table.
+KEY_TYPES = {
+    "Agent_id": "INTEGER",
+    "sim_id": "INTEGER",
+    "Time_Step": "INTEGER",
+}
+
+
+class CompactSchema:
+    '''
+    Rewrites ingested tables into a compact layout: ENUM types for the
+    categorical text columns, right-sized calendar integers, the same key
+    types in every table, and rows clustered by (site, experiment, sim_id,
+    Time_Step) so zone maps can skip row groups on those filters.
+    The ENUM type of each column is recorded in `compact_columns` so that
+    later incremental batches can widen it when new categories appear.
+    Those batches are inserted sorted by the same keys (cluster_keys), so
+    the row groups they append stay clustered too; one global order holds
+    again after a full rebuild.
+    '''
+    def __init__(self, con, meta_table="compact_columns"):
+        self.con = con
+        self.meta_table = meta_table
+        self.con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {self.meta_table} (
+            table_name TEXT,
+            column_name TEXT,
+            type_name TEXT,
+            PRIMARY KEY (table_name, column_name)
+        );
+        """)
+
+    def columns(self, table):
+        return self.con.execute("""
+            SELECT column_name, data_type
+            FROM duckdb_columns()
+            WHERE table_name = ?
+            ORDER BY column_index
+        """, [table]).fetchall()
+
+    def enum_types(self, table):
+        rows = self.con.execute(f"""
+            SELECT column_name, type_name FROM {self.meta_table} WHERE table_name = ?
+        """, [table]).fetchall()
+        return dict(rows)
+
+    def is_compact(self, table):
+        return bool(self.enum_types(table))
+
+    def cluster_keys(self, site_column):
+        return f"{site_column}, Experiment, sim_id, Time_Step"
+
+    def new_type_name(self, table, column):
+        base = f"{table}_{column}_enum".lower()
+        existing = {r[0] for r in self.con.execute(
+            "SELECT type_name FROM duckdb_types() WHERE type_name LIKE ?", [base + "%"]).fetchall()}
+        n = 1
+        while f"{base}_{n}" in existing:
+            n += 1
+        return f"{base}_{n}"
+
+    def create_enum(self, table, column, values_sql):
+        type_name = self.new_type_name(table, column)
+        self.con.execute(f"CREATE TYPE {type_name} AS ENUM ({values_sql})")
+        self.con.execute(f"INSERT OR REPLACE INTO {self.meta_table} VALUES (?, ?, ?)", [table, column, type_name])
+        return type_name
+
+    def forget(self, table):
+        """
+        Drop the ENUM bookkeeping of a table that has been recreated.
+        """
+        for type_name in self.enum_types(table).values():
+            self.con.execute(f"DROP TYPE IF EXISTS {type_name}")
+        self.con.execute(f"DELETE FROM {self.meta_table} WHERE table_name = ?", [table])
+        return
+
+    def rename(self, table, new_table):
+        """
+        Move the ENUM bookkeeping of table to new_table, which holds its columns.
+        """
+        self.con.execute(f"UPDATE {self.meta_table} SET table_name = ? WHERE table_name = ?", [new_table, table])
+        return
+
+    def table_size(self, table):
+        """
+        Bytes of storage blocks used by table, or None for in-memory databases.
+        """
+        block_size = self.con.execute(
+            "SELECT block_size FROM pragma_database_size() WHERE database_name = current_database()").fetchone()[0]
+        if not block_size:
+            return None
+        self.con.execute("CHECKPOINT")
+        blocks = self.con.execute(f"""
+            SELECT COUNT(DISTINCT b) FROM (
+                SELECT block_id AS b FROM pragma_storage_info('{table}') WHERE block_id >= 0
+                UNION ALL
+                SELECT unnest(additional_block_ids) FROM pragma_storage_info('{table}')
+            )
+        """).fetchone()[0]
+        return blocks * block_size
+
+    def compact(self, table, site_column):
+        """
+        Rewrite table in the compact layout and report its size before and after.
+        """
+        before = self.table_size(table)
+        old_enums = self.enum_types(table)
+        select = []
+        for column, data_type in self.columns(table):
+            if column in ENUM_COLUMNS:
+                type_name = self.create_enum(table, column, f"""
+                    SELECT DISTINCT CAST({column} AS VARCHAR) AS v FROM {table} WHERE {column} IS NOT NULL ORDER BY v
+                """)
+                select.append(f"CAST(CAST({column} AS VARCHAR) AS {type_name}) AS {column}")
+            elif column in NARROW_TYPES:
+                select.append(f"CAST({column} AS {NARROW_TYPES[column]}) AS {column}")
+            elif column in KEY_TYPES and data_type != KEY_TYPES[column]:
+                select.append(f"CAST({column} AS {KEY_TYPES[column]}) AS {column}")
+            else:
+                select.append(column)
+        self.con.execute(f"""
+            CREATE OR REPLACE TABLE {table} AS
+            SELECT {", ".join(select)}
+            FROM {table}
+            ORDER BY {self.cluster_keys(site_column)}
+        """)
+        for type_name in old_enums.values():
+            self.con.execute(f"DROP TYPE IF EXISTS {type_name}")
+        after = self.table_size(table)
+        self.report(table, before, after)
+        return before, after
+
+    def report(self, table, before, after):
+        if before is None or after is None:
+            print(f"[INFO] Compacted {table} (sizes are only reported for persistent databases)")
+            return
+        ratio = after / before if before else 0
+        print(f"[INFO] Compacted {table}: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB ({ratio:.0%})")
+        return
+
+    def staging_sql(self, table):
+        """
+        SELECT list for an empty staging copy of table with its ENUM columns
+        relaxed to VARCHAR, so a batch with unseen categories can still load.
+        """
+        enums = self.enum_types(table)
+        if not enums:
+            return f"SELECT * FROM {table} LIMIT 0"
+        relaxed = ", ".join(f"CAST({c} AS VARCHAR) AS {c}" for c in enums)
+        return f"SELECT * REPLACE ({relaxed}) FROM {table} LIMIT 0"
+
+    def absorb(self, table, staging):
+        """
+        Widen the ENUM types of table to cover every category present in staging.
+        """
+        for column, type_name in self.enum_types(table).items():
+            unseen = self.con.execute(f"""
+                SELECT COUNT(*) FROM (
+                    SELECT DISTINCT {column} FROM {staging} WHERE {column} IS NOT NULL
+                    EXCEPT
+                    SELECT unnest(enum_range(NULL::{type_name}))
+                )
+            """).fetchone()[0]
+            if not unseen:
+                continue
+            new_type = self.create_enum(table, column, f"""
+                SELECT unnest(enum_range(NULL::{type_name})) AS v
+                UNION
+                SELECT DISTINCT {column} FROM {staging} WHERE {column} IS NOT NULL
+                ORDER BY v
+            """)
+            self.con.execute(f"ALTER TABLE {table} ALTER {column} TYPE {new_type}")
+            self.con.execute(f"DROP TYPE {type_name}")
+            print(f"[INFO] Widened {table}.{column} with {unseen} new categories")
+        return
@@ -0,0 +1,133 @@
+#!/usr/bin/python
+import collections
+import datetime as dt
+import duckdb
+import numpy as np
+from calendar_dim import CalendarDimension
+from downsample import lttb
+from query_cache import data_version
+
+# Column types offered as plottable metrics.
+NUMERIC_TYPES = ("TINYINT", "SMALLINT", "INTEGER", "BIGINT", "UTINYINT", "USMALLINT", "UINTEGER", "UBIGINT",
+                 "HUGEINT", "FLOAT", "DOUBLE", "DECIMAL")
+KEY_COLUMNS = ["Time_Step", "Hour", "Day", "Month", "Year", "seed", "sim_id", "Agent_id"]
+
+
+class DashboardData:
+    '''
+    Engine-side data access for the results dashboard. Every view is one
+    DuckDB query that filters by site, experiment and date range and
+    averages the metric across replicates per time step; when the range
+    holds many more steps than the plot can show, the engine first averages
+    into coarser step buckets and the remaining series is thinned with
+    LTTB. The last `cache_size` views are kept in memory per data version.
+    '''
+    def __init__(self, con, table="model_db", site_column="Study_Site", cache_size=64):
+        if not isinstance(con, duckdb.DuckDBPyConnection):
+            con = duckdb.connect(str(con), read_only=True)
+        self.con = con
+        self.table = table
+        self.site_column = site_column
+        self.cache_size = cache_size
+        self.calendar = CalendarDimension(con)
+        self.views = collections.OrderedDict()
+
+    def distinct(self, column):
+        return [r[0] for r in self.con.execute(
+            f"SELECT DISTINCT {column} FROM {self.table} WHERE {column} IS NOT NULL ORDER BY 1").fetchall()]
+
+    def sites(self):
+        return self.distinct(self.site_column)
+
+    def experiments(self):
+        return self.distinct("Experiment")
+
+    def metrics(self):
+        rows = self.con.execute("""
+            SELECT column_name, data_type FROM duckdb_columns()
+            WHERE table_name = ? ORDER BY column_index
+        """, [self.table]).fetchall()
+        return [name for name, dtype in rows
+                if name not in KEY_COLUMNS and dtype.split("(")[0] in NUMERIC_TYPES]
+
+    def date_range(self):
+        first, last = self.con.execute(f"""
+            SELECT MIN(make_date(Year, Month, Day)), MAX(make_date(Year, Month, Day)) FROM {self.table}
+        """).fetchone()
+        return first, last
+
+    def filters(self, sites, experiments, start, end):
+        clauses, params = [], []
+        if sites:
+            clauses.append(f"{self.site_column} IN ({', '.join('?' for _ in sites)})")
+            params += list(sites)
+        if experiments:
+            clauses.append(f"Experiment IN ({', '.join('?' for _ in experiments)})")
+            params += [str(e) for e in experiments]
+        # With a calendar the date range becomes Time_Step ranges the fact
+        # table's zone maps prune on; otherwise the plain Year bounds let
+        # zone maps skip row groups before the date test.
+        if (start or end) and self.calendar.exists():
+            clauses.append(self.calendar.step_filter(self.site_column, start, end))
+            start = end = None
+        if start:
+            start = dt.date.fromisoformat(str(start)[:10])
+            clauses.append("Year >= ? AND make_date(Year, Month, Day) >= ?")
+            params += [start.year, start]
+        if end:
+            end = dt.date.fromisoformat(str(end)[:10])
+            clauses.append("Year <= ? AND make_date(Year, Month, Day) <= ?")
+            params += [end.year, end]
+        return (" AND ".join(clauses) or "true"), params
+
+    def series(self, metric, sites=None, experiments=None, start=None, end=None, max_points=2000):
+        """
+        {(site, experiment): dict(time, mean, sd, n_sims)} for metric, averaged
+        across replicates and downsampled to at most max_points per line; sd
+        is the SD of the per-replicate bucket means.
+        """
+        if metric not in self.metrics():
+            raise ValueError(f"Unknown metric '{metric}' for {self.table}")
+        key = (data_version(self.con), self.table, metric, tuple(sites or ()), tuple(experiments or ()),
+               str(start), str(end), max_points)
+        if key in self.views:
+            self.views.move_to_end(key)
+            return self.views[key]
+        where, params = self.filters(sites, experiments, start, end)
+        n_steps = self.con.execute(f"""
+            SELECT COUNT(DISTINCT Time_Step) FROM {self.table} WHERE {where}
+        """, params).fetchone()[0]
+        # Bucket width in steps so the engine returns at most ~4x max_points per line.
+        width = max(1, -(-n_steps // (4 * max_points)))
+        # Average each sim over the bucket first, so sd is the spread between
+        # replicates rather than the variation within the bucket.
+        rows = self.con.execute(f"""
+            SELECT site, Experiment, bucket,
+                MIN(time) AS time, AVG(value) AS mean, STDDEV_SAMP(value) AS sd, COUNT(*) AS n_sims
+            FROM (
+                SELECT {self.site_column} AS site, Experiment, sim_id,
+                    Time_Step // {width} AS bucket,
+                    MIN(make_timestamp(Year, Month, Day, Hour, 0, 0)) AS time,
+                    AVG({metric}) AS value
+                FROM {self.table}
+                WHERE {where}
+                GROUP BY ALL
+            )
+            GROUP BY site, Experiment, bucket
+            ORDER BY site, Experiment, bucket
+        """, params).fetchnumpy()
+        lines = {}
+        site, experiment = np.asarray(rows["site"]), np.asarray(rows["Experiment"])
+        for s, e in dict.fromkeys(zip(site.tolist(), experiment.tolist())):
+            mask = (site == s) & (experiment == e) & ~np.isnan(np.asarray(rows["mean"], dtype=float))
+            time = np.asarray(rows["time"][mask], dtype="datetime64[s]")
+            mean = np.asarray(rows["mean"][mask], dtype=float)
+            sd = np.nan_to_num(np.asarray(rows["sd"][mask], dtype=float))
+            x, y = lttb(time.astype(np.int64), mean, max_points)
+            keep = np.searchsorted(time.astype(np.int64), x.astype(np.int64))
+            lines[(s, e)] = {"time": time[keep], "mean": y, "sd": sd[keep],
+                             "n_sims": np.asarray(rows["n_sims"][mask])[keep]}
+        self.views[key] = lines
+        if len(self.views) > self.cache_size:
+            self.views.popitem(last=False)
+        return lines
@@ -0,0 +1,242 @@
+#!/usr/bin/python
+import os
+import pathlib as pl
+import re
+import polars as po
+from concurrent.futures import ThreadPoolExecutor
+import meta_utilz
+
+INDEX_SCHEMA = {
+    "site": po.Categorical,
+    "experiment": po.Categorical,
+    "sim_id": po.Int64,
+    "csv_type": po.Categorical,
+    "path": po.Utf8,
+    "size": po.Int64,
+    "mtime": po.Float64,
+}
+REP_DIR = re.compile(r"rep_(\d+)")
+DIR_SCHEMA = {
+    "path": po.Utf8,
+    "mtime": po.Float64,
+}
+
+
+def scan_sim_dir(sim_dir):
+    """
+    List the outputs (csv, compressed csv or parquet) of one rep_<id> folder
+    as (name, size, mtime) tuples.
+    """
+    files = []
+    with os.scandir(sim_dir) as it:
+        for entry in it:
+            if entry.is_file() and meta_utilz.split_output_name(entry.name)[0]:
+                st = entry.stat()
+                files.append((entry.name, st.st_size, st.st_mtime))
+    return files
+
+
+def stat_files(paths):
+    """
+    [(size, mtime)] of paths, or None if any of them is gone.
+    """
+    try:
+        return [(st.st_size, st.st_mtime) for st in map(os.stat, paths)]
+    except FileNotFoundError:
+        return None
+
+
+def preferred_paths(paths):
+    """
+    The paths ingest reads: one per output (meta_utilz.source_key), the
+    encoding listed first in meta_utilz.OUTPUT_SUFFIXES.
+    """
+    rank = {suffix: i for i, suffix in enumerate(meta_utilz.OUTPUT_SUFFIXES)}
+    best = {}
+    for path in paths:
+        key = meta_utilz.source_key(path)
+        suffix = meta_utilz.split_output_name(os.path.basename(path))[1]
+        if key not in best or rank[suffix] < rank[best[key][1]]:
+            best[key] = (path, suffix)
+    return [path for path, _ in best.values()]
+
+
+def list_dirs(path):
+    """
+    (name, path, mtime) of the subdirectories of path, or [] if it is missing.
+    """
+    try:
+        with os.scandir(path) as it:
+            return [(e.name, e.path, e.stat().st_mtime) for e in it if e.is_dir()]
+    except FileNotFoundError:
+        return []
+
+
+class FileIndex:
+    '''
+    Columnar index of every simulation output under parent_directory:
+    one row per file with site, experiment, sim_id, csv_type, path, size
+    and mtime. Replicate folders are scanned concurrently with os.scandir.
+    With a cache_path the index and the directory mtimes it was built from
+    are kept on disk as parquet, and later scans only re-list directories
+    whose mtime changed. The cached files of the other directories are
+    re-stat'ed, so a file rewritten in place still gets its new size and
+    mtime. Folders under Results that are not rep_<sim_id> are skipped.
+    experiments, a list of (site, experiment folder name) pairs, limits the
+    scan to those <site>_<experiment> folders.
+    '''
+    def __init__(self, parent_directory, site_names, cache_path=None, workers=16, experiments=None):
+        self.parent_directory = pl.Path(parent_directory).resolve()
+        self.site_names = site_names
+        self.experiments = {tuple(k) for k in experiments} if experiments else None
+        self.cache_path = pl.Path(cache_path) if cache_path else None
+        self.workers = workers
+        self.files = po.DataFrame(schema=INDEX_SCHEMA)
+        self.dirs = po.DataFrame(schema=DIR_SCHEMA)
+
+    @property
+    def dir_cache_path(self):
+        return self.cache_path.with_name(self.cache_path.stem + "_dirs.parquet")
+
+    def load_cache(self):
+        if self.cache_path and self.cache_path.exists() and self.dir_cache_path.exists():
+            return po.read_parquet(self.cache_path), po.read_parquet(self.dir_cache_path)
+        return po.DataFrame(schema=INDEX_SCHEMA), po.DataFrame(schema=DIR_SCHEMA)
+
+    def save_cache(self):
+        if self.cache_path:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self.files.write_parquet(self.cache_path, compression="zstd")
+            self.dirs.write_parquet(self.dir_cache_path, compression="zstd")
+        return
+
+    def match_site(self, name):
+        for site in self.site_names:
+            if name.startswith(site + "_"):
+                return site, name[len(site) + 1:]
+        return None, None
+
+    def scan(self):
+        """
+        Build (or refresh) the index and return it as a polars DataFrame.
+        """
+        cached_files, cached_dirs = self.load_cache()
+        old_mtime = dict(zip(cached_dirs["path"].to_list(), cached_dirs["mtime"].to_list()))
+        cached_by_dir = {}
+        if cached_files.height:
+            for (sim_dir,), group in cached_files.group_by(
+                    po.col("path").str.replace(r"[/\\][^/\\]+$", "")):
+                cached_by_dir[sim_dir] = group
+
+        sim_dirs = []
+        dir_rows = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            experiments = []
+            for name, path, mtime in list_dirs(self.parent_directory):
+                site, experiment = self.match_site(name)
+                if site is not None and (self.experiments is None or (site, experiment) in self.experiments):
+                    experiments.append((site, experiment, os.path.join(path, "Results")))
+            listings = pool.map(lambda e: list_dirs(e[2]), experiments)
+            for (site, experiment, _), listing in zip(experiments, listings):
+                for name, path, mtime in listing:
+                    match = REP_DIR.fullmatch(name)
+                    if not match:
+                        print(f"[WARN] Skipping {path}: not a rep_<sim_id> folder")
+                        continue
+                    sim_dirs.append((site, experiment, int(match.group(1)), path, mtime))
+                    dir_rows.append((path, mtime))
+
+            stale = [d for d in sim_dirs if old_mtime.get(d[3]) != d[4] or d[3] not in cached_by_dir]
+            stale_paths = {d[3] for d in stale}
+            fresh = [d[3] for d in sim_dirs if d[3] not in stale_paths]
+            stats = pool.map(stat_files, [cached_by_dir[path]["path"].to_list() for path in fresh])
+            for path, stat in zip(fresh, stats):
+                if stat is None:
+                    stale.extend(d for d in sim_dirs if d[3] == path)
+                    continue
+                sizes, mtimes = zip(*stat) if stat else ((), ())
+                cached_by_dir[path] = cached_by_dir[path].with_columns(
+                    po.Series("size", sizes, dtype=po.Int64), po.Series("mtime", mtimes, dtype=po.Float64))
+            listings = dict(zip([d[3] for d in stale], pool.map(scan_sim_dir, [d[3] for d in stale])))
+
+        frames = []
+        rows = {col: [] for col in INDEX_SCHEMA}
+        for site, experiment, sim_id, path, mtime in sim_dirs:
+            if path not in listings:
+                frames.append(cached_by_dir[path])
+                continue
+            for name, size, file_mtime in listings[path]:
+                rows["site"].append(site)
+                rows["experiment"].append(experiment)
+                rows["sim_id"].append(sim_id)
+                rows["csv_type"].append(meta_utilz.split_output_name(name)[0])
+                rows["path"].append(os.path.join(path, name))
+                rows["size"].append(size)
+                rows["mtime"].append(file_mtime)
+        frames.append(po.DataFrame(rows, schema=INDEX_SCHEMA))
+        self.files = po.concat([f.cast(INDEX_SCHEMA) for f in frames], how="vertical")
+        self.dirs = po.DataFrame(dir_rows, schema=DIR_SCHEMA, orient="row")
+        print(f"[INFO] Indexed {self.files.height} files in {len(sim_dirs)} replicate folders "
+              f"({len(stale)} rescanned)")
+        self.save_cache()
+        return self.files
+
+    def paths(self, csv_type):
+        """
+        One file per replicate for csv_type; where a replicate holds several
+        encodings of it, the first in meta_utilz.OUTPUT_SUFFIXES wins.
+        """
+        return [pl.Path(path) for path in
+                preferred_paths(self.files.filter(po.col("csv_type") == csv_type)["path"].to_list())]
+
+    def restrict(self, keys):
+        """
+        Keep only the files of the given (site, experiment) folder pairs.
+        """
+        wanted = [f"{s}/{e}" for s, e in keys]
+        key = po.concat_str([po.col("site").cast(po.Utf8), po.col("experiment").cast(po.Utf8)], separator="/")
+        self.files = self.files.filter(key.is_in(wanted))
+        return self.files
+
+    def exclude(self, replicates):
+        """
+        Drop the files of the given (site, experiment folder, sim_id) replicates.
+        """
+        unwanted = [f"{s}/{e}/{i}" for s, e, i in replicates]
+        key = po.concat_str([po.col("site").cast(po.Utf8), po.col("experiment").cast(po.Utf8),
+                             po.col("sim_id").cast(po.Utf8)], separator="/")
+        self.files = self.files.filter(~key.is_in(unwanted))
+        return self.files
+
+    def sizes(self):
+        """
+        Total bytes of output per (site, experiment) folder pair.
+        """
+        grouped = self.files.group_by(["site", "experiment"]).agg(po.col("size").sum())
+        return {(s, e): size for s, e, size in grouped.iter_rows()}
+
+    def unrecognized(self, known_types):
+        return self.files.filter(~po.col("csv_type").cast(po.Utf8).is_in(list(known_types)))
+
+    def to_path_db(self):
+        """
+        The legacy nested dict: site -> experiment -> rep_<id> -> csv_type -> Path.
+        """
+        path_db = {}
+        for site, experiment, sim_id, csv_type, path in self.files.select(
+                ["site", "experiment", "sim_id", "csv_type", "path"]).iter_rows():
+            sims = path_db.setdefault(site, {}).setdefault(experiment, {})
+            sims.setdefault(f"rep_{sim_id}", {})[csv_type] = pl.Path(path)
+        return path_db
+
+    def to_metadata_db(self):
+        """
+        site -> experiment -> sorted list of sim_ids.
+        """
+        meta = {}
+        grouped = (self.files.group_by(["site", "experiment"])
+                   .agg(po.col("sim_id").unique().sort())
+                   .sort(["site", "experiment"]))
+        for site, experiment, sim_ids in grouped.iter_rows():
+            meta.setdefault(site, {})[experiment] = sim_ids
+        return meta
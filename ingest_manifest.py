@@ -0,0 +1,222 @@
+#!/usr/bin/python
+import datetime as dt
+import hashlib
+import os
+import time
+import meta_utilz
+
+
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class IngestManifest:
+    '''
+    Tracks which raw files have been loaded into which table, so ingest can
+    skip unchanged files, replace the rows of modified ones and resume after
+    a crash. Each batch of files is committed together with its manifest
+    rows, so the manifest never claims rows the table does not hold.
+    '''
+    def __init__(self, con, table_name="ingest_manifest"):
+        self.con = con
+        self.table_name = table_name
+        self.replaced = {}
+        self.create_table()
+
+    def create_table(self):
+        self.con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {self.table_name} (
+            table_name TEXT,
+            path TEXT,
+            size BIGINT,
+            mtime DOUBLE,
+            content_hash TEXT,
+            ingested_at TIMESTAMP,
+            PRIMARY KEY (table_name, path)
+        );
+        CREATE TABLE IF NOT EXISTS data_versions (
+            table_name TEXT PRIMARY KEY,
+            version BIGINT,
+            changed_at TIMESTAMP
+        );
+        """)
+        return
+
+    def bump_version(self, table_name):
+        """
+        Mark table_name as changed, invalidating cached query results.
+        """
+        self.con.execute("""
+            INSERT INTO data_versions VALUES (?, 1, ?)
+            ON CONFLICT (table_name) DO UPDATE SET version = version + 1, changed_at = excluded.changed_at
+        """, [table_name, dt.datetime.now()])
+        return
+
+    def forget(self, table_name):
+        self.con.execute(f"DELETE FROM {self.table_name} WHERE table_name = ?", [table_name])
+        self.bump_version(table_name)
+        return
+
+    def entries(self, table_name):
+        rows = self.con.execute(f"""
+            SELECT path, size, mtime, content_hash
+            FROM {self.table_name}
+            WHERE table_name = ?
+        """, [table_name]).fetchall()
+        return {path: (size, mtime, content_hash) for path, size, mtime, content_hash in rows}
+
+    def plan(self, table_name, csv_list):
+        """
+        Split csv_list into (new, changed) files relative to the manifest.
+        Files whose size and mtime match are skipped without hashing; files
+        that were only touched get their stat refreshed instead of reloaded.
+        A file replacing another encoding of the same output (e.g. an
+        archived Model.parquet for Model.csv) counts as changed; the entry
+        of the replaced file is dropped when the new one is recorded.
+        """
+        known = self.entries(table_name)
+        current = set(str(f) for f in csv_list)
+        replaced = {meta_utilz.source_key(p): p for p in known if p not in current}
+        self.replaced = {}
+        new, changed, touched = [], [], []
+        for file in csv_list:
+            path = str(file)
+            st = os.stat(path)
+            if path not in known:
+                old = replaced.get(meta_utilz.source_key(path))
+                if old:
+                    self.replaced[path] = old
+                    changed.append(file)
+                else:
+                    new.append(file)
+                continue
+            size, mtime, content_hash = known[path]
+            if size == st.st_size and mtime == st.st_mtime:
+                continue
+            if file_hash(path) == content_hash:
+                touched.append(file)
+            else:
+                changed.append(file)
+        if touched:
+            self.record(table_name, touched)
+        return new, changed
+
+    def record(self, table_name, csv_list):
+        stale = [self.replaced[str(f)] for f in csv_list if str(f) in self.replaced]
+        if stale:
+            self.con.executemany(f"DELETE FROM {self.table_name} WHERE table_name = ? AND path = ?",
+                                 [(table_name, p) for p in stale])
+        now = dt.datetime.now()
+        rows = []
+        for file in csv_list:
+            path = str(file)
+            st = os.stat(path)
+            rows.append((table_name, path, st.st_size, st.st_mtime, file_hash(path), now))
+        if rows:
+            self.con.executemany(f"INSERT OR REPLACE INTO {self.table_name} VALUES (?, ?, ?, ?, ?, ?)", rows)
+        return
+
+    def batches(self, todo, batch_size, batch_bytes=None):
+        """
+        Split todo into consecutive batches of at most batch_size files and,
+        if batch_bytes is set, at most batch_bytes of raw file (a larger
+        file gets a batch to itself).
+        """
+        batches, batch, size = [], [], 0
+        for item in todo:
+            file_size = os.path.getsize(item[0]) if batch_bytes else 0
+            if batch and (len(batch) >= batch_size or (batch_bytes and size + file_size > batch_bytes)):
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append(item)
+            size += file_size
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def sync(self, collator, csv_list, loader, batch_size=500, on_commit=None, staging_sql=None, on_staged=None,
+             recorder=None, persist=True, manifest_key=None, batch_bytes=None, order_by=None):
+        """
+        Bring collator.table_name in line with csv_list. loader(files, table)
+        loads files into a staging table and returns the ones that failed.
+        Every batch is swapped into the real table in one transaction:
+        stale rows of changed files are deleted, the staged rows inserted
+        and the manifest updated. on_commit(staging, loaded_files), if given,
+        runs inside the same transaction so derived tables stay in step.
+        staging_sql overrides the query the empty staging table is created
+        from, and on_staged(staging) runs after loading, before the swap.
+        Only collator.stored_columns() are copied from staging to the table.
+        An ingest_metrics.IngestRecorder, if given, logs every batch with its
+        load, insert (including the commit) and hook (on_staged, on_commit)
+        seconds kept apart.
+        With persist=False the staged rows only feed on_commit and are never
+        written to the table; manifest_key then names the derived tables in
+        the manifest (it defaults to the table name).
+        batch_bytes additionally caps the raw csv bytes of each batch.
+        order_by, if given, sorts each batch's rows as they are inserted.
+        Returns the list of failed files.
+        """
+        table = collator.table_name
+        key = manifest_key or table
+        new, changed = self.plan(key, csv_list)
+        todo = [(f, False) for f in new] + [(f, True) for f in changed]
+        print(f"[INFO] {key}: {len(new)} new, {len(changed)} changed, "
+              f"{len(csv_list) - len(todo)} up to date")
+        staging = f"{table}_staging"
+        columns = ", ".join(collator.stored_columns())
+        failed = []
+        if recorder:
+            recorder.start_table(key, [f for f, _ in todo])
+        done = 0
+        for batch in self.batches(todo, batch_size, batch_bytes):
+            done += len(batch)
+            files = [f for f, _ in batch]
+            self.con.execute(f"CREATE OR REPLACE TEMP TABLE {staging} AS "
+                             f"{staging_sql or f'SELECT * FROM {table} LIMIT 0'}")
+            parse_start = time.perf_counter()
+            batch_failed = loader(files, staging)
+            parse_s = time.perf_counter() - parse_start
+            hook_start = time.perf_counter()
+            if on_staged:
+                on_staged(staging)
+            hooks_s = time.perf_counter() - hook_start
+            failed.extend(batch_failed)
+            bad = set(str(f) for f in batch_failed)
+            loaded = [f for f in files if str(f) not in bad]
+            stale = [f for f, was_loaded in batch if was_loaded and str(f) not in bad]
+            self.con.execute("BEGIN TRANSACTION")
+            try:
+                insert_start = time.perf_counter()
+                if persist:
+                    if stale:
+                        collator.delete_csv_rows(stale)
+                    order_sql = f" ORDER BY {order_by}" if order_by else ""
+                    self.con.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging}{order_sql}")
+                insert_s = time.perf_counter() - insert_start
+                if on_commit:
+                    hook_start = time.perf_counter()
+                    on_commit(staging, loaded)
+                    hooks_s += time.perf_counter() - hook_start
+                self.record(key, loaded)
+                self.bump_version(key)
+                commit_start = time.perf_counter()
+                self.con.execute("COMMIT")
+                insert_s += time.perf_counter() - commit_start
+            except Exception:
+                self.con.execute("ROLLBACK")
+                raise
+            if recorder:
+                errors = {str(f): collator.errors.get(str(f), "unknown error") for f in batch_failed}
+                file_seconds = {str(f): collator.file_seconds.pop(str(f), None) for f in files}
+                recorder.record_batch(key, collator.site_column, staging, files, errors,
+                                      parse_s, insert_s, hooks_s, file_seconds)
+            else:
+                print(f"[INFO] {key}: committed {done}/{len(todo)} files")
+        if recorder:
+            recorder.finish_table(key)
+        self.con.execute(f"DROP TABLE IF EXISTS {staging}")
+        return failed
@@ -0,0 +1,210 @@
+#!/usr/bin/python
+import datetime as dt
+import json
+import os
+import pathlib as pl
+import time
+import meta_utilz
+
+
+class IngestRecorder:
+    '''
+    Structured ingest instrumentation stored next to the data:
+        ingest_runs          one row per initialize_tables call
+        ingest_batch_metrics measured parse, insert and hook seconds per batch
+        ingest_file_metrics  bytes, rows and parse/insert seconds per file
+        ingest_table_metrics files, rows, bytes, rows/s and MB/s per table
+        ingest_errors        every file that failed, with the exception text
+    Files are parsed and inserted a batch at a time. A file's parse_s is
+    measured when it was read on its own (a single-file batch or the
+    per-file fallback) and NULL otherwise; est_parse_s and est_insert_s are
+    its byte-weighted share of the batch's measured seconds. Hook seconds
+    (derived-table refreshes) are only kept per batch.
+    '''
+    def __init__(self, con, progress=True):
+        self.con = con
+        self.progress = progress
+        self.create_tables()
+        self.run_id = None
+        self.tables = {}
+
+    def create_tables(self):
+        self.con.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_runs (
+            run_id INTEGER PRIMARY KEY,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS ingest_batch_metrics (
+            run_id INTEGER,
+            table_name TEXT,
+            batch_id INTEGER,
+            files BIGINT,
+            bytes BIGINT,
+            rows BIGINT,
+            parse_s DOUBLE,
+            insert_s DOUBLE,
+            hooks_s DOUBLE
+        );
+        CREATE TABLE IF NOT EXISTS ingest_file_metrics (
+            run_id INTEGER,
+            table_name TEXT,
+            batch_id INTEGER,
+            path TEXT,
+            bytes BIGINT,
+            rows BIGINT,
+            parse_s DOUBLE,
+            est_parse_s DOUBLE,
+            est_insert_s DOUBLE,
+            status TEXT
+        );
+        CREATE TABLE IF NOT EXISTS ingest_table_metrics (
+            run_id INTEGER,
+            table_name TEXT,
+            files BIGINT,
+            failed BIGINT,
+            rows BIGINT,
+            bytes BIGINT,
+            seconds DOUBLE,
+            rows_per_s DOUBLE,
+            mb_per_s DOUBLE
+        );
+        CREATE TABLE IF NOT EXISTS ingest_errors (
+            run_id INTEGER,
+            table_name TEXT,
+            path TEXT,
+            error TEXT,
+            logged_at TIMESTAMP
+        );
+        """)
+        return
+
+    def start_run(self):
+        self.run_id = self.con.execute("SELECT COALESCE(MAX(run_id), 0) + 1 FROM ingest_runs").fetchone()[0]
+        self.con.execute("INSERT INTO ingest_runs VALUES (?, ?, NULL)", [self.run_id, dt.datetime.now()])
+        return self.run_id
+
+    def finish_run(self):
+        self.con.execute("UPDATE ingest_runs SET finished_at = ? WHERE run_id = ?", [dt.datetime.now(), self.run_id])
+        return
+
+    def start_table(self, table, files):
+        sizes = [os.path.getsize(f) for f in files]
+        self.tables[table] = {
+            "start": time.perf_counter(),
+            "files": len(files),
+            "bytes": sum(sizes),
+            "done_files": 0,
+            "done_bytes": 0,
+            "rows": 0,
+            "failed": 0,
+            "batches": 0,
+        }
+        return
+
+    def file_rows(self, staging, site_column, files):
+        """
+        Rows per file in a staging batch, matched on the key in each path.
+        """
+        if not files:
+            return {}
+        rows = self.con.execute(f"""
+            SELECT k.path, COALESCE(s.n, 0)
+            FROM ({meta_utilz.path_keys_sql(files)}) k
+            LEFT JOIN (
+                SELECT {site_column} AS site, CAST(Experiment AS TEXT) AS experiment, sim_id, COUNT(*) AS n
+                FROM {staging}
+                GROUP BY ALL
+            ) s
+            ON s.site = k.site AND s.experiment = k.experiment AND s.sim_id = k.sim_id
+        """).fetchall()
+        return dict(rows)
+
+    def record_batch(self, table, site_column, staging, files, errors, parse_s, insert_s, hooks_s=0.0,
+                     file_seconds=None):
+        """
+        Log one committed batch. errors maps failed file path -> exception
+        text, file_seconds path -> measured load seconds (None if the file
+        was read together with others).
+        """
+        state = self.tables[table]
+        state["batches"] += 1
+        batch_id = state["batches"]
+        file_seconds = file_seconds or {}
+        sizes = {str(f): os.path.getsize(f) for f in files}
+        batch_bytes = sum(sizes.values()) or 1
+        loaded = [f for f in files if str(f) not in errors]
+        rows = self.file_rows(staging, site_column, loaded)
+        now = dt.datetime.now()
+        file_rows = []
+        for path, size in sizes.items():
+            share = size / batch_bytes
+            failed = path in errors
+            file_rows.append((self.run_id, table, batch_id, path, size, 0 if failed else rows.get(path, 0),
+                              file_seconds.get(path), parse_s * share, insert_s * share,
+                              "failed" if failed else "loaded"))
+        self.con.executemany("""
+            INSERT INTO ingest_file_metrics
+                (run_id, table_name, batch_id, path, bytes, rows, parse_s, est_parse_s, est_insert_s, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, file_rows)
+        self.con.execute("""
+            INSERT INTO ingest_batch_metrics
+                (run_id, table_name, batch_id, files, bytes, rows, parse_s, insert_s, hooks_s)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [self.run_id, table, batch_id, len(files), sum(sizes.values()), sum(rows.values()),
+              parse_s, insert_s, hooks_s])
+        if errors:
+            self.con.executemany("INSERT INTO ingest_errors VALUES (?, ?, ?, ?, ?)",
+                                 [(self.run_id, table, path, msg, now) for path, msg in errors.items()])
+        state["done_files"] += len(files)
+        state["done_bytes"] += sum(sizes.values())
+        state["rows"] += sum(rows.values())
+        state["failed"] += len(errors)
+        if self.progress:
+            self.print_progress(table)
+        return
+
+    def print_progress(self, table):
+        state = self.tables[table]
+        elapsed = time.perf_counter() - state["start"]
+        rate = state["done_bytes"] / elapsed if elapsed else 0
+        remaining = (state["bytes"] - state["done_bytes"]) / rate if rate else 0
+        eta = dt.timedelta(seconds=round(remaining))
+        print(f"[INFO] {table}: {state['done_files']}/{state['files']} files, "
+              f"{state['rows']:,} rows, {rate / 1e6:.1f} MB/s, ETA {eta}")
+        return
+
+    def finish_table(self, table):
+        state = self.tables[table]
+        seconds = time.perf_counter() - state["start"]
+        rows_per_s = state["rows"] / seconds if seconds else None
+        mb_per_s = state["bytes"] / 1e6 / seconds if seconds else None
+        self.con.execute("INSERT INTO ingest_table_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         [self.run_id, table, state["files"], state["failed"], state["rows"], state["bytes"],
+                          seconds, rows_per_s, mb_per_s])
+        return
+
+    def fetch(self, query, params=None):
+        cursor = self.con.execute(query, params or [])
+        columns = [d[0] for d in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def export_json(self, output_path, run_id=None):
+        """
+        Write the metrics and errors of run_id (default: the latest run) to JSON.
+        """
+        if run_id is None:
+            run_id = self.con.execute("SELECT MAX(run_id) FROM ingest_runs").fetchone()[0]
+        report = {
+            "run": self.fetch("SELECT * FROM ingest_runs WHERE run_id = ?", [run_id]),
+            "tables": self.fetch("SELECT * FROM ingest_table_metrics WHERE run_id = ?", [run_id]),
+            "batches": self.fetch("SELECT * FROM ingest_batch_metrics WHERE run_id = ?", [run_id]),
+            "files": self.fetch("SELECT * FROM ingest_file_metrics WHERE run_id = ?", [run_id]),
+            "errors": self.fetch("SELECT * FROM ingest_errors WHERE run_id = ?", [run_id]),
+        }
+        output_path = pl.Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(json.dumps(report, indent=2, default=str))
+        print(f"[INFO] Ingest metrics written to: {output_path}")
+        return output_path
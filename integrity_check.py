@@ -0,0 +1,236 @@
+#!/usr/bin/python
+import csv
+from concurrent.futures import ThreadPoolExecutor
+import duckdb
+import polars as po
+import pyarrow.parquet as pq
+import meta_utilz
+import schemas
+from file_index import preferred_paths
+
+QUARANTINE_SCHEMA = {
+    "site": po.Utf8,
+    "experiment": po.Utf8,
+    "sim_id": po.Int64,
+    "csv_type": po.Utf8,
+    "path": po.Utf8,
+    "reason": po.Utf8,
+}
+# Columns of the last row used by the checks.
+TAIL_COLUMNS = ["Time_Step", "Rattlesnakes", "sim_id"]
+TAIL_BYTES = 1 << 16
+
+
+def split_line(line):
+    return next(csv.reader([line]), []) if line else []
+
+
+def csv_ends(path, tail_bytes=TAIL_BYTES):
+    """
+    (header, last row as {column: value}, complete) of a plain csv, reading
+    only its first line and its last tail_bytes. A csv writer ends every row
+    with a newline, so a file that does not, or whose last row has the wrong
+    number of fields, was cut off mid-write.
+    """
+    with open(path, "rb") as f:
+        header_line = f.readline()
+        size = f.seek(0, 2)
+        f.seek(max(size - tail_bytes, len(header_line)))
+        tail = f.read()
+    header = split_line(header_line.decode("utf-8", "replace").strip())
+    lines = [line for line in tail.decode("utf-8", "replace").splitlines() if line.strip()]
+    if not lines:
+        return header, None, True
+    fields = split_line(lines[-1])
+    complete = tail.endswith(b"\n") and len(fields) == len(header)
+    return header, dict(zip(header, fields)), complete
+
+
+def compressed_ends(path):
+    """
+    (header, last row, complete) of a .csv.gz or .csv.zst output. These
+    cannot be read from the end, so the lines are streamed through once
+    without splitting them into fields.
+    """
+    con = duckdb.connect(database=":memory:")
+    try:
+        con.execute("SET threads TO 1")
+        first, last, n = con.execute(f"""
+            SELECT first(line), last(line), COUNT(*)
+            FROM read_csv({meta_utilz.sql_file_list([path])}, columns={{'line': 'VARCHAR'}}, header=false,
+                          auto_detect=false, delim='\x1f', quote='', escape='', strict_mode=false)
+        """).fetchone()
+    finally:
+        con.close()
+    header = split_line(first)
+    if n is None or n < 2:
+        return header, None, True
+    fields = split_line(last)
+    return header, dict(zip(header, fields)), len(fields) == len(header)
+
+
+def parquet_ends(path):
+    """
+    (header, last row, complete) of an archived parquet output from its
+    footer and the tail columns of its last row group.
+    """
+    parquet = pq.ParquetFile(path)
+    header = parquet.schema_arrow.names
+    if parquet.metadata.num_rows == 0:
+        return header, None, True
+    columns = [c for c in TAIL_COLUMNS if c in header]
+    rows = parquet.read_row_group(parquet.num_row_groups - 1, columns=columns).to_pylist()
+    return header, {k: str(v) for k, v in rows[-1].items()}, True
+
+
+def read_ends(path):
+    name = str(path)
+    if meta_utilz.is_parquet(name):
+        return parquet_ends(name)
+    if name.endswith(".csv"):
+        return csv_ends(name)
+    return compressed_ends(name)
+
+
+def as_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def inspect_file(row):
+    """
+    Header and last-row facts of one indexed output.
+    """
+    site, experiment, sim_id, csv_type, path = row
+    report = {"site": site, "experiment": experiment, "sim_id": sim_id, "csv_type": csv_type, "path": path,
+              "error": None, "header_ok": None, "complete": None, "last_step": None, "last_snakes": None,
+              "last_sim_id": None}
+    try:
+        header, last, complete = read_ends(path)
+    except Exception as e:
+        report["error"] = str(e)
+        return report
+    report["header_ok"] = header == schemas.REGISTRY[csv_type].csv_names
+    report["complete"] = complete
+    if last:
+        report["last_step"] = as_int(last.get("Time_Step"))
+        report["last_snakes"] = as_int(last.get("Rattlesnakes"))
+        report["last_sim_id"] = as_int(last.get("sim_id"))
+    return report
+
+
+class IntegrityCheck:
+    '''
+    Pre-ingest validation of the outputs in a file index, reading only file
+    headers and tails (see read_ends), one thread per file. Where a
+    replicate holds several encodings of an output, the one ingest reads
+    (file_index.preferred_paths) is checked. A replicate is
+    quarantined when any of its outputs
+        - cannot be opened, or has a header differing from schemas.py
+        - ends in a partial row, or (Model, Rattlesnake) has no rows
+        - is missing while other replicates of its site and experiment have it
+    or when its outputs disagree:
+        - Model ends before last_step (default: the latest Model Time_Step of
+          its site and experiment), or its sim_id is not the folder's
+        - Rattlesnake ends before the Model while the Model's last row still
+          counts live rattlesnakes, or ends after it
+        - BirthDeath has events after the Model's last Time_Step
+    last_step may be an int or {(site, experiment folder): int}.
+    '''
+    def __init__(self, last_step=None, workers=16):
+        self.last_step = last_step
+        self.workers = workers
+        self.reports = None
+
+    def inspect(self, files):
+        """
+        Per-file header and tail facts for every registered output in files
+        (a FileIndex frame).
+        """
+        files = files.filter(po.col("csv_type").cast(po.Utf8).is_in(list(schemas.REGISTRY)))
+        files = files.filter(po.col("path").is_in(preferred_paths(files["path"].to_list())))
+        rows = files.select(
+            po.col("site").cast(po.Utf8), po.col("experiment").cast(po.Utf8), "sim_id",
+            po.col("csv_type").cast(po.Utf8), "path").iter_rows()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            self.reports = list(pool.map(inspect_file, rows))
+        return self.reports
+
+    def expected_step(self, site, experiment, model_steps):
+        if isinstance(self.last_step, dict):
+            return self.last_step.get((site, experiment), max(model_steps, default=None))
+        if self.last_step is not None:
+            return self.last_step
+        return max(model_steps, default=None)
+
+    def replicate_reasons(self, outputs, required, expected):
+        """
+        Reasons to quarantine one replicate, given {csv_type: report}.
+        """
+        reasons = []
+        for csv_type in sorted(required - set(outputs)):
+            reasons.append(f"missing {csv_type}")
+        for csv_type, r in sorted(outputs.items()):
+            if r["error"]:
+                reasons.append(f"{csv_type}: unreadable ({r['error']})")
+            elif not r["header_ok"]:
+                reasons.append(f"{csv_type}: header does not match the {csv_type} schema")
+            elif not r["complete"]:
+                reasons.append(f"{csv_type}: last row is incomplete")
+            elif r["last_step"] is None and csv_type != "BirthDeath":
+                reasons.append(f"{csv_type}: no rows")
+        if reasons:
+            return reasons
+        model = outputs.get("Model")
+        if model is None:
+            return reasons
+        end = model["last_step"]
+        if expected is not None and end < expected:
+            reasons.append(f"Model: ends at Time_Step {end}, expected {expected}")
+        if model["last_sim_id"] is not None and model["last_sim_id"] != model["sim_id"]:
+            reasons.append(f"Model: sim_id {model['last_sim_id']} does not match the folder")
+        snakes = outputs.get("Rattlesnake")
+        if snakes:
+            if snakes["last_step"] > end:
+                reasons.append(f"Rattlesnake: ends at Time_Step {snakes['last_step']}, after the Model ({end})")
+            elif snakes["last_step"] < end and (model["last_snakes"] or 0) > 0:
+                reasons.append(f"Rattlesnake: ends at Time_Step {snakes['last_step']} but the Model counts "
+                               f"{model['last_snakes']} rattlesnakes at {end}")
+        events = outputs.get("BirthDeath")
+        if events and events["last_step"] is not None and events["last_step"] > end:
+            reasons.append(f"BirthDeath: events up to Time_Step {events['last_step']}, after the Model ({end})")
+        return reasons
+
+    def run(self, files):
+        """
+        Check every replicate in files and return the quarantine list: one
+        row per indexed file of each failing replicate, with its reasons.
+        """
+        reports = self.inspect(files)
+        replicates, by_experiment = {}, {}
+        for r in reports:
+            replicates.setdefault((r["site"], r["experiment"], r["sim_id"]), {})[r["csv_type"]] = r
+        for (site, experiment, _), outputs in replicates.items():
+            types, steps = by_experiment.setdefault((site, experiment), (set(), []))
+            types.update(outputs)
+            model = outputs.get("Model")
+            if model and not model["error"] and model["header_ok"] and model["complete"] \
+                    and model["last_step"] is not None:
+                steps.append(model["last_step"])
+        bad = {}
+        for key, outputs in replicates.items():
+            types, steps = by_experiment[key[:2]]
+            reasons = self.replicate_reasons(outputs, types, self.expected_step(*key[:2], steps))
+            if reasons:
+                bad[key] = "; ".join(reasons)
+        rows = [(site, experiment, sim_id, csv_type, path, bad[(site, experiment, sim_id)])
+                for site, experiment, sim_id, csv_type, path in files.select(
+                    po.col("site").cast(po.Utf8), po.col("experiment").cast(po.Utf8), "sim_id",
+                    po.col("csv_type").cast(po.Utf8), "path").iter_rows()
+                if (site, experiment, sim_id) in bad]
+        for (site, experiment, sim_id), reason in sorted(bad.items()):
+            print(f"[WARN] Quarantined {site}_{experiment}/rep_{sim_id}: {reason}")
+        print(f"[INFO] Checked {len(replicates)} replicates ({len(reports)} files): {len(bad)} quarantined")
+        return po.DataFrame(rows, schema=QUARANTINE_SCHEMA, orient="row")
@@ -5,79 +5,172 @@ import numpy as np
 import os
 import pathlib as pl
 import re
+import uuid
+import meta_utilz
 from summarize_snakes import CollateRattlesnake
 from summarize_bd import CollateBirthDeath
 from summarize_model import CollateModel
+from parallel_ingest import ParallelIngest
+from ingest_manifest import IngestManifest
+from parquet_store import ParquetStore
+from model_rollups import ModelRollups
+from snake_aggregates import RattlesnakeAggregates
+from replicate_stats import ReplicateStats
+from query_cache import QueryCache, data_version, normalize_sql
+from resource_profile import ResourceProfile
+from file_index import FileIndex
+from compact_schema import CompactSchema
+from ingest_metrics import IngestRecorder
+from sharded_ingest import ShardPlan
+from calendar_dim import CalendarDimension
+from agent_lifecycle import AgentLifecycle
+from replicate_samples import ReplicateSamples
+from summary_batch import SummaryBatch
+from integrity_check import IntegrityCheck
 
 
 class SimSummarizer:
     '''
     Builds path_db from simulation output directory
     and optionally coalesces all raw `.csv` files into a DuckDB database.
+    memory_limit, threads, temp_directory and max_temp_directory_size set
+    the DuckDB resource profile; ingest commits batches sized to the memory
+    limit (see resource_profile). experiments, a list of (site, experiment
+    folder name) pairs, limits the scan to those folders.
     '''
-    def __init__(self, parent_directory, site_names , db_path=None):
+    def __init__(self, parent_directory, site_names , db_path=None, storage="duckdb", dataset_dir=None,
+                 index_cache=None, scan_workers=16, cache_dir=None, cache_max_bytes=2_000_000_000,
+                 memory_limit=None, threads=None, temp_directory=None, max_temp_directory_size=None,
+                 experiments=None):
         self.parent_directory = pl.Path(parent_directory)
         self.site_names = site_names
+        if db_path:
+            db_path = pl.Path(db_path).resolve()
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            if index_cache is None:
+                index_cache = db_path.with_name(db_path.stem + "_file_index.parquet")
+        self.file_index = FileIndex(self.parent_directory, site_names, cache_path=index_cache, workers=scan_workers,
+                                    experiments=experiments)
         self.results_paths = {'model': [],
                               'rattlesnake': [],
                               'birthdeath': []}
-        self.path_db = self.make_path_db()
+        self._path_db = None
+        self.make_path_db()
         if db_path:
-            db_path = pl.Path(db_path).resolve()
-            db_path.parent.mkdir(parents=True, exist_ok=True)
             print(f"[INFO] Using persistent DuckDB at {db_path}")
             self.con = duckdb.connect(str(db_path))
         else:
             print(f"[INFO] Using in-memory DuckDB database")
             self.con = duckdb.connect(database=":memory:")
-
+        self.resources = ResourceProfile(memory_limit, threads, temp_directory, max_temp_directory_size)
+        self.resources.apply(self.con)
+        if self.resources.settings():
+            self.resources.report(self.con)
+        if storage not in ("duckdb", "parquet"):
+            raise ValueError(f"Unknown storage backend '{storage}'")
+        self.storage = storage
+        self.parquet_store = None
+        if storage == "parquet":
+            if dataset_dir is None:
+                raise ValueError("storage='parquet' requires a dataset_dir")
+            self.parquet_store = ParquetStore(self.con, dataset_dir)
+            self.open_dataset()
+        self.query_cache = QueryCache(cache_dir, cache_max_bytes) if cache_dir else None
+        # Keeps the cached results of in-memory databases sharing a cache_dir apart.
+        self.session_id = uuid.uuid4().hex
         
 
     def make_path_db(self):
-        path_db = {}
-        for subdir in self.parent_directory.iterdir():
-            if subdir.is_dir():
-                for site in self.site_names:
-                    if subdir.name.startswith(site + "_"):
-                        if site not in path_db:
-                            path_db[site] = {}
-                        experiment = subdir.name[len(site) + 1:] 
-                        results_folder = subdir / "Results"
-                        path_db[site][experiment] = {}
-
-                        if results_folder.exists():
-                            for sim_dir in results_folder.iterdir():
-                                if sim_dir.is_dir():
-                                    sim_id = sim_dir.name
-                                    path_db[site][experiment][sim_id] = {}
-
-                                    for file in sim_dir.glob("*.csv"):
-                                        csv_type = file.stem  # filename without extension
-                                        path_db[site][experiment][sim_id][csv_type] = file.resolve()
-                                        if csv_type == "Model":
-                                            self.results_paths['model'].append(file.resolve())
-                                        elif csv_type == "Rattlesnake":
-                                            self.results_paths['rattlesnake'].append(file.resolve())
-                                        elif csv_type == "BirthDeath":
-                                            self.results_paths['birthdeath'].append(file.resolve())
-                                        elif csv_type == "KangarooRat":
-                                            pass
-                                        else:
-                                            print(f"[WARN] Unrecognized CSV type '{csv_type}' in {file}")
-        return path_db
+        """
+        Scan the results tree into self.file_index and fill results_paths.
+        Returns the legacy nested path_db dict.
+        """
+        self.file_index.scan()
+        self.fill_results_paths()
+        for csv_type, path in self.file_index.unrecognized(
+                ["Model", "Rattlesnake", "BirthDeath", "KangarooRat"]).select(["csv_type", "path"]).iter_rows():
+            print(f"[WARN] Unrecognized CSV type '{csv_type}' in {path}")
+        return self.path_db
+
+    def fill_results_paths(self):
+        self.results_paths = {'model': self.file_index.paths("Model"),
+                              'rattlesnake': self.file_index.paths("Rattlesnake"),
+                              'birthdeath': self.file_index.paths("BirthDeath")}
+        self._path_db = None
+        return
+
+    def select_experiments(self, keys):
+        """
+        Limit ingest to the given (site, experiment folder name) pairs,
+        e.g. [("Texas", "Current"), ("Texas", "1")].
+        """
+        self.file_index.restrict(keys)
+        self.fill_results_paths()
+        return
+
+    def check_integrity(self, last_step=None, workers=None):
+        """
+        Validate every indexed replicate from its file headers and tails
+        (see integrity_check) and leave the failing ones out of ingest. The
+        quarantine list is returned, kept as self.quarantine and stored in
+        the ingest_quarantine table.
+        """
+        check = IntegrityCheck(last_step, workers or self.file_index.workers)
+        self.quarantine = check.run(self.file_index.files)
+        replicates = set(self.quarantine.select(["site", "experiment", "sim_id"]).iter_rows())
+        if replicates:
+            self.file_index.exclude(replicates)
+            self.fill_results_paths()
+        quarantine = self.quarantine.to_arrow()
+        self.con.execute("CREATE OR REPLACE TABLE ingest_quarantine AS SELECT * FROM quarantine")
+        return self.quarantine
+
+    @property
+    def path_db(self):
+        """
+        site -> experiment -> rep_<id> -> csv_type -> Path, built from the
+        file index on first use.
+        """
+        if self._path_db is None:
+            self._path_db = self.file_index.to_path_db()
+        return self._path_db
     
     def make_metadata_path_db(self):
-        path_db = {}
-        for subdir in self.parent_directory.iterdir():
-            if subdir.is_dir():
-                for site in self.site_names:
-                    if subdir.name.startswith(site + "_"):
-                        if site not in path_db:
-                            path_db[site] = {}
-                        experiment = subdir.name[len(site) + 1:] 
-                        results_folder = subdir / "Results"
-                        path_db[site][experiment] = {}
-        return None
+        """
+        site -> experiment -> list of sim_ids, from the file index.
+        """
+        return self.file_index.to_metadata_db()
+
+    def collators(self):
+        return [CollateModel(self.path_db, self.con),
+                CollateRattlesnake(self.path_db, self.con),
+                CollateBirthDeath(self.path_db, self.con)]
+
+    def open_dataset(self):
+        """
+        Expose every table already present in the parquet dataset as a view.
+        """
+        available = self.parquet_store.available_tables()
+        for collator in self.collators():
+            if collator.table_name in available:
+                self.parquet_store.create_view(collator.table_name, collator.site_column)
+        derived = (ModelRollups(self.con).table_names() + RattlesnakeAggregates(self.con).table_names()
+                   + AgentLifecycle(self.con).table_names())
+        for table in derived:
+            if table in available:
+                self.parquet_store.create_view(table, "Study_Site")
+        if all(table in available for table in AgentLifecycle(self.con).table_names()):
+            AgentLifecycle(self.con).create_view()
+        return
+
+    def attach_shards(self, shard_dir):
+        """
+        Attach the shard databases of a sharded ingest (see sharded_ingest)
+        read-only and expose model_db, rattlesnake_db, birthdeath_db and the
+        derived tables as views over all shards.
+        """
+        self.shard_plan = ShardPlan.load(shard_dir)
+        return self.shard_plan.attach(self.con)
 
     def get_path_db(self):
         return self.path_db
@@ -87,31 +180,381 @@ class SimSummarizer:
 
     
     
-    def initialize_tables(self, model=True, rattlesnake=True, bd=True):
+    def initialize_tables(self, model=True, rattlesnake=True, bd=True, bulk=True, batch_size=None, workers=1,
+                          incremental=False, compact=False, declared=True, strict=False, aggregate_snakes=False,
+                          calendar=False, samples=None, validate=False):
         """
         Initialize the DuckDB tables for model, rattlesnake, and birth-death data.
+        With bulk=True each table is loaded with one multi-file scan per batch
+        of batch_size files instead of one INSERT per csv. With workers > 1
+        the csvs are converted to parquet shards in a process pool and merged
+        into each table in one pass.
+        With incremental=True existing tables are kept and only files that are
+        new or changed since the last run (per the ingest manifest) are loaded;
+        an interrupted run resumes from its last committed batch.
+        With compact=True each loaded table is rewritten with ENUM categoricals,
+        narrow calendar integers and clustered row order (see compact_schema).
+        declared=True reads csvs with the column types from schemas.py and no
+        sniffing; strict=True also rejects files whose header differs.
+        With aggregate_snakes=True the Rattlesnake csvs only feed the occupancy
+        count and per-agent daily tables (see snake_aggregates); the hourly
+        agent rows are not kept and rattlesnake_db is left untouched.
+        With calendar=True Hour, Day, Month and Year are kept once per site
+        and Time_Step in the calendar table; the rows go to model_facts,
+        rattlesnake_facts and birthdeath_facts and the *_db names become
+        views joining the calendar back in (see calendar_dim).
+        The Rattlesnake and BirthDeath batches also maintain the per-agent
+        lifecycle index (see agent_lifecycle).
+        samples, e.g. (0.01, 0.1), keeps stratified replicate samples of the
+        loaded tables at those fractions for approximate queries (see
+        replicate_samples and query_sim_table); incremental runs keep
+        maintaining the samples of earlier runs.
+        With validate=True check_integrity() runs first and the replicates
+        it quarantines are not loaded.
         """
+        if incremental and self.storage == "parquet":
+            raise ValueError("Incremental ingest is only supported with storage='duckdb'")
+        if calendar and self.storage == "parquet":
+            raise ValueError("The calendar layout is only supported with storage='duckdb'")
+        if samples and self.storage == "parquet":
+            raise ValueError("Replicate samples are only supported with storage='duckdb'")
+        if validate:
+            self.check_integrity()
+        self.manifest = IngestManifest(self.con)
+        self.recorder = IngestRecorder(self.con)
+        self.recorder.start_run()
+        self.compactor = CompactSchema(self.con)
+        self.compact = compact
+        self.calendar = CalendarDimension(self.con)
+        if calendar:
+            # Start a fresh calendar only when every table that joins it is rebuilt.
+            rebuild_all = not incremental and model and rattlesnake and bd and not aggregate_snakes
+            self.calendar.create_table(replace=rebuild_all)
+        self.samples = ReplicateSamples(self.con)
+        self.sample_fractions = samples
+        self.failed_files = {}
+        self.lifecycle = AgentLifecycle(self.con)
+        lifecycle_missing = incremental and not self.lifecycle.tables_exist()
+        lifecycle_tables = self.lifecycle.table_names(spans=rattlesnake, events=bd)
+        if self.parquet_store:
+            for table in lifecycle_tables:
+                self.parquet_store.drop_view(table)
+        self.lifecycle.create_tables(spans=rattlesnake, events=bd, replace=not incremental)
         if model:
-            self.mdb = CollateModel(self.path_db, self.con)
-            self.mdb.create_table()
+            self.mdb = CollateModel(self.path_db, self.con, declared=declared, strict=strict,
+                                    calendar=calendar)
             model_csvs = self.results_paths['model']
-            self.mdb.insert_all(csv_list=model_csvs)
+            self.rollups = ModelRollups(self.con, self.mdb.view_name, self.mdb.site_column)
+            if self.parquet_store:
+                for table in self.rollups.table_names():
+                    self.parquet_store.drop_view(table)
+            rollups_missing = incremental and not self.table_exists(self.rollups.table_name("daily"))
+            self.rollups.create_tables(replace=not incremental)
+            self.failed_files['model'] = self.load_table(self.mdb, model_csvs, bulk, batch_size, workers, incremental,
+                                                         on_commit=None if rollups_missing else self.rollups.refresh)
+            if rollups_missing:
+                self.rollups.rebuild()
+            if self.parquet_store:
+                for table in self.rollups.table_names():
+                    self.parquet_store.publish_table(table, self.mdb.site_column)
         if rattlesnake:
-            self.rdb = CollateRattlesnake(self.path_db, self.con)
-            self.rdb.create_table()
+            self.rdb = CollateRattlesnake(self.path_db, self.con, declared=declared, strict=strict,
+                                          calendar=calendar)
             snake_csvs = self.results_paths['rattlesnake']
-            self.rdb.insert_all(csv_list=snake_csvs)
+            spans = self.lifecycle.span_refresher(self.rdb.site_column)
+            if aggregate_snakes:
+                self.failed_files['rattlesnake'] = self.load_aggregates(self.rdb, snake_csvs, bulk, batch_size,
+                                                                        workers, incremental, on_commit=spans)
+            else:
+                self.failed_files['rattlesnake'] = self.load_table(self.rdb, snake_csvs, bulk, batch_size, workers,
+                                                                   incremental, on_commit=spans)
         if bd:
-            self.bddb = CollateBirthDeath(self.path_db, self.con)
-            self.bddb.create_table()
+            self.bddb = CollateBirthDeath(self.path_db, self.con, declared=declared, strict=strict,
+                                          calendar=calendar)
             bd_csvs = self.results_paths['birthdeath']
-            self.bddb.insert_all(csv_list=bd_csvs)
-    
-    def query_sim_table(self, query):
+            self.failed_files['birthdeath'] = self.load_table(self.bddb, bd_csvs, bulk, batch_size, workers, incremental,
+                                                              on_commit=self.lifecycle.event_refresher(self.bddb.site_column))
+        if lifecycle_missing:
+            calendar = CalendarDimension(self.con)
+            self.lifecycle.rebuild(
+                rattlesnake_table="rattlesnake_db" if calendar.object_type("rattlesnake_db") else None,
+                birthdeath_table="birthdeath_db" if calendar.object_type("birthdeath_db") else None)
+        if self.parquet_store:
+            for table in lifecycle_tables:
+                self.parquet_store.publish_table(table, self.lifecycle.site_column)
+        self.recorder.finish_run()
+
+    def make_loader(self, collator, bulk=True, batch_size=None, workers=1):
+        """
+        The staging loader for manifest.sync and the number of files it takes per batch.
+        """
+        if workers and workers > 1:
+            workers = self.resources.worker_count(self.con, workers)
+            engine = ParallelIngest(self.con, workers=workers, files_per_shard=batch_size or collator.bulk_batch_size,
+                                    shard_dir=self.resources.temp_directory,
+                                    settings=self.resources.worker_settings(self.con, workers),
+                                    main_memory_limit=self.resources.main_memory(self.con),
+                                    memory_limit=self.resources.memory_limit)
+            loader = lambda files, table: engine.ingest(collator, files, table=table)
+            sync_batch = engine.workers * engine.files_per_shard
+        else:
+            loader = lambda files, table: collator.insert_all(csv_list=files, bulk=bulk, batch_size=batch_size, table=table)
+            sync_batch = batch_size or collator.bulk_batch_size
+        return loader, sync_batch
+
+    def load_table(self, collator, csv_list, bulk=True, batch_size=None, workers=1, incremental=False,
+                   on_commit=None):
+        if self.parquet_store:
+            self.parquet_store.drop_view(collator.table_name)
+        if self.calendar.prepare(collator, incremental):
+            self.compactor.rename(collator.view_name, collator.table_name)
+        collator.create_table(replace=not incremental)
+        if not incremental:
+            self.manifest.forget(collator.view_name)
+            for table in {collator.view_name, collator.table_name}:
+                self.compactor.forget(table)
+        samples_missing = self.samples.prepare(collator, self.sample_fractions, incremental)
+
+        def refresh(staging, loaded):
+            self.samples.refresh(collator, staging, loaded)
+            if on_commit:
+                on_commit(staging, loaded)
+
+        if collator.calendar:
+            staging_sql = collator.schema.empty_sql()
+        else:
+            staging_sql = self.compactor.staging_sql(collator.table_name)
+        # Batches added to a compacted table keep its clustering.
+        order_by = None
+        if self.compactor.is_compact(collator.table_name):
+            order_by = self.compactor.cluster_keys(collator.site_column)
+        loader, sync_batch = self.make_loader(collator, bulk, batch_size, workers)
+        failed = self.manifest.sync(collator, csv_list, loader, batch_size=sync_batch, on_commit=refresh,
+                                    staging_sql=staging_sql,
+                                    on_staged=lambda staging: self.absorb_staging(collator, staging),
+                                    recorder=self.recorder, manifest_key=collator.view_name,
+                                    batch_bytes=self.resources.batch_bytes(self.con), order_by=order_by)
+        if self.compact and not self.compactor.is_compact(collator.table_name):
+            self.compactor.compact(collator.table_name, collator.site_column)
+        if collator.calendar:
+            self.calendar.create_view(collator.schema)
+        if samples_missing:
+            self.samples.rebuild(collator)
+        if self.parquet_store:
+            self.parquet_store.publish_table(collator.table_name, collator.site_column)
+        return failed
+
+    def absorb_staging(self, collator, staging):
+        self.compactor.absorb(collator.table_name, staging)
+        if collator.calendar:
+            self.calendar.absorb(staging, collator.site_column)
+        return
+
+    def load_aggregates(self, collator, csv_list, bulk=True, batch_size=None, workers=1, incremental=False,
+                        on_commit=None):
+        """
+        Stream the Rattlesnake csvs through staging into the aggregate tables
+        only, one committed batch at a time. on_commit(staging, loaded_files)
+        also runs for every batch.
+        """
+        self.snake_aggregates = RattlesnakeAggregates(self.con, collator.view_name, collator.site_column)
+        key = "rattlesnake_aggregates"
+        tables = self.snake_aggregates.table_names()
+        if self.parquet_store:
+            for table in tables:
+                self.parquet_store.drop_view(table)
+        if not incremental or not self.snake_aggregates.tables_exist():
+            self.manifest.forget(key)
+        self.snake_aggregates.create_tables(replace=not incremental)
+
+        def refresh(staging, loaded):
+            self.snake_aggregates.refresh(staging, loaded)
+            if on_commit:
+                on_commit(staging, loaded)
+
+        loader, sync_batch = self.make_loader(collator, bulk, batch_size, workers)
+        failed = self.manifest.sync(collator, csv_list, loader, batch_size=sync_batch,
+                                    on_commit=refresh,
+                                    staging_sql=collator.schema.empty_sql(),
+                                    recorder=self.recorder, persist=False, manifest_key=key,
+                                    batch_bytes=self.resources.batch_bytes(self.con))
+        if self.parquet_store:
+            for table in tables:
+                self.parquet_store.publish_table(table, collator.site_column)
+        return failed
+
+    def replicate_statistics(self, metrics=None, grain="daily", table=None, where=None,
+                             quantiles=(0.025, 0.5, 0.975), n_boot=1000, ci=0.95, seed=None):
+        """
+        Mean, SD, quantiles and bootstrap CIs of the mean across replicates,
+        per site, experiment and `grain` bucket, for every metric at once.
+        Without `table` the per-sim values come from the model rollups and
+        metrics are their output names (default: all of them); with `table`
+        metrics are columns of that table averaged per sim and bucket, and
+        grain may also be 'hourly'. Pass seed for reproducible CIs.
+        Returns a long DataFrame with one row per bucket and metric.
+        """
+        if table is None:
+            stats = ReplicateStats(self.con)
+            source, metrics = stats.rollup_source(grain, metrics)
+        else:
+            if not metrics:
+                raise ValueError("metrics are required when summarizing a table")
+            site_column = {c.table_name: c.site_column for c in self.collators()}.get(table, "Study_Site")
+            stats = ReplicateStats(self.con, site_column)
+            source, metrics = stats.table_source(table, grain, metrics)
+        return stats.summarize(source, metrics, grain, where, quantiles, n_boot, ci, seed)
+
+    def summarize_snakes(self, dimension="Behavior", where=None):
+        """
+        Behavior (or Microhabitat) counts and proportions per site, experiment
+        and time step, from the aggregate tables.
+        """
+        return self.query_sim_table(RattlesnakeAggregates(self.con).occupancy_sql(dimension, where))
+
+    def run_summaries(self, spec, output_dir=None, jobs=None):
+        """
+        Run a batch of summaries (a list of summary dicts or a JSON spec
+        file, see summary_batch) with one scan per table, writing those with
+        an output path under output_dir. Returns {name: DataFrame or path}.
+        """
+        if isinstance(spec, (str, pl.Path)):
+            batch = SummaryBatch.from_json(self.con, spec)
+        else:
+            batch = SummaryBatch(self.con, spec)
+        return batch.run(output_dir, jobs)
+
+    def export_ingest_metrics(self, output_path, run_id=None):
+        """
+        Write per-file timings, per-table throughput and the failure ledger
+        of an ingest run (default: the latest) to a JSON file.
+        """
+        return IngestRecorder(self.con, progress=False).export_json(output_path, run_id)
+
+    def table_exists(self, name):
+        return self.con.execute(
+            "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = ?", [name]).fetchone()[0] > 0
+
+    def agent_history(self, agent_id, site=None, experiment=None, sim_id=None, table="rattlesnake_db"):
+        """
+        Every row of one rattlesnake in `table`, in each sim matching the
+        optional site, experiment (Experiment value, e.g. 0) and sim_id,
+        read through the agent lifecycle index.
+        """
+        query = AgentLifecycle(self.con).history_sql(agent_id, site, experiment, sim_id, table)
+        if query is None:
+            print(f"[WARN] Agent {agent_id} is not in the agent lifecycle index")
+            return None
+        return self.query_sim_table(query)
+
+    def survival_curves(self, where=None, by=None):
+        """
+        Kaplan-Meier survival by age of the rattlesnake cohort matching
+        `where` (a predicate on agent_lifecycle, e.g. "born_in_sim AND
+        birth_step >= 8760"), per site and experiment or the `by` columns.
+        """
+        return self.query_sim_table(AgentLifecycle(self.con).survival_sql(where, by))
+
+    def date_filter(self, start=None, end=None, site_column="Study_Site"):
+        """
+        WHERE predicate for the rows of a calendar-layout table dated start
+        to end (ISO dates, inclusive), as per-site Time_Step ranges.
+        """
+        return CalendarDimension(self.con).step_filter(site_column, start, end)
+
+    def summarize_model(self, grain="daily", where=None):
+        """
+        Standard cross-sim model summary per site, experiment and `grain`
+        ('daily', 'monthly' or 'yearly'), answered from the rollup tables.
+        """
+        if not hasattr(self, "rollups"):
+            self.rollups = ModelRollups(self.con)
+        return self.query_sim_table(self.rollups.summary_sql(grain, where))
+
+    def query_sim_table(self, query, result="pandas", batch_size=1_000_000, cache=True, approx=None, ci=0.95):
+        """
+        Execute a query on the simulation table and return the results.
+        With a cache_dir set, 'pandas', 'arrow' and 'polars' results of
+        read-only queries are served from the on-disk query cache until
+        ingest changes the data; cache=False bypasses it.
+        result selects the output form:
+            'pandas'  - pandas DataFrame (default)
+            'arrow'   - pyarrow Table
+            'batches' - pyarrow RecordBatchReader streaming batch_size rows at a time
+            'polars'  - polars DataFrame, converted from Arrow without a pandas copy
+            'lazy'    - polars LazyFrame that pulls from DuckDB when collected
+        With approx set to a sample fraction (e.g. 0.01) the query runs on
+        the replicate samples kept at that fraction instead of the full
+        tables and must return one row per replicate (sim_id, Experiment and
+        site columns); the result is a pandas DataFrame of scaled estimates
+        with ci bounds (see approximate_query).
+        """
+        if approx:
+            return self.approximate_query(query, approx, ci)
+        if cache and self.query_cache and result in ("pandas", "arrow", "polars") and self.is_read_only(query):
+            return self.cached_query(query, result)
+        if result == "pandas":
+            return self.con.execute(query).fetchdf()
+        if result == "arrow":
+            return self.con.execute(query).fetch_arrow_table()
+        if result == "batches":
+            cursor = self.con.cursor()
+            res = cursor.execute(query)
+            if hasattr(res, "to_arrow_reader"):
+                return res.to_arrow_reader(batch_size)
+            return res.fetch_record_batch(batch_size)
+        if result == "polars":
+            return self.con.execute(query).pl()
+        if result == "lazy":
+            return self.con.sql(query).pl(lazy=True)
+        raise ValueError(f"Unknown result type '{result}'")
+
+    def approximate_query(self, query, fraction, ci=0.95):
+        """
+        Run a per-replicate query against the replicate samples at fraction
+        and estimate, per key group and metric, the mean over all replicates
+        and the total (mean times replicates ingested), with ci bounds from
+        the between-replicate variance (see ReplicateSamples.estimate).
+        The replicate counts come from the first sampled table in the query.
+        """
+        samples = ReplicateSamples(self.con)
+        sql, tables = samples.sample_sql(query, fraction)
+        per_replicate = self.con.execute(sql).fetchdf()
+        return samples.estimate(per_replicate, samples.population(tables[0]), ci)
+
+    def is_read_only(self, query):
+        first = normalize_sql(query).split(" ", 1)[0].lower()
+        return first in ("select", "with", "from", "pivot", "unpivot", "values")
+
+    def cached_query(self, query, result="pandas"):
+        version = data_version(self.con, self.session_id)
+        table = self.query_cache.get(query, version)
+        if table is None:
+            table = self.con.execute(query).fetch_arrow_table()
+            self.query_cache.put(query, version, table)
+        if result == "arrow":
+            return table
+        if result == "polars":
+            return po.from_arrow(table)
+        return table.to_pandas()
+
+    def cache_stats(self):
+        """
+        Entries, bytes, hits, misses and evictions of the query cache.
+        """
+        return self.query_cache.stats() if self.query_cache else None
+
+    def export_query(self, query, output_path, file_format=None, compression=None):
         """
-        Execute a query on the simulation table and return the results as a DataFrame.
+        Write the result of query straight to a Parquet or CSV file with
+        DuckDB's COPY, without materializing it in Python.
+        file_format defaults to the output_path suffix.
         """
-        return self.con.execute(query).fetchdf()
+        output_path = pl.Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        self.con.execute(meta_utilz.copy_sql(query, output_path, file_format, compression))
+        print(f"[INFO] Query results written to: {output_path}")
+        return output_path
     
     
 
@@ -131,37 +574,8 @@ if __name__ == "__main__":
     # Optional: create tables
     simsum.initialize_tables(model=True, rattlesnake=False, bd=True)
 
-    # # Query
-    df = simsum.query_sim_table("""
-            SELECT
-            Study_Site,
-            Experiment,
-            Year,
-            Month,
-            Day,
-            AVG(Rattlesnakes) AS Avg_Rattlesnakes,
-            AVG(Krats) AS Avg_Krats,
-            AVG(Rattlesnakes_Density) AS Avg_Rattlesnakes_Density,
-            AVG(Krats_Density) AS Avg_Krats_Density,
-            AVG(Rattlesnakes_Active) AS Avg_Rattlesnakes_Active,
-            AVG(Krats_Active) AS Avg_Krats_Active,
-            AVG(Foraging) AS Avg_Foraging,
-            AVG(Thermoregulating) AS Avg_Thermoregulating,
-            AVG(Resting) AS Avg_Resting,
-            AVG(Searching) AS Avg_Searching,
-            AVG(Brumating) AS Avg_Brumating,
-            AVG(Snakes_in_Burrow) AS Avg_Snakes_in_Burrow,
-            AVG(Snakes_in_Open) AS Avg_Snakes_in_Open,
-            AVG(mean_thermal_quality) AS Avg_Mean_Thermal_Quality,
-            AVG(mean_thermal_accuracy) AS Avg_Mean_Thermal_Accuracy,
-            SUM(count_interactions) AS Total_Interactions,
-            SUM(count_successful_interactions) AS Total_Successful_Interactions,
-            SUM(mean_thermal_accuracy * Rattlesnakes) / SUM(Rattlesnakes) AS Weighted_Mean_Thermal_Accuracy,
-            SUM(mean_thermal_quality * Rattlesnakes) / SUM(Rattlesnakes) AS Weighted_Mean_Thermal_Quality,
-            COUNT(DISTINCT Sim_ID) AS Num_Sims
-            FROM model_db
-            GROUP BY Study_Site, Experiment, Year, Month, Day
-            """)
+    # Daily averages per site and experiment, answered from the model rollups
+    df = simsum.summarize_model(grain="daily")
     # df = simsum.query_sim_table("""
     #     SELECT Study_Site,
     #         Experiment,
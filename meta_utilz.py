@@ -16,3 +16,84 @@ def extract_sim_id(path):
     rep_simid = path.parts[-2]
     sim_id = rep_simid.split('_')[1]
     return int(sim_id)
+
+# SQL counterparts of the extractors above, evaluated against the `filename`
+# column that read_csv adds when called with filename=true. They let a single
+# multi-file scan tag every row with its site, experiment and sim_id.
+def _path_part_sql(index, filename_col='filename'):
+    return f"string_split(replace({filename_col}, '\\', '/'), '/')[{index}]"
+
+def site_sql(filename_col='filename'):
+    site_exp = _path_part_sql(-4, filename_col)
+    return f"split_part({site_exp}, '_', 1)"
+
+def experiment_sql(filename_col='filename'):
+    site_exp = _path_part_sql(-4, filename_col)
+    exp = f"split_part({site_exp}, '_', 2)"
+    return f"CASE WHEN {exp} = 'Current' THEN 0 ELSE CAST({exp} AS INTEGER) END"
+
+def sim_id_sql(filename_col='filename'):
+    rep_simid = _path_part_sql(-2, filename_col)
+    return f"CAST(split_part({rep_simid}, '_', 2) AS INTEGER)"
+
+def sql_file_list(paths):
+    quoted = ", ".join("'" + str(p).replace("'", "''") + "'" for p in paths)
+    return f"[{quoted}]"
+
+def path_keys_sql(paths):
+    """
+    Subquery yielding the (site, experiment, sim_id) key of every path, with
+    experiment as TEXT to match the Experiment columns.
+    """
+    files = sql_file_list(paths)
+    return f"""
+        SELECT DISTINCT
+            filename AS path,
+            {site_sql()} AS site,
+            CAST({experiment_sql()} AS TEXT) AS experiment,
+            {sim_id_sql()} AS sim_id
+        FROM (SELECT unnest({files}) AS filename)
+    """
+
+# Accepted encodings of a simulation output, most preferred first. A rep
+# folder caught mid-archival can hold two of them for the same output.
+OUTPUT_SUFFIXES = ('.parquet', '.csv.zst', '.csv.gz', '.csv')
+
+def split_output_name(name):
+    """
+    (csv_type, suffix) of an output file name such as 'Model.csv.gz', or
+    (None, None) for files that are not simulation outputs.
+    """
+    for suffix in OUTPUT_SUFFIXES:
+        if name.endswith(suffix) and len(name) > len(suffix):
+            return name[:-len(suffix)], suffix
+    return None, None
+
+def is_parquet(path):
+    return str(path).endswith('.parquet')
+
+def source_key(path):
+    """
+    The rep folder and csv_type of an output, the same for every encoding of it.
+    """
+    path = pl.Path(path)
+    return str(path.parent), split_output_name(path.name)[0]
+
+def copy_sql(query, output_path, file_format=None, compression=None):
+    """
+    COPY statement writing the result of query to a Parquet (zstd by
+    default) or CSV file; file_format defaults to the output_path suffix.
+    """
+    output_path = pl.Path(output_path)
+    file_format = (file_format or output_path.suffix.lstrip(".") or "parquet").lower()
+    if file_format not in ("parquet", "csv"):
+        raise ValueError(f"Unsupported export format '{file_format}'")
+    options = [f"FORMAT {file_format}"]
+    if file_format == "csv":
+        options.append("HEADER true")
+    if compression:
+        options.append(f"COMPRESSION {compression}")
+    elif file_format == "parquet":
+        options.append("COMPRESSION zstd")
+    query = query.strip().rstrip(";")
+    return f"COPY ({query}) TO '{output_path}' ({', '.join(options)})"
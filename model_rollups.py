@@ -0,0 +1,134 @@
+#!/usr/bin/python
+import meta_utilz
+
+# Hourly model_db columns reported as means in the standard summaries,
+# with the output names used by the original daily query in main.py.
+MEAN_METRICS = {
+    "Rattlesnakes": "Avg_Rattlesnakes",
+    "Krats": "Avg_Krats",
+    "Rattlesnakes_Density": "Avg_Rattlesnakes_Density",
+    "Krats_Density": "Avg_Krats_Density",
+    "Rattlesnakes_Active": "Avg_Rattlesnakes_Active",
+    "Krats_Active": "Avg_Krats_Active",
+    "Foraging": "Avg_Foraging",
+    "Thermoregulating": "Avg_Thermoregulating",
+    "Resting": "Avg_Resting",
+    "Searching": "Avg_Searching",
+    "Brumating": "Avg_Brumating",
+    "Snakes_in_Burrow": "Avg_Snakes_in_Burrow",
+    "Snakes_in_Open": "Avg_Snakes_in_Open",
+    "mean_thermal_quality": "Avg_Mean_Thermal_Quality",
+    "mean_thermal_accuracy": "Avg_Mean_Thermal_Accuracy",
+}
+# Columns reported as totals.
+SUM_METRICS = {
+    "count_interactions": "Total_Interactions",
+    "count_successful_interactions": "Total_Successful_Interactions",
+}
+# Means weighted by the number of rattlesnakes alive in the hour.
+WEIGHTED_METRICS = {
+    "mean_thermal_accuracy": "Weighted_Mean_Thermal_Accuracy",
+    "mean_thermal_quality": "Weighted_Mean_Thermal_Quality",
+}
+WEIGHT = "Rattlesnakes"
+
+GRAINS = {
+    "daily": ["Year", "Month", "Day"],
+    "monthly": ["Year", "Month"],
+    "yearly": ["Year"],
+}
+
+
+class ModelRollups:
+    '''
+    Per-sim daily, monthly and yearly rollups of model_db. The rollups hold
+    sums and non-null counts rather than averages, so any coarser summary
+    (across sims, or the weighted thermal means) can be recombined exactly.
+    They are refreshed from each committed ingest batch, so incremental
+    loads only touch the sims that were added or changed.
+    '''
+    def __init__(self, con, source_table="model_db", site_column="Study_Site"):
+        self.con = con
+        self.source_table = source_table
+        self.site_column = site_column
+
+    def table_name(self, grain):
+        return f"model_rollup_{grain}"
+
+    def table_names(self):
+        return [self.table_name(grain) for grain in GRAINS]
+
+    def create_tables(self, replace=True):
+        clause = "CREATE OR REPLACE TABLE" if replace else "CREATE TABLE IF NOT EXISTS"
+        for grain, time_keys in GRAINS.items():
+            columns = [f"{self.site_column} TEXT", "Experiment TEXT", "sim_id INTEGER"]
+            columns += [f"{key} INTEGER" for key in time_keys]
+            columns += ["n_rows BIGINT"]
+            columns += [f"sum_{m} DOUBLE, n_{m} BIGINT" for m in MEAN_METRICS]
+            columns += [f"sum_{m} BIGINT" for m in SUM_METRICS]
+            columns += [f"wsum_{m} DOUBLE" for m in WEIGHTED_METRICS]
+            self.con.execute(f"""
+            {clause} {self.table_name(grain)} (
+                {", ".join(columns)}
+            );
+            """)
+        return
+
+    def aggregate_sql(self, source, grain):
+        keys = [self.site_column, "Experiment", "sim_id"] + GRAINS[grain]
+        aggs = ["COUNT(*) AS n_rows"]
+        aggs += [f"SUM({m}) AS sum_{m}, COUNT({m}) AS n_{m}" for m in MEAN_METRICS]
+        aggs += [f"SUM({m}) AS sum_{m}" for m in SUM_METRICS]
+        aggs += [f"SUM({m} * {WEIGHT}) AS wsum_{m}" for m in WEIGHTED_METRICS]
+        return f"""
+            SELECT {", ".join(keys)}, {", ".join(aggs)}
+            FROM {source}
+            GROUP BY {", ".join(keys)}
+        """
+
+    def rebuild(self):
+        """
+        Recompute every rollup from the full source table.
+        """
+        self.create_tables(replace=True)
+        for grain in GRAINS:
+            self.con.execute(f"INSERT INTO {self.table_name(grain)} {self.aggregate_sql(self.source_table, grain)}")
+        return
+
+    def refresh(self, staging_table, csv_list):
+        """
+        Replace the rollup rows of the sims behind csv_list with aggregates of
+        staging_table, which holds exactly the freshly loaded rows of those files.
+        Meant to run inside the ingest batch transaction.
+        """
+        if not csv_list:
+            return
+        for grain in GRAINS:
+            table = self.table_name(grain)
+            self.con.execute(f"""
+                DELETE FROM {table} t
+                USING ({meta_utilz.path_keys_sql(csv_list)}) k
+                WHERE t.{self.site_column} = k.site
+                  AND t.Experiment = k.experiment
+                  AND t.sim_id = k.sim_id
+            """)
+            self.con.execute(f"INSERT INTO {table} {self.aggregate_sql(staging_table, grain)}")
+        return
+
+    def summary_sql(self, grain="daily", where=None):
+        """
+        The standard cross-sim summary at `grain`, answered from the rollups.
+        Column names match the hourly model_db query it replaces.
+        """
+        keys = [self.site_column, "Experiment"] + GRAINS[grain]
+        cols = [f"SUM(sum_{m}) / SUM(n_{m}) AS {alias}" for m, alias in MEAN_METRICS.items()]
+        cols += [f"SUM(sum_{m}) AS {alias}" for m, alias in SUM_METRICS.items()]
+        cols += [f"SUM(wsum_{m}) / SUM(sum_{WEIGHT}) AS {alias}" for m, alias in WEIGHTED_METRICS.items()]
+        cols += ["COUNT(DISTINCT sim_id) AS Num_Sims"]
+        where_sql = f"WHERE {where}" if where else ""
+        return f"""
+            SELECT {", ".join(keys)}, {", ".join(cols)}
+            FROM {self.table_name(grain)}
+            {where_sql}
+            GROUP BY {", ".join(keys)}
+        """
@@ -0,0 +1,89 @@
+#!/usr/bin/python
+import duckdb
+import os
+import pathlib as pl
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def convert_batch(collate_cls, reader_options, csv_list, shard_path, settings=None):
+    """
+    Worker: load one batch of csvs into a private in-memory DuckDB with the
+    same Collate class the serial path uses, and write it out as a parquet shard.
+    settings are applied to the private connection (default: one thread).
+    Returns (shard_path, rows, failed_files, errors).
+    """
+    con = duckdb.connect(database=":memory:")
+    for name, value in (settings or {"threads": 1}).items():
+        con.execute(f"SET {name} = ?", [value])
+    collator = collate_cls({}, con, **reader_options)
+    collator.create_table()
+    failed = collator.insert_all(csv_list=csv_list)
+    rows = con.execute(f"SELECT COUNT(*) FROM {collator.table_name}").fetchone()[0]
+    if rows:
+        con.execute(f"COPY {collator.table_name} TO '{shard_path}' (FORMAT parquet, COMPRESSION zstd)")
+    con.close()
+    return (str(shard_path) if rows else None), rows, failed, collator.errors
+
+
+class ParallelIngest:
+    '''
+    Converts batches of raw csvs to parquet shards in a process pool, then
+    merges all shards of a table into the target connection in one INSERT.
+    settings configure each worker's DuckDB connection; main_memory_limit,
+    if given, is the target connection's memory_limit while the workers run,
+    after which memory_limit (default: the current setting) is restored.
+    '''
+    def __init__(self, con, workers=None, files_per_shard=200, shard_dir=None, settings=None,
+                 main_memory_limit=None, memory_limit=None):
+        self.con = con
+        self.settings = settings
+        self.main_memory_limit = main_memory_limit
+        self.memory_limit = memory_limit
+        self.workers = workers or os.cpu_count()
+        self.files_per_shard = files_per_shard
+        self.shard_dir = pl.Path(shard_dir) if shard_dir else None
+
+    def ingest(self, collator, csv_list, table=None):
+        """
+        Load csv_list into collator.table_name (or into `table`). The table
+        must already exist. Returns the list of files that could not be loaded.
+        """
+        if not csv_list:
+            return []
+        table = table or collator.table_name
+        work_dir = pl.Path(tempfile.mkdtemp(prefix=f"{table}_shards_", dir=self.shard_dir))
+        batches = [csv_list[i:i + self.files_per_shard]
+                   for i in range(0, len(csv_list), self.files_per_shard)]
+        shards, failed, shard_rows = [], [], 0
+        print(f"[INFO] Converting {len(csv_list)} files for {table} in {len(batches)} shards "
+              f"on {self.workers} workers")
+        memory_limit = self.memory_limit or self.con.execute("SELECT current_setting('memory_limit')").fetchone()[0]
+        try:
+            if self.main_memory_limit:
+                self.con.execute("SET memory_limit = ?", [self.main_memory_limit])
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(convert_batch, type(collator), collator.reader_options(), batch,
+                                       work_dir / f"shard_{i:06d}.parquet", self.settings)
+                           for i, batch in enumerate(batches)]
+                for future in as_completed(futures):
+                    shard, rows, batch_failed, errors = future.result()
+                    collator.errors.update(errors)
+                    if shard:
+                        shards.append(shard)
+                    shard_rows += rows
+                    failed.extend(batch_failed)
+            self.con.execute("SET memory_limit = ?", [memory_limit])
+            if shards:
+                before = self.con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                files = ", ".join(f"'{s}'" for s in sorted(shards))
+                self.con.execute(f"INSERT INTO {table} SELECT * FROM read_parquet([{files}])")
+                merged = self.con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] - before
+                if merged != shard_rows:
+                    raise RuntimeError(f"{table}: merged {merged} rows but shards held {shard_rows}")
+                print(f"[INFO] Merged {merged} rows into {table}")
+        finally:
+            self.con.execute("SET memory_limit = ?", [memory_limit])
+            shutil.rmtree(work_dir, ignore_errors=True)
+        return failed
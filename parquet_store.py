@@ -0,0 +1,64 @@
+#!/usr/bin/python
+import pathlib as pl
+
+
+class ParquetStore:
+    '''
+    Optional storage backend: every table is written as a Hive-partitioned,
+    zstd-compressed parquet dataset under dataset_dir/<table>/, partitioned
+    by site and experiment, and exposed to DuckDB as a view of the same name.
+    Filters on the partition columns only read the matching directories.
+    '''
+    def __init__(self, con, dataset_dir, compression="zstd"):
+        self.con = con
+        self.dataset_dir = pl.Path(dataset_dir).resolve()
+        self.dataset_dir.mkdir(parents=True, exist_ok=True)
+        self.compression = compression
+
+    def table_dir(self, table):
+        return self.dataset_dir / table
+
+    def export_table(self, table, site_column):
+        """
+        Write `table` to its dataset directory, replacing any previous copy.
+        """
+        out = self.table_dir(table)
+        self.con.execute(f"""
+            COPY {table} TO '{out}' (
+                FORMAT parquet,
+                COMPRESSION {self.compression},
+                PARTITION_BY ({site_column}, Experiment),
+                OVERWRITE true
+            )
+        """)
+        print(f"[INFO] Wrote {table} to parquet dataset {out}")
+        return out
+
+    def create_view(self, table, site_column):
+        glob = self.table_dir(table) / "**" / "*.parquet"
+        self.con.execute(f"""
+            CREATE OR REPLACE VIEW {table} AS
+            SELECT *
+            FROM read_parquet('{glob}',
+                              hive_partitioning = true,
+                              hive_types = {{'{site_column}': VARCHAR, 'Experiment': VARCHAR}})
+        """)
+        return
+
+    def publish_table(self, table, site_column):
+        """
+        Export an ingested table to the dataset and swap it for a view over
+        the parquet files, releasing the table's storage in DuckDB.
+        """
+        self.export_table(table, site_column)
+        self.con.execute(f"DROP TABLE {table}")
+        self.create_view(table, site_column)
+        return
+
+    def drop_view(self, table):
+        self.con.execute(f"DROP VIEW IF EXISTS {table}")
+        return
+
+    def available_tables(self):
+        return sorted(p.name for p in self.dataset_dir.iterdir()
+                      if p.is_dir() and any(p.rglob("*.parquet")))
@@ -0,0 +1,209 @@
+#!/usr/bin/python
+import contextlib
+import datetime as dt
+import hashlib
+import os
+import pathlib as pl
+import re
+import time
+import uuid
+import duckdb
+import pyarrow.parquet as pq
+
+# In-memory databases start empty in every process, so their results are
+# never reused across sessions.
+SESSION_ID = uuid.uuid4().hex
+# Quoted literals and identifiers are kept as written; comments and
+# whitespace runs outside them become one space.
+SQL_TOKENS = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")|(?:\s+|--[^\n]*|/\*.*?\*/)+""", re.S)
+
+
+def normalize_sql(query):
+    """
+    Query text with comments, surrounding whitespace, trailing semicolons
+    and runs of whitespace removed, so cosmetic edits still hit the cache.
+    String literals and quoted identifiers are left untouched.
+    """
+    query = SQL_TOKENS.sub(lambda m: m.group(1) or " ", query)
+    return query.strip().rstrip(";").strip()
+
+
+def data_version(con, session_id=None):
+    """
+    Token that changes whenever ingest changes a table: the database file
+    plus the per-table counters IngestManifest bumps on every commit, and
+    those of any attached shards. In-memory databases are told apart by
+    session_id; without one, by the connection object, which is only
+    unique while the connection is alive.
+    """
+    path = con.execute(
+        "SELECT path FROM duckdb_databases() WHERE database_name = current_database()").fetchone()[0]
+    # shard_data_versions is the union of the counters of attached shards (see sharded_ingest).
+    sources = [r[0] for r in con.execute("""
+        SELECT table_name FROM duckdb_tables()
+        WHERE table_name = 'data_versions' AND database_name = current_database()
+        UNION ALL
+        SELECT view_name FROM duckdb_views() WHERE view_name = 'shard_data_versions'
+    """).fetchall()]
+    versions = ""
+    if sources:
+        versions = con.execute(f"""
+            SELECT COALESCE(string_agg(table_name || '=' || version, ',' ORDER BY table_name), '')
+            FROM ({' UNION ALL '.join(f'SELECT table_name, version FROM {s}' for s in sources)})
+        """).fetchone()[0]
+    if not path:
+        path = f"memory-{session_id or f'{SESSION_ID}-{id(con)}'}"
+    return f"{path}|{versions}"
+
+
+class QueryCache:
+    '''
+    On-disk cache of query results as parquet files under cache_dir, keyed
+    on the normalized SQL and the data version. Entries are evicted least
+    recently used first once they exceed max_bytes, and entries from older
+    data versions are dropped as soon as a newer result is stored.
+    The index lives in cache_dir/index.duckdb and is opened only for each
+    lookup or store, so several processes can share a cache directory;
+    one waiting on another's lock retries for up to lock_timeout seconds.
+    '''
+    def __init__(self, cache_dir, max_bytes=2_000_000_000, lock_timeout=30):
+        self.cache_dir = pl.Path(cache_dir).resolve()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock_timeout = lock_timeout
+        self.index_path = self.cache_dir / "index.duckdb"
+        with self.connect() as index:
+            index.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                sql TEXT,
+                data_version TEXT,
+                path TEXT,
+                bytes BIGINT,
+                rows BIGINT,
+                created_at TIMESTAMP,
+                last_used TIMESTAMP,
+                hits BIGINT
+            );
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value BIGINT
+            );
+            INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0), ('evictions', 0);
+            """)
+
+    @contextlib.contextmanager
+    def connect(self):
+        """
+        A connection to the index, retrying while another process holds its lock.
+        """
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            try:
+                index = duckdb.connect(str(self.index_path))
+                break
+            except duckdb.IOException:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+        try:
+            yield index
+        finally:
+            index.close()
+
+    def key(self, query, version):
+        return hashlib.blake2b(f"{normalize_sql(query)}\0{version}".encode(), digest_size=16).hexdigest()
+
+    def count(self, index, name, n=1):
+        index.execute("UPDATE counters SET value = value + ? WHERE name = ?", [n, name])
+        return
+
+    def get(self, query, version):
+        """
+        The cached pyarrow Table for query at version, or None on a miss.
+        """
+        key = self.key(query, version)
+        with self.connect() as index:
+            row = index.execute("SELECT path FROM entries WHERE key = ?", [key]).fetchone()
+            table = None
+            if row is not None:
+                try:
+                    table = pq.read_table(row[0])
+                except FileNotFoundError:
+                    index.execute("DELETE FROM entries WHERE key = ?", [key])
+            if table is None:
+                self.count(index, "misses")
+                return None
+            index.execute("UPDATE entries SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                          [dt.datetime.now(), key])
+            self.count(index, "hits")
+        return table
+
+    def put(self, query, version, table):
+        """
+        Store a pyarrow Table as the result of query at version. Results
+        larger than the whole cache are not kept.
+        """
+        key = self.key(query, version)
+        path = self.cache_dir / f"{key}.parquet"
+        # Written aside and moved into place, so readers never see a partial file.
+        partial = path.with_name(f"{key}.{os.getpid()}.tmp")
+        pq.write_table(table, partial, compression="zstd")
+        nbytes = partial.stat().st_size
+        if nbytes > self.max_bytes:
+            partial.unlink()
+            return
+        os.replace(partial, path)
+        now = dt.datetime.now()
+        with self.connect() as index:
+            index.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                          [key, normalize_sql(query), version, str(path), nbytes, table.num_rows, now, now])
+            db = version.split("|", 1)[0]
+            stale = index.execute("""
+                SELECT key, path FROM entries WHERE data_version <> ? AND split_part(data_version, '|', 1) = ?
+            """, [version, db]).fetchall()
+            self.remove(index, stale)
+            self.evict(index)
+        return
+
+    def remove(self, index, entries):
+        for key, path in entries:
+            pl.Path(path).unlink(missing_ok=True)
+            index.execute("DELETE FROM entries WHERE key = ?", [key])
+        if entries:
+            self.count(index, "evictions", len(entries))
+        return
+
+    def evict(self, index):
+        """
+        Drop least recently used entries until the cache fits in max_bytes.
+        """
+        rows = index.execute("SELECT key, path, bytes FROM entries ORDER BY last_used DESC").fetchall()
+        total = 0
+        victims = []
+        for key, path, nbytes in rows:
+            total += nbytes
+            if total > self.max_bytes:
+                victims.append((key, path))
+        self.remove(index, victims)
+        return
+
+    def clear(self):
+        with self.connect() as index:
+            self.remove(index, index.execute("SELECT key, path FROM entries").fetchall())
+        return
+
+    def stats(self):
+        with self.connect() as index:
+            counters = dict(index.execute("SELECT name, value FROM counters").fetchall())
+            entries, nbytes = index.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entries").fetchone()
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "entries": entries,
+            "bytes": nbytes,
+            "max_bytes": self.max_bytes,
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "evictions": counters["evictions"],
+            "hit_rate": counters["hits"] / lookups if lookups else None,
+        }
@@ -0,0 +1,253 @@
+#!/usr/bin/python
+import argparse
+import json
+import queue
+import re
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import duckdb
+import polars as po
+import pyarrow as pa
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+# Queries over the hourly tables count against the heavy-query cap.
+HEAVY_TABLES = ["model_db", "rattlesnake_db", "birthdeath_db"]
+
+
+class QueryTimeout(Exception):
+    pass
+
+
+class QueryServer:
+    '''
+    Local HTTP query service over one read-only DuckDB connection, so many
+    notebooks can query the same database file without lock conflicts.
+    Each request borrows a cursor from a fixed pool, is interrupted after
+    its timeout, and streams its result back as Arrow IPC record batches.
+    At most max_heavy queries over the hourly tables run at once; the rest
+    wait for a slot up to their timeout. A request's "heavy" flag can add
+    a query to the cap but not exempt one. The database must not be opened
+    for writing (e.g. by ingest) while the server runs. timeout is both the
+    default and the maximum a request may ask for.
+
+        POST /query   {"sql": ..., "timeout": s, "batch_size": n, "heavy": bool}
+        GET  /health  pool and slot usage as JSON
+    '''
+    def __init__(self, db_path, host="127.0.0.1", port=8765, pool_size=8, max_heavy=2, timeout=300,
+                 batch_size=100_000):
+        self.con = duckdb.connect(str(db_path), read_only=True)
+        self.pool = queue.Queue()
+        for _ in range(pool_size):
+            self.pool.put(self.con.cursor())
+        self.pool_size = pool_size
+        self.max_heavy = max_heavy
+        self.heavy_slots = threading.BoundedSemaphore(max_heavy)
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.active = 0
+        self.active_heavy = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self.handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def is_heavy(self, sql):
+        return any(re.search(rf"\b{table}\b", sql, re.I) for table in HEAVY_TABLES)
+
+    def health(self):
+        with self.lock:
+            return {"pool_size": self.pool_size, "idle_cursors": self.pool.qsize(), "active": self.active,
+                    "max_heavy": self.max_heavy, "active_heavy": self.active_heavy}
+
+    def run(self, sql, timeout, batch_size, heavy, write):
+        """
+        Execute sql on a pooled cursor and hand its RecordBatchReader to
+        write(reader). Raises QueryTimeout when the query is interrupted.
+        """
+        if heavy and not self.heavy_slots.acquire(timeout=timeout):
+            raise QueryTimeout(f"no heavy-query slot free within {timeout}s")
+        try:
+            try:
+                cursor = self.pool.get(timeout=timeout)
+            except queue.Empty:
+                raise QueryTimeout(f"no cursor free within {timeout}s")
+            timed_out = threading.Event()
+
+            def interrupt():
+                timed_out.set()
+                cursor.interrupt()
+            timer = threading.Timer(timeout, interrupt)
+            with self.lock:
+                self.active += 1
+                self.active_heavy += heavy
+            timer.start()
+            try:
+                res = cursor.execute(sql)
+                reader = res.to_arrow_reader(batch_size) if hasattr(res, "to_arrow_reader") \
+                    else res.fetch_record_batch(batch_size)
+                write(reader)
+            except Exception as e:
+                if timed_out.is_set():
+                    raise QueryTimeout(f"query exceeded {timeout}s") from e
+                raise
+            finally:
+                timer.cancel()
+                with self.lock:
+                    self.active -= 1
+                    self.active_heavy -= heavy
+                # A cursor left mid-result or interrupted is replaced rather than reused.
+                cursor.close()
+                self.pool.put(self.con.cursor())
+        finally:
+            if heavy:
+                self.heavy_slots.release()
+
+    def handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def send_json(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/health":
+                    self.send_json(200, server.health())
+                else:
+                    self.send_json(404, {"error": f"unknown path {self.path}"})
+
+            def do_POST(self):
+                if self.path != "/query":
+                    self.send_json(404, {"error": f"unknown path {self.path}"})
+                    return
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                    if not isinstance(body, dict) or not isinstance(body.get("sql"), str):
+                        raise ValueError("expected a JSON object with an 'sql' string")
+                    sql = body["sql"]
+                    # Clients may shorten the server's timeout but not lift it.
+                    timeout = body.get("timeout")
+                    timeout = server.timeout if timeout is None else min(float(timeout), server.timeout)
+                    batch_size = body.get("batch_size")
+                    batch_size = server.batch_size if batch_size is None else int(batch_size)
+                    if not timeout > 0 or batch_size < 1:
+                        raise ValueError("timeout and batch_size must be positive")
+                    # Clients may flag a query as heavy but not exempt one from the cap.
+                    heavy = server.is_heavy(sql) or bool(body.get("heavy"))
+                except (ValueError, TypeError, KeyError) as e:
+                    self.send_json(400, {"error": f"bad request: {e}"})
+                    return
+
+                def write(reader):
+                    # Headers go out only once the query has produced its schema,
+                    # so planning errors still get a proper error status.
+                    self.streaming = True
+                    self.send_response(200)
+                    self.send_header("Content-Type", ARROW_STREAM)
+                    self.end_headers()
+                    with pa.ipc.new_stream(self.wfile, reader.schema) as writer:
+                        for batch in reader:
+                            writer.write_batch(batch)
+                self.streaming = False
+                try:
+                    server.run(sql, timeout, batch_size, heavy, write)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                except (QueryTimeout, duckdb.Error) as e:
+                    # Once batches are flowing the only signal left is a truncated stream.
+                    if not self.streaming:
+                        self.send_json(504 if isinstance(e, QueryTimeout) else 400, {"error": str(e)})
+
+            def log_message(self, format, *args):
+                return
+
+        return Handler
+
+    def serve_forever(self):
+        print(f"[INFO] Serving queries on {self.url}")
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
+        return
+
+    def start(self):
+        """
+        Serve from a background thread; returns the thread.
+        """
+        thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.con.close()
+        return
+
+
+class QueryClient:
+    '''
+    Client for QueryServer whose query_sim_table matches SimSummarizer's.
+    '''
+    def __init__(self, url="http://127.0.0.1:8765", timeout=None):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def post(self, query, batch_size, timeout=None, heavy=None):
+        body = {"sql": query, "batch_size": batch_size, "timeout": timeout or self.timeout}
+        if heavy is not None:
+            body["heavy"] = heavy
+        request = urllib.request.Request(f"{self.url}/query", data=json.dumps(body).encode(),
+                                         headers={"Content-Type": "application/json"})
+        try:
+            return urllib.request.urlopen(request)
+        except urllib.error.HTTPError as e:
+            message = json.loads(e.read() or b"{}").get("error", str(e))
+            raise RuntimeError(f"Query failed ({e.code}): {message}") from None
+
+    def query_sim_table(self, query, result="pandas", batch_size=1_000_000, timeout=None, heavy=None):
+        """
+        Execute a query on the server and return the results in the same
+        forms as SimSummarizer.query_sim_table. 'batches' streams from the
+        open response; 'lazy' wraps the fetched result in a LazyFrame.
+        """
+        if result not in ("pandas", "arrow", "batches", "polars", "lazy"):
+            raise ValueError(f"Unknown result type '{result}'")
+        reader = pa.ipc.open_stream(self.post(query, batch_size, timeout, heavy))
+        if result == "batches":
+            return reader
+        table = reader.read_all()
+        if result == "arrow":
+            return table
+        if result == "polars":
+            return po.from_arrow(table)
+        if result == "lazy":
+            return po.from_arrow(table).lazy()
+        return table.to_pandas()
+
+    def health(self):
+        with urllib.request.urlopen(f"{self.url}/health") as response:
+            return json.loads(response.read())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve read-only queries over a therma_sim DuckDB file.")
+    parser.add_argument("db_path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pool", type=int, default=8, help="number of pooled cursors")
+    parser.add_argument("--heavy", type=int, default=2, help="concurrent queries over the hourly tables")
+    parser.add_argument("--timeout", type=float, default=300, help="default per-query timeout in seconds")
+    args = parser.parse_args()
+    QueryServer(args.db_path, args.host, args.port, args.pool, args.heavy, args.timeout).serve_forever()
@@ -0,0 +1,223 @@
+#!/usr/bin/python
+import math
+import re
+import statistics
+import pandas as pd
+import meta_utilz
+
+REGISTRY_TABLE = "replicate_registry"
+META_TABLE = "replicate_samples"
+# Columns of a per-replicate result that are grouping keys even though numeric.
+KEY_COLUMNS = ["Time_Step", "Hour", "Day", "Month", "Year", "seed", "sim_id", "Agent_id"]
+SITE_COLUMNS = ["Study_Site", "Site_Name"]
+
+
+def sample_suffix(fraction):
+    return "sample_" + f"{fraction * 100:g}".replace(".", "_")
+
+
+class ReplicateSamples:
+    '''
+    Stratified replicate samples of the ingested tables for approximate
+    queries. Every replicate gets a fixed uniform draw u from a hash of its
+    (site, experiment, sim_id), kept in replicate_registry. The sample at
+    fraction p, <table>_sample_<p%>, holds all rows of the replicates with
+    u < p plus the min_replicates replicates with the smallest u of each
+    (site, experiment), so every stratum has a between-replicate variance.
+    Samples are nested (the 1% sample is inside the 10% one) and stable as
+    replicates arrive; they are refreshed inside every ingest batch.
+    '''
+    min_replicates = 2
+
+    def __init__(self, con):
+        self.con = con
+
+    def create_tables(self):
+        self.con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {REGISTRY_TABLE} (
+            table_name TEXT,
+            site TEXT,
+            experiment TEXT,
+            sim_id INTEGER,
+            u DOUBLE,
+            PRIMARY KEY (table_name, site, experiment, sim_id)
+        );
+        CREATE TABLE IF NOT EXISTS {META_TABLE} (
+            table_name TEXT,
+            fraction DOUBLE,
+            sample_table TEXT,
+            PRIMARY KEY (table_name, fraction)
+        );
+        """)
+        return
+
+    def sample_table(self, table, fraction):
+        return f"{table}_{sample_suffix(fraction)}"
+
+    def fractions(self, table):
+        return [r[0] for r in self.con.execute(
+            f"SELECT DISTINCT fraction FROM {META_TABLE} WHERE table_name = ? ORDER BY 1", [table]).fetchall()]
+
+    def drop(self, table):
+        """
+        Drop every sample of table and its registry entries.
+        """
+        for fraction in self.fractions(table):
+            self.con.execute(f"DROP TABLE IF EXISTS {self.sample_table(table, fraction)}")
+        self.con.execute(f"DELETE FROM {META_TABLE} WHERE table_name = ?", [table])
+        self.con.execute(f"DELETE FROM {REGISTRY_TABLE} WHERE table_name = ?", [table])
+        return
+
+    def prepare(self, collator, fractions=None, incremental=False):
+        """
+        Set up the samples of collator's table before loading: the requested
+        fractions, or with incremental ingest and none requested, the ones
+        kept so far. A full reload starts them empty. Returns True if
+        incremental ingest added samples that must be filled by rebuild().
+        """
+        self.create_tables()
+        table = collator.view_name
+        existing = self.fractions(table)
+        if not incremental:
+            self.drop(table)
+            existing = []
+        fractions = sorted(set(fractions or existing))
+        for fraction in fractions:
+            if not 0 < fraction < 1:
+                raise ValueError(f"Sample fraction must be between 0 and 1, got {fraction}")
+            sample = self.sample_table(table, fraction)
+            self.con.execute(collator.schema.ddl("CREATE TABLE IF NOT EXISTS", sample))
+            self.con.execute(f"INSERT OR IGNORE INTO {META_TABLE} VALUES (?, ?, ?)", [table, fraction, sample])
+        return incremental and any(f not in existing for f in fractions)
+
+    def members_sql(self, table, fraction):
+        return f"""
+            SELECT site, experiment, sim_id FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY site, experiment ORDER BY u) AS rank
+                FROM {REGISTRY_TABLE}
+                WHERE table_name = '{table}'
+            )
+            WHERE u < {fraction} OR rank <= {self.min_replicates}
+        """
+
+    def member_test(self, table, fraction, site_column, alias):
+        return f"""EXISTS (
+            SELECT 1 FROM ({self.members_sql(table, fraction)}) m
+            WHERE m.site = {alias}.{site_column} AND m.experiment = {alias}.Experiment AND m.sim_id = {alias}.sim_id
+        )"""
+
+    def register_sql(self, table, keys_sql):
+        u = "hash(site || '/' || experiment || '/' || CAST(sim_id AS VARCHAR)) / 18446744073709551616.0"
+        return f"INSERT OR IGNORE INTO {REGISTRY_TABLE} SELECT DISTINCT '{table}', site, experiment, sim_id, {u} FROM ({keys_sql})"
+
+    def fill(self, collator, fraction, source, alias="s"):
+        columns = ", ".join(name for name, _, _ in collator.schema.table_columns)
+        test = self.member_test(collator.view_name, fraction, collator.site_column, alias)
+        self.con.execute(f"""
+            INSERT INTO {self.sample_table(collator.view_name, fraction)} ({columns})
+            SELECT {columns} FROM {source} {alias} WHERE {test}
+        """)
+        return
+
+    def refresh(self, collator, staging_table, csv_list):
+        """
+        Register the replicates behind csv_list and bring every sample of the
+        table in line: replace their rows from staging_table and drop the
+        replicates that fell out. Meant to run inside the ingest batch transaction.
+        """
+        table = collator.view_name
+        fractions = self.fractions(table)
+        if not csv_list or not fractions:
+            return
+        keys_sql = meta_utilz.path_keys_sql(csv_list)
+        self.con.execute(self.register_sql(table, keys_sql))
+        for fraction in fractions:
+            sample = self.sample_table(table, fraction)
+            self.con.execute(f"""
+                DELETE FROM {sample} t
+                USING ({keys_sql}) k
+                WHERE t.{collator.site_column} = k.site
+                  AND t.Experiment = k.experiment
+                  AND t.sim_id = k.sim_id
+            """)
+            self.con.execute(f"DELETE FROM {sample} t WHERE NOT {self.member_test(table, fraction, collator.site_column, 't')}")
+            self.fill(collator, fraction, staging_table)
+        return
+
+    def rebuild(self, collator):
+        """
+        Re-register every replicate of the full table and refill its samples.
+        """
+        table = collator.view_name
+        self.con.execute(f"DELETE FROM {REGISTRY_TABLE} WHERE table_name = ?", [table])
+        self.con.execute(self.register_sql(table, f"""
+            SELECT DISTINCT {collator.site_column} AS site, CAST(Experiment AS TEXT) AS experiment, sim_id
+            FROM {table}
+        """))
+        for fraction in self.fractions(table):
+            self.con.execute(f"DELETE FROM {self.sample_table(table, fraction)}")
+            self.fill(collator, fraction, table)
+        return
+
+    def sample_sql(self, query, fraction):
+        """
+        query with each sampled table name replaced by its sample at
+        fraction. Returns (sql, the tables replaced).
+        """
+        tables = [r[0] for r in self.con.execute(
+            f"SELECT DISTINCT table_name FROM {META_TABLE} WHERE fraction = ? ORDER BY 1", [fraction]).fetchall()]
+        replaced = []
+        for table in tables:
+            pattern = rf"\b{re.escape(table)}\b"
+            if re.search(pattern, query):
+                query = re.sub(pattern, self.sample_table(table, fraction), query)
+                replaced.append(table)
+        if not replaced:
+            available = sorted({r[0] for r in self.con.execute(f"SELECT fraction FROM {META_TABLE}").fetchall()})
+            raise ValueError(f"The query reads no table with a {fraction:g} replicate sample "
+                             f"(fractions kept: {available})")
+        return query, replaced
+
+    def population(self, table):
+        """
+        {(site, experiment): replicates ingested} for table.
+        """
+        rows = self.con.execute(f"""
+            SELECT site, experiment, COUNT(DISTINCT sim_id) FROM {REGISTRY_TABLE}
+            WHERE table_name = ? GROUP BY ALL
+        """, [table]).fetchall()
+        return {(site, experiment): n for site, experiment, n in rows}
+
+    def estimate(self, per_replicate, population, ci=0.95):
+        """
+        Combine a per-replicate result into estimates for all replicates.
+        per_replicate needs sim_id, Experiment and a site column; its other
+        numeric columns (apart from KEY_COLUMNS) are the metrics. Returns one
+        row per key group and metric with the sampled and total replicate
+        counts, the mean over replicates and the total (mean times the number
+        of replicates), each with normal-approximation bounds whose standard
+        error comes from the between-replicate SD with the finite population
+        correction.
+        """
+        site_column = next((c for c in SITE_COLUMNS if c in per_replicate.columns), None)
+        if site_column is None or "Experiment" not in per_replicate.columns or "sim_id" not in per_replicate.columns:
+            raise ValueError("An approximate query must return one row per replicate, "
+                             "with sim_id, Experiment and Study_Site (or Site_Name) columns")
+        keys = [c for c in per_replicate.columns
+                if c != "sim_id" and (c in KEY_COLUMNS or not pd.api.types.is_numeric_dtype(per_replicate[c]))]
+        metrics = [c for c in per_replicate.columns if c not in keys and c != "sim_id"]
+        long = per_replicate.melt(id_vars=keys + ["sim_id"], value_vars=metrics, var_name="metric",
+                                  value_name="value").dropna(subset=["value"])
+        out = long.groupby(keys + ["metric"], dropna=False)["value"].agg(
+            n_reps="count", mean="mean", sd="std").reset_index()
+        out["n_total"] = [population.get((str(s), str(e)), n)
+                          for s, e, n in zip(out[site_column], out["Experiment"], out["n_reps"])]
+        fpc = (1 - out["n_reps"] / out["n_total"]).clip(lower=0).map(math.sqrt)
+        se = out["sd"] / out["n_reps"].map(math.sqrt) * fpc
+        z = statistics.NormalDist().inv_cdf(0.5 + ci / 2)
+        out["mean_low"], out["mean_high"] = out["mean"] - z * se, out["mean"] + z * se
+        out["total"] = out["mean"] * out["n_total"]
+        out["total_low"], out["total_high"] = out["mean_low"] * out["n_total"], out["mean_high"] * out["n_total"]
+        columns = keys + ["metric", "n_reps", "n_total", "mean", "sd", "mean_low", "mean_high",
+                          "total", "total_low", "total_high"]
+        return out[columns].sort_values(keys + ["metric"]).reset_index(drop=True)
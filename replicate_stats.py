@@ -0,0 +1,151 @@
+#!/usr/bin/python
+import numpy as np
+import pandas as pd
+from model_rollups import GRAINS, MEAN_METRICS, SUM_METRICS, WEIGHTED_METRICS, WEIGHT
+
+TIME_KEYS = dict(GRAINS, hourly=["Time_Step"])
+
+
+def quantile_name(q):
+    return "q" + f"{q * 100:g}".replace(".", "_")
+
+
+class ReplicateStats:
+    '''
+    Cross-replicate statistics for many metrics at once. Every metric is
+    first reduced to one value per sim and time bucket, then summarised
+    across the sims of each (site, experiment, time bucket):
+    mean, SD and quantiles are computed in DuckDB in a single grouped pass,
+    and percentile bootstrap CIs of the mean with NumPy, resampling a
+    padded bucket x replicate matrix for all buckets together.
+    '''
+    # Upper bound on bucket x resample x replicate cells drawn at once.
+    max_cells = 5_000_000
+
+    def __init__(self, con, site_column="Study_Site"):
+        self.con = con
+        self.site_column = site_column
+
+    def keys(self, grain):
+        return [self.site_column, "Experiment"] + TIME_KEYS[grain]
+
+    def rollup_source(self, grain, metrics=None):
+        """
+        Per-sim values at grain from the model rollups. metrics are rollup
+        output names (e.g. 'Avg_Krats', 'Total_Interactions'); default all.
+        """
+        columns = {alias: f"sum_{m} / NULLIF(n_{m}, 0)" for m, alias in MEAN_METRICS.items()}
+        columns.update({alias: f"sum_{m}" for m, alias in SUM_METRICS.items()})
+        columns.update({alias: f"wsum_{m} / NULLIF(sum_{WEIGHT}, 0)" for m, alias in WEIGHTED_METRICS.items()})
+        metrics = metrics or list(columns)
+        unknown = [m for m in metrics if m not in columns]
+        if unknown:
+            raise ValueError(f"Unknown rollup metrics {unknown}")
+        select = ", ".join(f"CAST({columns[m]} AS DOUBLE) AS {m}" for m in metrics)
+        return f"""
+            SELECT {", ".join(self.keys(grain))}, sim_id, {select}
+            FROM model_rollup_{grain}
+        """, metrics
+
+    def table_source(self, table, grain, metrics):
+        """
+        Per-sim values at grain averaged from the hourly rows of table.
+        """
+        keys = self.keys(grain) + ["sim_id"]
+        select = ", ".join(f"CAST(AVG({m}) AS DOUBLE) AS {m}" for m in metrics)
+        return f"""
+            SELECT {", ".join(keys)}, {select}
+            FROM {table}
+            GROUP BY {", ".join(keys)}
+        """, metrics
+
+    def long_sql(self, source, metrics, where=None):
+        where_sql = f"WHERE {where}" if where else ""
+        return f"""
+            UNPIVOT (SELECT * FROM ({source}) {where_sql})
+            ON {", ".join(metrics)}
+            INTO NAME metric VALUE value
+        """
+
+    def moments(self, long_sql, keys, quantiles):
+        """
+        Replicate count, mean, SD and quantiles per bucket and metric, in-engine.
+        """
+        qs = ", ".join(f"{q!r}" for q in quantiles)
+        q_cols = ", ".join(f"qs[{i + 1}] AS {quantile_name(q)}" for i, q in enumerate(quantiles))
+        return self.con.execute(f"""
+            SELECT * EXCLUDE (qs), {q_cols}
+            FROM (
+                SELECT {", ".join(keys)}, metric,
+                    COUNT(value) AS n_reps,
+                    AVG(value) AS mean,
+                    STDDEV_SAMP(value) AS sd,
+                    QUANTILE_CONT(value, [{qs}]) AS qs
+                FROM ({long_sql})
+                GROUP BY ALL
+            )
+            ORDER BY ALL
+        """).fetchdf()
+
+    def replicate_matrix(self, long_sql, keys):
+        """
+        Bucket x replicate matrix of values (NaN-padded), the bucket keys and
+        the number of replicates in each bucket.
+        """
+        group_keys = ", ".join(keys + ["metric"])
+        data = self.con.execute(f"""
+            SELECT {group_keys}, value,
+                DENSE_RANK() OVER (ORDER BY {group_keys}) - 1 AS g,
+                ROW_NUMBER() OVER (PARTITION BY {group_keys} ORDER BY sim_id) - 1 AS r
+            FROM ({long_sql})
+            WHERE value IS NOT NULL
+        """).fetchnumpy()
+        g = np.asarray(data["g"], dtype=np.int64)
+        r = np.asarray(data["r"], dtype=np.int64)
+        n_groups = int(g.max()) + 1 if g.size else 0
+        matrix = np.full((n_groups, int(r.max()) + 1 if r.size else 0), np.nan)
+        matrix[g, r] = np.asarray(data["value"], dtype=float)
+        counts = np.bincount(g, minlength=n_groups)
+        first = np.unique(g, return_index=True)[1]
+        labels = pd.DataFrame({k: np.asarray(data[k])[first] for k in keys + ["metric"]})
+        return matrix, counts, labels
+
+    def bootstrap(self, matrix, counts, n_boot=1000, ci=0.95, seed=None):
+        """
+        Percentile bootstrap CI of the mean of every row of matrix, where row
+        i holds counts[i] replicates. Returns (low, high) arrays.
+        """
+        rng = np.random.default_rng(seed)
+        n_groups, width = matrix.shape
+        low = np.full(n_groups, np.nan)
+        high = np.full(n_groups, np.nan)
+        if not n_groups:
+            return low, high
+        alpha = (1 - ci) / 2
+        step = max(1, self.max_cells // max(1, n_boot * width))
+        for start in range(0, n_groups, step):
+            block = matrix[start:start + step]
+            n = counts[start:start + step]
+            # Uniform draws scaled by each row's replicate count index only its own replicates.
+            idx = (rng.random((len(block), n_boot, width)) * n[:, None, None]).astype(np.int64)
+            draws = np.take_along_axis(block[:, None, :], idx, axis=2)
+            valid = np.arange(width) < n[:, None, None]
+            means = np.where(valid, draws, 0.0).sum(axis=2) / np.maximum(n, 1)[:, None]
+            low[start:start + step], high[start:start + step] = np.quantile(means, [alpha, 1 - alpha], axis=1)
+        return low, high
+
+    def summarize(self, source, metrics, grain, where=None, quantiles=(0.025, 0.5, 0.975),
+                  n_boot=1000, ci=0.95, seed=None):
+        """
+        Long-format table with one row per bucket and metric: n_reps, mean,
+        sd, the requested quantiles and ci_low/ci_high of the mean.
+        n_boot=0 skips the bootstrap.
+        """
+        keys = self.keys(grain)
+        long_sql = self.long_sql(source, metrics, where)
+        stats = self.moments(long_sql, keys, quantiles)
+        if not n_boot:
+            return stats
+        matrix, counts, labels = self.replicate_matrix(long_sql, keys)
+        labels["ci_low"], labels["ci_high"] = self.bootstrap(matrix, counts, n_boot, ci, seed)
+        return stats.merge(labels, on=keys + ["metric"], how="left")
@@ -0,0 +1,109 @@
+#!/usr/bin/python
+import pathlib as pl
+import re
+
+# Smallest memory_limit given to an ingest worker process.
+MIN_WORKER_MEMORY = 1 << 26
+UNITS = {"": 1, "B": 1, "KB": 1e3, "MB": 1e6, "GB": 1e9, "TB": 1e12,
+         "KIB": 2 ** 10, "MIB": 2 ** 20, "GIB": 2 ** 30, "TIB": 2 ** 40}
+
+
+def parse_bytes(value):
+    """
+    Bytes in a DuckDB size string such as '12GB' or '11.1 GiB'.
+    """
+    match = re.fullmatch(r"\s*([\d.]+)\s*([A-Za-z]*)\s*", str(value))
+    if not match or match.group(2).upper() not in UNITS:
+        raise ValueError(f"Cannot parse size '{value}'")
+    return int(float(match.group(1)) * UNITS[match.group(2).upper()])
+
+
+class ResourceProfile:
+    '''
+    Memory cap, thread count and spill directory for a DuckDB connection,
+    and the ingest batch budget derived from them. Each committed ingest
+    batch holds at most batch_fraction of the memory limit in raw csv
+    bytes, so the staging table and the swap into the real table stay
+    inside the cap (spilling to temp_directory if needed). Unset options
+    keep DuckDB's defaults.
+    While ingest worker processes run, the main connection is held to
+    main_fraction of the memory limit and the workers share the rest, so
+    the whole process tree stays inside the cap.
+    '''
+    def __init__(self, memory_limit=None, threads=None, temp_directory=None, max_temp_directory_size=None,
+                 batch_fraction=0.25, preserve_insertion_order=None, main_fraction=0.25):
+        self.memory_limit = memory_limit
+        self.threads = threads
+        self.temp_directory = pl.Path(temp_directory).resolve() if temp_directory else None
+        self.max_temp_directory_size = max_temp_directory_size
+        self.batch_fraction = batch_fraction
+        self.preserve_insertion_order = preserve_insertion_order
+        self.main_fraction = main_fraction
+
+    def settings(self):
+        settings = {}
+        if self.memory_limit:
+            settings["memory_limit"] = self.memory_limit
+        if self.threads:
+            settings["threads"] = int(self.threads)
+        if self.temp_directory:
+            self.temp_directory.mkdir(parents=True, exist_ok=True)
+            settings["temp_directory"] = str(self.temp_directory)
+        if self.max_temp_directory_size:
+            settings["max_temp_directory_size"] = self.max_temp_directory_size
+        if self.preserve_insertion_order is not None:
+            settings["preserve_insertion_order"] = bool(self.preserve_insertion_order)
+        return settings
+
+    def apply(self, con):
+        for name, value in self.settings().items():
+            con.execute(f"SET {name} = ?", [value])
+        return
+
+    def memory_bytes(self, con):
+        return parse_bytes(con.execute("SELECT current_setting('memory_limit')").fetchone()[0])
+
+    def batch_bytes(self, con):
+        """
+        Raw csv bytes allowed in one committed ingest batch.
+        """
+        return int(self.memory_bytes(con) * self.batch_fraction)
+
+    def main_memory(self, con):
+        """
+        memory_limit of the main connection while ingest workers run.
+        """
+        return f"{int(self.memory_bytes(con) * self.main_fraction)}B"
+
+    def worker_count(self, con, workers):
+        """
+        workers, reduced so each worker gets at least MIN_WORKER_MEMORY of
+        the memory left beside the main connection.
+        """
+        budget = self.memory_bytes(con) - int(self.memory_bytes(con) * self.main_fraction)
+        fitting = max(budget // MIN_WORKER_MEMORY, 1)
+        if workers > fitting:
+            print(f"[WARN] Memory limit fits {fitting} ingest workers, not {workers}")
+            return fitting
+        return workers
+
+    def worker_settings(self, con, workers):
+        """
+        Settings for the private connections of ingest worker processes,
+        which split the memory limit left beside the main connection
+        (see main_memory) and run one thread each.
+        """
+        budget = self.memory_bytes(con) - int(self.memory_bytes(con) * self.main_fraction)
+        settings = {"threads": 1, "memory_limit": f"{budget // max(workers, 1)}B"}
+        if self.temp_directory:
+            settings["temp_directory"] = str(self.temp_directory)
+        return settings
+
+    def report(self, con):
+        rows = con.execute("""
+            SELECT name, value FROM duckdb_settings()
+            WHERE name IN ('memory_limit', 'threads', 'temp_directory', 'max_temp_directory_size',
+                           'preserve_insertion_order')
+        """).fetchall()
+        print("[INFO] DuckDB resources: " + ", ".join(f"{name}={value}" for name, value in rows))
+        return dict(rows)
@@ -0,0 +1,87 @@
+#!/usr/bin/python
+import argparse
+import dash
+from dash import dcc, html, Input, Output
+import plotly.graph_objs as go
+from dashboard_data import DashboardData
+
+
+def build_app(data):
+    """
+    Dash app plotting the replicate mean (and +/- 1 SD band) of a metric
+    per site and experiment over a date range, using a DashboardData.
+    """
+    first, last = data.date_range()
+    metrics = data.metrics()
+    app = dash.Dash(__name__)
+    app.layout = html.Div([
+        html.H1("therma_sim Results"),
+        html.Div([
+            html.Div([
+                html.Label("Metric"),
+                dcc.Dropdown(id='metric', options=metrics, value=metrics[0] if metrics else None, clearable=False),
+            ], style={'width': '30%', 'margin-right': '10px'}),
+            html.Div([
+                html.Label("Sites"),
+                dcc.Dropdown(id='sites', options=data.sites(), value=data.sites(), multi=True),
+            ], style={'width': '30%', 'margin-right': '10px'}),
+            html.Div([
+                html.Label("Experiments"),
+                dcc.Dropdown(id='experiments', options=data.experiments(), value=data.experiments(), multi=True),
+            ], style={'width': '30%'}),
+        ], style={'display': 'flex', 'flex-direction': 'row'}),
+
+        html.Label("Date range"),
+        dcc.DatePickerRange(id='dates', min_date_allowed=first, max_date_allowed=last,
+                            start_date=first, end_date=last),
+
+        html.Label("Points per line"),
+        dcc.Slider(id='max-points', min=200, max=5000, step=100, value=2000,
+                   marks={200: '200', 1000: '1000', 2000: '2000', 5000: '5000'}),
+
+        html.Div(id='view-info'),
+        dcc.Graph(id='series-graph', style={'height': '70vh'}),
+    ])
+
+    @app.callback(
+        [Output('series-graph', 'figure'),
+         Output('view-info', 'children')],
+        [Input('metric', 'value'),
+         Input('sites', 'value'),
+         Input('experiments', 'value'),
+         Input('dates', 'start_date'),
+         Input('dates', 'end_date'),
+         Input('max-points', 'value')]
+    )
+    def update_graph(metric, sites, experiments, start, end, max_points):
+        fig = go.Figure()
+        if not metric:
+            return fig, "Select a metric"
+        lines = data.series(metric, sites, experiments, start, end, max_points)
+        points = 0
+        for (site, experiment), line in lines.items():
+            name = f"{site} / {experiment}"
+            upper = line["mean"] + line["sd"]
+            lower = line["mean"] - line["sd"]
+            fig.add_trace(go.Scattergl(x=line["time"], y=upper, mode='lines', line=dict(width=0),
+                                       showlegend=False, hoverinfo='skip', legendgroup=name))
+            fig.add_trace(go.Scattergl(x=line["time"], y=lower, mode='lines', line=dict(width=0),
+                                       fill='tonexty', showlegend=False, hoverinfo='skip', legendgroup=name))
+            fig.add_trace(go.Scattergl(x=line["time"], y=line["mean"], mode='lines', name=name,
+                                       legendgroup=name))
+            points += len(line["time"])
+        fig.update_layout(xaxis_title="Date", yaxis_title=metric, title=f"{metric}: replicate mean +/- 1 SD")
+        return fig, f"{len(lines)} series, {points} points sent"
+
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Dashboard over an ingested therma_sim DuckDB file.")
+    parser.add_argument("db_path")
+    parser.add_argument("--table", default="model_db")
+    parser.add_argument("--site-column", default="Study_Site")
+    parser.add_argument("--port", type=int, default=8050)
+    args = parser.parse_args()
+    app = build_app(DashboardData(args.db_path, args.table, args.site_column))
+    app.run(debug=False, port=args.port)
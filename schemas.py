@@ -0,0 +1,218 @@
+#!/usr/bin/python
+import meta_utilz
+
+
+class OutputSchema:
+    '''
+    Declared layout of one therma_sim output file and the table built from it.
+
+    csv_columns: [(name, type)] exactly as the columns appear in the csv.
+    table_columns: [(name, type, expr)] of the DuckDB table, where expr is
+        the SQL that fills the column from a read of the csv (None means the
+        csv column of the same name).
+    fact_table: the table holding table_columns minus the CALENDAR_FIELDS
+        when ingest uses the calendar dimension (see calendar_dim).
+    '''
+    def __init__(self, csv_type, table_name, site_column, csv_columns, table_columns, fact_table=None):
+        self.csv_type = csv_type
+        self.table_name = table_name
+        self.site_column = site_column
+        self.csv_columns = csv_columns
+        self.table_columns = table_columns
+        self.fact_table = fact_table
+
+    @property
+    def csv_names(self):
+        return [name for name, _ in self.csv_columns]
+
+    @property
+    def fact_columns(self):
+        return [col for col in self.table_columns if col[0] not in CALENDAR_FIELDS]
+
+    def ddl(self, clause="CREATE OR REPLACE TABLE", table=None, columns=None):
+        cols = ",\n            ".join(f"{name} {dtype}" for name, dtype, _ in columns or self.table_columns)
+        return f"""
+        {clause} {table or self.table_name} (
+            {cols}
+        );
+        """
+
+    def select_list(self):
+        return ",\n                ".join(
+            f"{expr} AS {name}" if expr else name for name, _, expr in self.table_columns)
+
+    def empty_sql(self):
+        """
+        A zero-row SELECT with the table's columns and types.
+        """
+        cols = ", ".join(f"CAST(NULL AS {dtype}) AS {name}" for name, dtype, _ in self.table_columns)
+        return f"SELECT {cols} LIMIT 0"
+
+    def csv_columns_sql(self):
+        """
+        The columns={...} struct literal for read_csv.
+        """
+        return "{" + ", ".join(f"'{name}': '{dtype}'" for name, dtype in self.csv_columns) + "}"
+
+
+SITE = meta_utilz.site_sql()
+EXPERIMENT = meta_utilz.experiment_sql()
+SIM_ID = meta_utilz.sim_id_sql()
+
+CALENDAR_CSV = [
+    ("Time_Step", "INTEGER"),
+    ("Hour", "INTEGER"),
+    ("Day", "INTEGER"),
+    ("Month", "INTEGER"),
+    ("Year", "INTEGER"),
+    ("Site_Name", "VARCHAR"),
+]
+# Calendar columns that are a function of (site, Time_Step).
+CALENDAR_FIELDS = ["Hour", "Day", "Month", "Year"]
+CALENDAR_TABLE = [
+    ("Time_Step", "INTEGER", None),
+    ("Hour", "INTEGER", None),
+    ("Day", "INTEGER", None),
+    ("Month", "INTEGER", None),
+    ("Year", "INTEGER", None),
+]
+
+MODEL = OutputSchema(
+    csv_type="Model",
+    table_name="model_db",
+    fact_table="model_facts",
+    site_column="Study_Site",
+    csv_columns=CALENDAR_CSV + [
+        ("Rattlesnakes", "INTEGER"),
+        ("Krats", "INTEGER"),
+        ("Rattlesnakes_Density", "DOUBLE"),
+        ("Krats_Density", "DOUBLE"),
+        ("Rattlesnakes_Active", "INTEGER"),
+        ("Krats_Active", "INTEGER"),
+        ("Foraging", "INTEGER"),
+        ("Thermoregulating", "INTEGER"),
+        ("Resting", "INTEGER"),
+        ("Searching", "INTEGER"),
+        ("Brumating", "INTEGER"),
+        ("Snakes_in_Burrow", "INTEGER"),
+        ("Snakes_in_Open", "INTEGER"),
+        ("mean_thermal_quality", "DOUBLE"),
+        ("mean_thermal_accuracy", "DOUBLE"),
+        ("mean_metabolic_state", "DOUBLE"),
+        ("count_interactions", "INTEGER"),
+        ("count_successful_interactions", "INTEGER"),
+        ("seed", "INTEGER"),
+        ("sim_id", "INTEGER"),
+    ],
+    table_columns=CALENDAR_TABLE + [
+        ("Site_Name", "TEXT", None),
+        ("Rattlesnakes", "INTEGER", None),
+        ("Krats", "INTEGER", None),
+        ("Rattlesnakes_Density", "DOUBLE", None),
+        ("Krats_Density", "DOUBLE", None),
+        ("Rattlesnakes_Active", "INTEGER", None),
+        ("Krats_Active", "INTEGER", None),
+        ("Foraging", "INTEGER", None),
+        ("Thermoregulating", "INTEGER", None),
+        ("Resting", "INTEGER", None),
+        ("Searching", "INTEGER", None),
+        ("Brumating", "INTEGER", None),
+        ("Snakes_in_Burrow", "INTEGER", None),
+        ("Snakes_in_Open", "INTEGER", None),
+        ("mean_thermal_quality", "DOUBLE", None),
+        ("mean_thermal_accuracy", "DOUBLE", None),
+        ("mean_metabolic_state", "DOUBLE", None),
+        ("count_interactions", "INTEGER", None),
+        ("count_successful_interactions", "INTEGER", None),
+        ("seed", "INTEGER", None),
+        ("sim_id", "INTEGER", SIM_ID),
+        ("Study_Site", "TEXT", SITE),
+        ("Experiment", "TEXT", EXPERIMENT),
+    ],
+)
+
+RATTLESNAKE = OutputSchema(
+    csv_type="Rattlesnake",
+    table_name="rattlesnake_db",
+    fact_table="rattlesnake_facts",
+    site_column="Study_Site",
+    csv_columns=CALENDAR_CSV + [
+        ("Agent_id", "INTEGER"),
+        ("Active", "BOOLEAN"),
+        ("Alive", "BOOLEAN"),
+        ("Behavior", "VARCHAR"),
+        ("Microhabitat", "VARCHAR"),
+        ("Body_Temperature", "DOUBLE"),
+        ("T_Env", "DOUBLE"),
+        ("Mass", "DOUBLE"),
+        ("Metabolic_State", "DOUBLE"),
+        ("Handling_Time", "DOUBLE"),
+        ("Attack_Rate", "DOUBLE"),
+        ("Prey_Density", "DOUBLE"),
+        ("Prey_Encountered", "DOUBLE"),
+        ("Prey_Consumed", "DOUBLE"),
+    ],
+    table_columns=CALENDAR_TABLE + [
+        ("Study_Site", "TEXT", SITE),
+        ("Agent_id", "INTEGER", None),
+        ("Active", "BOOLEAN", None),
+        ("Alive", "BOOLEAN", None),
+        ("Behavior", "TEXT", None),
+        ("Microhabitat", "TEXT", None),
+        ("Body_Temperature", "DOUBLE", None),
+        ("T_Env", "DOUBLE", None),
+        ("Mass", "DOUBLE", None),
+        ("Metabolic_State", "DOUBLE", None),
+        ("Handling_Time", "DOUBLE", None),
+        ("Attack_Rate", "DOUBLE", None),
+        ("Prey_Density", "DOUBLE", None),
+        ("Prey_Encountered", "DOUBLE", None),
+        ("Prey_Consumed", "DOUBLE", None),
+        ("Experiment", "TEXT", EXPERIMENT),
+        ("sim_id", "INTEGER", SIM_ID),
+    ],
+)
+
+BIRTHDEATH = OutputSchema(
+    csv_type="BirthDeath",
+    table_name="birthdeath_db",
+    fact_table="birthdeath_facts",
+    site_column="Site_Name",
+    csv_columns=CALENDAR_CSV + [
+        ("Agent_id", "VARCHAR"),
+        ("Species", "VARCHAR"),
+        ("Age", "DOUBLE"),
+        ("Sex", "VARCHAR"),
+        ("Mass", "DOUBLE"),
+        ("Birth_Counter", "DOUBLE"),
+        ("Death_Counter", "DOUBLE"),
+        ("Alive", "BOOLEAN"),
+        ("Event_Type", "VARCHAR"),
+        ("Cause_Of_Death", "VARCHAR"),
+        ("Litter_Size", "INTEGER"),
+        ("Body_Temperature", "DOUBLE"),
+        ("ct_min", "DOUBLE"),
+        ("ct_max", "DOUBLE"),
+    ],
+    table_columns=CALENDAR_TABLE + [
+        ("Site_Name", "TEXT", SITE),
+        ("Agent_id", "TEXT", None),
+        ("Species", "TEXT", None),
+        ("Age", "DOUBLE", None),
+        ("Sex", "TEXT", None),
+        ("Mass", "DOUBLE", None),
+        ("Birth_Counter", "DOUBLE", None),
+        ("Death_Counter", "DOUBLE", None),
+        ("Alive", "BOOLEAN", None),
+        ("Event_Type", "TEXT", None),
+        ("Cause_Of_Death", "TEXT", None),
+        ("Litter_Size", "INTEGER", None),
+        ("Body_Temperature", "DOUBLE", None),
+        ("ct_min", "DOUBLE", None),
+        ("ct_max", "DOUBLE", None),
+        ("Experiment", "TEXT", EXPERIMENT),
+        ("sim_id", "INTEGER", SIM_ID),
+    ],
+)
+
+REGISTRY = {schema.csv_type: schema for schema in (MODEL, RATTLESNAKE, BIRTHDEATH)}
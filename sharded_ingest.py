@@ -0,0 +1,199 @@
+#!/usr/bin/python
+import argparse
+import json
+import multiprocessing
+import pathlib as pl
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import schemas
+from agent_lifecycle import VIEW as LIFECYCLE_VIEW, AgentLifecycle
+from calendar_dim import CalendarDimension
+from file_index import FileIndex
+
+# Per-database ingest bookkeeping that is not federated across shards.
+BOOKKEEPING_TABLES = {"ingest_manifest", "data_versions", "compact_columns", "ingest_runs",
+                      "ingest_file_metrics", "ingest_batch_metrics", "ingest_table_metrics", "ingest_errors"}
+SITE_COLUMNS = ("Study_Site", "Site_Name")
+
+
+def experiment_value(name):
+    """
+    The Experiment column value of an experiment folder name.
+    """
+    return "0" if name == "Current" else str(int(name))
+
+
+def ingest_shard(shard_dir, shard_id, ingest_options):
+    """
+    Worker: ingest one shard of a saved plan into its own database file.
+    """
+    return ShardPlan.load(shard_dir).ingest(shard_id, **ingest_options)
+
+
+class ShardPlan:
+    '''
+    Splits the (site, experiment) folders of a results tree into shards,
+    each ingested into its own DuckDB file by an independent process, e.g.
+    one cluster job per shard. The plan is saved as shards.json in
+    shard_dir, next to the shard databases, so every node works from the
+    same assignment. attach() federates the shards behind one view per
+    table; each branch of a view carries its shard's site and experiment
+    set, so DuckDB drops shards that a site or experiment filter excludes.
+    '''
+    def __init__(self, shard_dir, parent_directory, site_names, shards):
+        self.shard_dir = pl.Path(shard_dir).resolve()
+        self.parent_directory = str(parent_directory)
+        self.site_names = list(site_names)
+        self.shards = shards
+
+    @property
+    def plan_path(self):
+        return self.shard_dir / "shards.json"
+
+    @classmethod
+    def build(cls, parent_directory, site_names, shard_dir, n_shards):
+        """
+        Assign (site, experiment) folders to n_shards shards, largest first
+        to the shard with the fewest bytes so far.
+        """
+        index = FileIndex(parent_directory, site_names)
+        index.scan()
+        sizes = sorted(index.sizes().items(), key=lambda kv: (-kv[1], kv[0]))
+        shards = [{"id": i, "db": f"shard_{i:03d}.duckdb", "keys": [], "bytes": 0} for i in range(n_shards)]
+        for key, size in sizes:
+            shard = min(shards, key=lambda s: (s["bytes"], s["id"]))
+            shard["keys"].append(list(key))
+            shard["bytes"] += size
+        plan = cls(shard_dir, pl.Path(parent_directory).resolve(), site_names, [s for s in shards if s["keys"]])
+        plan.save()
+        return plan
+
+    def save(self):
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        self.plan_path.write_text(json.dumps({
+            "parent_directory": self.parent_directory,
+            "site_names": self.site_names,
+            "shards": self.shards,
+        }, indent=2))
+        print(f"[INFO] Wrote plan for {len(self.shards)} shards to {self.plan_path}")
+        return self.plan_path
+
+    @classmethod
+    def load(cls, shard_dir):
+        shard_dir = pl.Path(shard_dir)
+        plan_path = shard_dir if shard_dir.suffix == ".json" else shard_dir / "shards.json"
+        plan = json.loads(plan_path.read_text())
+        return cls(plan_path.parent, plan["parent_directory"], plan["site_names"], plan["shards"])
+
+    def db_path(self, shard):
+        return self.shard_dir / shard["db"]
+
+    def ingest(self, shard_id, **ingest_options):
+        """
+        Ingest one shard into its database file, scanning only the shard's
+        experiment folders. ingest_options are passed to
+        SimSummarizer.initialize_tables; returns the failed files.
+        """
+        import main
+        shard = next(s for s in self.shards if s["id"] == shard_id)
+        simsum = main.SimSummarizer(self.parent_directory, self.site_names, db_path=self.db_path(shard),
+                                    index_cache=self.shard_dir / f"shard_{shard_id:03d}_file_index.parquet",
+                                    experiments=shard["keys"])
+        simsum.initialize_tables(**ingest_options)
+        simsum.con.close()
+        return simsum.failed_files
+
+    def ingest_all(self, jobs=None, **ingest_options):
+        """
+        Ingest every shard from a local process pool. Workers are spawned
+        fresh, as on separate nodes, since each runs its own threaded DuckDB
+        connection and polars scan.
+        """
+        failed = {}
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {pool.submit(ingest_shard, str(self.shard_dir), s["id"], ingest_options): s["id"]
+                       for s in self.shards}
+            for future in as_completed(futures):
+                failed[futures[future]] = future.result()
+        return failed
+
+    def attach(self, con):
+        """
+        ATTACH every shard database read-only to con and create a temp view
+        per table unioning its shards. Shards ingested with calendar=True
+        get one calendar view (a site can span shards) and their *_db views
+        are rebuilt over the unioned fact tables; the agent_lifecycle view is
+        likewise rebuilt over the unioned agent_spans and agent_events.
+        """
+        branches = {}
+        for shard in self.shards:
+            path = self.db_path(shard)
+            if not path.exists():
+                print(f"[WARN] Shard {shard['id']} has no database at {path}")
+                continue
+            alias = f"shard_{shard['id']:03d}"
+            con.execute(f"ATTACH IF NOT EXISTS '{path}' AS {alias} (READ_ONLY)")
+            views = {r[0] for r in con.execute(
+                "SELECT view_name FROM duckdb_views() WHERE database_name = ?", [alias]).fetchall()}
+            columns = {}
+            for table, column in con.execute("""
+                SELECT table_name, column_name FROM duckdb_columns()
+                WHERE database_name = ? AND schema_name = 'main'
+            """, [alias]).fetchall():
+                columns.setdefault(table, set()).add(column)
+            sites = ", ".join(f"'{s}'" for s in sorted({k[0] for k in shard["keys"]}))
+            experiments = ", ".join(f"'{experiment_value(k[1])}'" for k in shard["keys"])
+            for table, cols in columns.items():
+                if table in views or (table in BOOKKEEPING_TABLES and table != "data_versions"):
+                    continue
+                site_column = next((c for c in SITE_COLUMNS if c in cols), None)
+                guard = ""
+                if site_column and "Experiment" in cols:
+                    guard = f"WHERE {site_column} IN ({sites}) AND Experiment IN ({experiments})"
+                if table == "data_versions":
+                    branches.setdefault("shard_data_versions", []).append(
+                        f"SELECT '{alias}.' || table_name AS table_name, version, changed_at "
+                        f"FROM {alias}.data_versions")
+                else:
+                    branches.setdefault(table, []).append(f"SELECT * FROM {alias}.{table} {guard}")
+        calendar = CalendarDimension(con)
+        for table, selects in branches.items():
+            union = " UNION BY NAME " if table == calendar.table_name else " UNION ALL BY NAME "
+            con.execute(f"CREATE OR REPLACE TEMP VIEW {table} AS {union.join(selects)}")
+        if calendar.table_name in branches:
+            for schema in schemas.REGISTRY.values():
+                if schema.fact_table in branches:
+                    calendar.create_view(schema, temp=True)
+                    branches[schema.table_name] = []
+        lifecycle = AgentLifecycle(con)
+        if all(table in branches for table in lifecycle.table_names()):
+            lifecycle.create_view(temp=True)
+            branches[LIFECYCLE_VIEW] = []
+        print(f"[INFO] Attached {len(self.shards)} shards with {len(branches)} federated views")
+        return sorted(branches)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plan and run sharded ingest of a results tree.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    plan_cmd = sub.add_parser("plan", help="split the results tree into shards")
+    plan_cmd.add_argument("parent_directory")
+    plan_cmd.add_argument("shard_dir")
+    plan_cmd.add_argument("--sites", nargs="+", default=["Texas", "Nebraska", "Canada"])
+    plan_cmd.add_argument("--shards", type=int, required=True)
+    ingest_cmd = sub.add_parser("ingest", help="ingest one shard (e.g. one cluster array task), or all locally")
+    ingest_cmd.add_argument("shard_dir")
+    ingest_cmd.add_argument("--shard", type=int, help="shard id; omit to ingest every shard locally")
+    ingest_cmd.add_argument("--jobs", type=int, default=None)
+    ingest_cmd.add_argument("--workers", type=int, default=1)
+    ingest_cmd.add_argument("--incremental", action="store_true")
+    ingest_cmd.add_argument("--calendar", action="store_true", help="store the calendar layout (see calendar_dim)")
+    args = parser.parse_args()
+    if args.command == "plan":
+        ShardPlan.build(args.parent_directory, args.sites, args.shard_dir, args.shards)
+    else:
+        plan = ShardPlan.load(args.shard_dir)
+        options = dict(workers=args.workers, incremental=args.incremental, calendar=args.calendar)
+        if args.shard is None:
+            plan.ingest_all(args.jobs, **options)
+        else:
+            plan.ingest(args.shard, **options)
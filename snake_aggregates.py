@@ -0,0 +1,118 @@
+#!/usr/bin/python
+import meta_utilz
+
+CALENDAR_KEYS = ["Time_Step", "Hour", "Day", "Month", "Year"]
+# Categorical rattlesnake_db columns counted per time step.
+OCCUPANCY_DIMENSIONS = {
+    "Behavior": "rattlesnake_behavior_counts",
+    "Microhabitat": "rattlesnake_microhabitat_counts",
+}
+AGENT_DAILY_TABLE = "rattlesnake_agent_daily"
+# Per-agent daily aggregates: output column -> (type, SQL over the hourly rows).
+AGENT_DAILY_METRICS = {
+    "n_hours": ("INTEGER", "COUNT(*)"),
+    "n_active_hours": ("INTEGER", "COUNT(*) FILTER (WHERE Active)"),
+    "mean_body_temperature": ("DOUBLE", "AVG(Body_Temperature)"),
+    "mean_t_env": ("DOUBLE", "AVG(T_Env)"),
+    "mean_mass": ("DOUBLE", "AVG(Mass)"),
+    "mean_metabolic_state": ("DOUBLE", "AVG(Metabolic_State)"),
+    "prey_encountered": ("DOUBLE", "SUM(Prey_Encountered)"),
+    "prey_consumed": ("DOUBLE", "SUM(Prey_Consumed)"),
+}
+
+
+class RattlesnakeAggregates:
+    '''
+    Reduced-resolution rattlesnake tables built from each ingest batch
+    instead of keeping every agent at every hour:
+        rattlesnake_behavior_counts      living agents per sim, time step and Behavior
+        rattlesnake_microhabitat_counts  living agents per sim, time step and Microhabitat
+        rattlesnake_agent_daily          per agent and day: hours alive and active,
+                                         mean body temperature, mass, ... and prey totals
+    Only rows with Alive set are counted, as in the post_sim_rs notebook.
+    '''
+    def __init__(self, con, source_table="rattlesnake_db", site_column="Study_Site"):
+        self.con = con
+        self.source_table = source_table
+        self.site_column = site_column
+
+    def table_names(self):
+        return list(OCCUPANCY_DIMENSIONS.values()) + [AGENT_DAILY_TABLE]
+
+    def sim_keys(self):
+        return [f"{self.site_column} TEXT", "Experiment TEXT", "sim_id INTEGER"]
+
+    def create_tables(self, replace=True):
+        clause = "CREATE OR REPLACE TABLE" if replace else "CREATE TABLE IF NOT EXISTS"
+        for dimension, table in OCCUPANCY_DIMENSIONS.items():
+            columns = self.sim_keys() + [f"{key} INTEGER" for key in CALENDAR_KEYS]
+            columns += [f"{dimension} TEXT", "n_agents INTEGER", "n_active INTEGER"]
+            self.con.execute(f"{clause} {table} ({', '.join(columns)});")
+        columns = self.sim_keys() + ["Agent_id INTEGER", "Year INTEGER", "Month INTEGER", "Day INTEGER"]
+        columns += [f"{name} {dtype}" for name, (dtype, _) in AGENT_DAILY_METRICS.items()]
+        self.con.execute(f"{clause} {AGENT_DAILY_TABLE} ({', '.join(columns)});")
+        return
+
+    def tables_exist(self):
+        names = {r[0] for r in self.con.execute("SELECT table_name FROM duckdb_tables()").fetchall()}
+        return all(table in names for table in self.table_names())
+
+    def aggregate_sql(self, source, table):
+        sim_keys = [self.site_column, "Experiment", "sim_id"]
+        if table == AGENT_DAILY_TABLE:
+            keys = sim_keys + ["Agent_id", "Year", "Month", "Day"]
+            aggs = [f"{expr} AS {name}" for name, (_, expr) in AGENT_DAILY_METRICS.items()]
+        else:
+            dimension = {t: d for d, t in OCCUPANCY_DIMENSIONS.items()}[table]
+            keys = sim_keys + CALENDAR_KEYS + [dimension]
+            aggs = ["COUNT(*) AS n_agents", "COUNT(*) FILTER (WHERE Active) AS n_active"]
+        return f"""
+            SELECT {", ".join(keys)}, {", ".join(aggs)}
+            FROM {source}
+            WHERE Alive
+            GROUP BY {", ".join(keys)}
+        """
+
+    def rebuild(self):
+        """
+        Recompute every aggregate table from the full hourly source table.
+        """
+        self.create_tables(replace=True)
+        for table in self.table_names():
+            self.con.execute(f"INSERT INTO {table} {self.aggregate_sql(self.source_table, table)}")
+        return
+
+    def refresh(self, staging_table, csv_list):
+        """
+        Replace the aggregate rows of the sims behind csv_list with aggregates
+        of staging_table. Meant to run inside the ingest batch transaction.
+        """
+        if not csv_list:
+            return
+        for table in self.table_names():
+            self.con.execute(f"""
+                DELETE FROM {table} t
+                USING ({meta_utilz.path_keys_sql(csv_list)}) k
+                WHERE t.{self.site_column} = k.site
+                  AND t.Experiment = k.experiment
+                  AND t.sim_id = k.sim_id
+            """)
+            self.con.execute(f"INSERT INTO {table} {self.aggregate_sql(staging_table, table)}")
+        return
+
+    def occupancy_sql(self, dimension="Behavior", where=None):
+        """
+        Living agents, summed over sims, and their share in each Behavior
+        (or Microhabitat) category per site, experiment and time step.
+        """
+        table = OCCUPANCY_DIMENSIONS[dimension]
+        keys = [self.site_column, "Experiment"] + CALENDAR_KEYS
+        where_sql = f"WHERE {where}" if where else ""
+        return f"""
+            SELECT {", ".join(keys)}, {dimension},
+                SUM(n_agents) AS n_agents,
+                SUM(n_agents) * 1.0 / SUM(SUM(n_agents)) OVER (PARTITION BY {", ".join(keys)}) AS proportion
+            FROM {table}
+            {where_sql}
+            GROUP BY {", ".join(keys)}, {dimension}
+        """
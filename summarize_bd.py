@@ -1,103 +1,17 @@
 #!/usr/bin/python
-import pathlib as pl
-import meta_utilz
 import duckdb
+from collate_base import CollateBase
+import schemas
 
 
-class CollateBirthDeath:
-    def __init__(self, path_db, con):
-        self.path_db = path_db
-        self.con = con
-        self.table_name = "birthdeath_db"
+class CollateBirthDeath(CollateBase):
+    schema = schemas.BIRTHDEATH
+
+    def __init__(self, path_db, con, **reader_options):
+        super().__init__(path_db, con, **reader_options)
         self.test_path_1 = '/home/micha/Documents/post_thermasim_results/climate_exps/Texas_Current/Results/rep_117600/BirthDeath.csv'
         self.test_path_2 = '/home/micha/Documents/post_thermasim_results/climate_exps/Canada_1/Results/rep_463312/BirthDeath.csv'
 
-    def create_table(self):
-        self.con.execute(f"""
-        CREATE OR REPLACE TABLE {self.table_name} (
-            Time_Step INTEGER,
-            Hour INTEGER, 
-            Day INTEGER, 
-            Month INTEGER, 
-            Year INTEGER, 
-            Site_Name TEXT,
-            Agent_id TEXT,
-            Species TEXT,
-            Age DOUBLE,
-            Sex TEXT,
-            Mass DOUBLE,
-            Birth_Counter DOUBLE,
-            Death_Counter DOUBLE,
-            Alive BOOLEAN,
-            Event_Type TEXT,
-            Cause_Of_Death TEXT,
-            Litter_Size INTEGER,
-            Body_Temperature DOUBLE,
-            ct_min DOUBLE,
-            ct_max DOUBLE,
-            Experiment TEXT,
-            sim_id INTEGER
-        );
-        """)
-        return
-    
-    def insert_csv(self, csv_path, site, experiment,sim_id):
-        self.con.execute(f"""
-                INSERT INTO {self.table_name}
-                SELECT
-                    Time_Step,
-                    Hour, 
-                    Day, 
-                    Month, 
-                    Year, 
-                    Site_Name,
-                    Agent_id,
-                    Species,
-                    Age,
-                    Sex,
-                    Mass,
-                    Birth_Counter,
-                    Death_Counter,
-                    Alive,
-                    Event_Type,
-                    Cause_Of_Death,
-                    Litter_Size,
-                    Body_Temperature,
-                    ct_min,
-                    ct_max,
-                    {experiment} AS Experiment,
-                    {sim_id} AS sim_id
-                FROM read_csv_auto('{csv_path}')
-            """)
-        return
-    
-    def insert_test(self):
-        list_of_csv_paths = [self.test_path_1,
-                             self.test_path_2]
-        for path in list_of_csv_paths:
-            path = pl.Path(path)
-            site = meta_utilz.extract_site(path)
-            experiment = meta_utilz.extract_experiment_name(path)
-            sim_id = meta_utilz.extract_sim_id(path)
-            print(f'file {path}, site {site}, experiment {experiment}, simid {sim_id}')
-            try:
-                self.insert_csv(str(path), site, experiment, sim_id)
-            except Exception as e:
-                print(f"[WARN] Failed to process {path}: {e}")
-            print(f"Inserted {path} into {self.table_name}")
-        return
-
-    def insert_all(self, csv_list):
-        for file in csv_list:
-            try:
-                site = meta_utilz.extract_site(file)
-                experiment = meta_utilz.extract_experiment_name(file)
-                sim_id = meta_utilz.extract_sim_id(file)
-                self.insert_csv(str(file), site, experiment, sim_id)
-            except Exception as e:
-                print(f"[WARN] Failed to process {file}: {e}")
-        return
-
     def query_bd_table(self, query):
         """
         Execute a query on the model table and return the results as a DataFrame.
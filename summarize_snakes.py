@@ -1,104 +1,16 @@
 # -*- coding: utf-8 -*-
 import duckdb
-import pathlib as pl
-import meta_utilz
+from collate_base import CollateBase
+import schemas
 
-class CollateRattlesnake:
-    def __init__(self, path_db, con):
-        self.path_db = path_db
-        self.con = con
-        self.table_name = "rattlesnake_db"
+class CollateRattlesnake(CollateBase):
+    schema = schemas.RATTLESNAKE
+
+    def __init__(self, path_db, con, **reader_options):
+        super().__init__(path_db, con, **reader_options)
         self.test_path_1 = '/home/micha/Documents/post_thermasim_results/climate_exps/Texas_Current/Results/rep_117600/Rattlesnake.csv'
         self.test_path_2 = '/home/micha/Documents/post_thermasim_results/climate_exps/Canada_1/Results/rep_463312/Rattlesnake.csv'
 
-    def create_table(self):
-        self.con.execute(f"""
-        CREATE OR REPLACE TABLE {self.table_name} (
-            Time_Step INTEGER, 
-            Hour INTEGER, 
-            Day INTEGER, 
-            Month INTEGER, 
-            Year INTEGER, 
-            Study_Site TEXT,
-            Agent_id INTEGER, 
-            Active BOOLEAN,
-            Alive BOOLEAN, 
-            Behavior TEXT, 
-            Microhabitat TEXT, 
-            Body_Temperature DOUBLE,
-            T_Env DOUBLE, 
-            Mass DOUBLE,
-            Metabolic_State DOUBLE, 
-            Handling_Time DOUBLE, 
-            Attack_Rate DOUBLE, 
-            Prey_Density DOUBLE,
-            Prey_Encountered DOUBLE, 
-            Prey_Consumed DOUBLE,
-            Experiment TEXT, 
-            sim_id INTEGER
-        );
-        """)
-
-    def insert_csv(self, csv_path, site, experiment, sim_id):
-        self.con.execute(f"""
-            INSERT INTO {self.table_name}
-            SELECT
-                Time_Step,
-                Hour, 
-                Day, 
-                Month, 
-                Year, 
-                Site_Name, 
-                Agent_id, 
-                Active, 
-                Alive,
-                Behavior, 
-                Microhabitat,
-                Body_Temperature, 
-                T_Env, 
-                Mass, 
-                Metabolic_State, 
-                Handling_Time,
-                Attack_Rate,
-                Prey_Density,
-                Prey_Encountered, 
-                Prey_Consumed,
-                {experiment} AS Experiment,
-                {sim_id} AS sim_id
-            FROM read_csv_auto('{csv_path}')
-        """)
-        return
-
-
-    
-    def insert_test(self):
-        list_of_csv_paths = [self.test_path_1,
-                             self.test_path_2]
-        for path in list_of_csv_paths:
-            path = pl.Path(path)
-            site = meta_utilz.extract_site(path)
-            experiment = meta_utilz.extract_experiment_name(path)
-            sim_id = meta_utilz.extract_sim_id(path)
-            print(f'file {path}, site {site}, experiment {experiment}, simid {sim_id}')
-            try:
-                self.insert_csv(str(path), site, experiment, sim_id)
-            except Exception as e:
-                print(f"[WARN] Failed to process {path}: {e}")
-            print(f"Inserted {path} into {self.table_name}")
-        return
-
-
-    def insert_all(self, csv_list):
-        for file in csv_list:
-            try:
-                site = meta_utilz.extract_site(file)
-                experiment = meta_utilz.extract_experiment_name(file)
-                sim_id = meta_utilz.extract_sim_id(file)
-                self.insert_csv(str(file), site, experiment, sim_id)
-            except Exception as e:
-                print(f"[WARN] Failed to process {file}: {e}")
-        return
-
     def query_snake_table(self, query):
         """
         Execute a query on the rattlesnake table and return the results as a DataFrame.
@@ -112,7 +24,7 @@ if __name__ == "__main__":
     snake_db = CollateRattlesnake(path_db=path_db, con=con)
     snake_db.create_table()
     #snake_db.insert_test()
-    snake_db.insert_all()
+    snake_db.insert_all(csv_list=[snake_db.test_path_1, snake_db.test_path_2])
     query = "SELECT * FROM rattlesnake_db LIMIT 10;"
     df = snake_db.query_snake_table(query)
     print(df)
@@ -0,0 +1,177 @@
+#!/usr/bin/python
+import json
+import pathlib as pl
+from concurrent.futures import ThreadPoolExecutor
+import meta_utilz
+
+PASS_TABLE = "summary_pass"
+
+
+def is_aggregate_call(expression):
+    """
+    True if expression is a single function call such as AVG(Mass) or
+    COUNT(DISTINCT Agent_id), to which a FILTER clause can be appended.
+    """
+    expression = expression.strip()
+    name, paren, _ = expression.partition("(")
+    if not paren or not name.strip().isidentifier() or not expression.endswith(")"):
+        return False
+    depth = 0
+    for i, char in enumerate(expression[len(name):]):
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        if depth == 0:
+            return len(name) + i == len(expression) - 1
+    return False
+
+
+class SummaryBatch:
+    '''
+    Runs many summaries with one scan per table. A spec is a list (or
+    {"summaries": [...]} JSON file) of summaries:
+        name     unique name, the key of the result
+        table    table or view to summarize
+        by       group key columns (default: none, one row)
+        metrics  {output column: aggregate call}, e.g. {"mean_mass": "AVG(Mass)"}
+        where    optional row filter
+        derived  optional {output column: expression over the summary's own
+                 columns}, e.g. a window share of a count
+        output   optional .csv or .parquet path; without it the summary is
+                 returned as a pandas DataFrame
+    All summaries of a table are merged into one GROUPING SETS query. Each
+    summary's where becomes a FILTER on its aggregates (and the pass reads
+    the union of the filters), plus a filtered row count that drops the
+    groups with no matching rows. The table passes run concurrently, each
+    on its own cursor, and every summary is then split out of its pass.
+    '''
+    def __init__(self, con, spec):
+        self.con = con
+        self.summaries = self.validate(spec)
+
+    @classmethod
+    def from_json(cls, con, path):
+        spec = json.loads(pl.Path(path).read_text())
+        return cls(con, spec.get("summaries", []) if isinstance(spec, dict) else spec)
+
+    def validate(self, spec):
+        names = set()
+        summaries = []
+        for summary in spec:
+            summary = dict(summary)
+            name = summary.get("name")
+            if not name or name in names:
+                raise ValueError(f"Every summary needs a unique name, got {name!r}")
+            names.add(name)
+            if not summary.get("table") or not summary.get("metrics"):
+                raise ValueError(f"Summary {name} needs a table and metrics")
+            for column, expression in summary["metrics"].items():
+                if not is_aggregate_call(expression):
+                    raise ValueError(f"Summary {name}: metric {column} must be a single aggregate call, "
+                                     f"got {expression!r}; combine aggregates under 'derived'")
+            summary["by"] = list(summary.get("by") or [])
+            summaries.append(summary)
+        return summaries
+
+    def passes(self):
+        """
+        {table: [(index, summary)]} in spec order.
+        """
+        plan = {}
+        for i, summary in enumerate(self.summaries):
+            plan.setdefault(summary["table"], []).append((i, summary))
+        return plan
+
+    def pass_keys(self, summaries):
+        keys = []
+        for _, summary in summaries:
+            keys.extend(k for k in summary["by"] if k not in keys)
+        return keys
+
+    def grouping_id(self, keys, by):
+        return sum(1 << (len(keys) - 1 - j) for j, key in enumerate(keys) if key not in by)
+
+    def pass_sql(self, table, summaries):
+        keys = self.pass_keys(summaries)
+        select = [f"GROUPING_ID({', '.join(keys)}) AS _set" if keys else "0 AS _set"] + keys
+        for i, summary in summaries:
+            where = summary.get("where")
+            for j, expression in enumerate(summary["metrics"].values()):
+                aggregate = f"{expression.strip()} FILTER (WHERE {where})" if where else expression.strip()
+                select.append(f"{aggregate} AS _m{i}_{j}")
+            select.append(f"COUNT(*) FILTER (WHERE {where}) AS _n{i}" if where else f"COUNT(*) AS _n{i}")
+        filters = [summary.get("where") for _, summary in summaries]
+        where_sql = ""
+        if all(filters):
+            where_sql = "WHERE " + " OR ".join(f"({w})" for w in dict.fromkeys(filters))
+        sets = dict.fromkeys("(" + ", ".join(summary["by"]) + ")" for _, summary in summaries)
+        return f"""
+            SELECT {", ".join(select)}
+            FROM {table}
+            {where_sql}
+            GROUP BY GROUPING SETS ({", ".join(sets)})
+        """
+
+    def split_sql(self, keys, i, summary, source=PASS_TABLE):
+        by = summary["by"]
+        columns = by + [f"_m{i}_{j} AS {column}" for j, column in enumerate(summary["metrics"])]
+        where = [f"_set = {self.grouping_id(keys, by)}"]
+        if by:
+            where.append(f"_n{i} > 0")
+        sql = f"""
+            SELECT {", ".join(columns)}
+            FROM {source}
+            WHERE {" AND ".join(where)}
+        """
+        derived = summary.get("derived")
+        if derived:
+            sql = f"SELECT *, {', '.join(f'{e} AS {c}' for c, e in derived.items())} FROM ({sql})"
+        if by:
+            sql = f"SELECT * FROM ({sql}) ORDER BY {', '.join(by)}"
+        return sql
+
+    def output_path(self, summary, output_dir=None):
+        output = summary.get("output")
+        if not output:
+            return None
+        output = pl.Path(output)
+        if output_dir and not output.is_absolute():
+            output = pl.Path(output_dir) / output
+        output.parent.mkdir(parents=True, exist_ok=True)
+        return output
+
+    def run_pass(self, table, summaries, output_dir=None):
+        """
+        Scan table once into a temp pass table on a new cursor and split out
+        its summaries. Returns {name: DataFrame or output path}.
+        """
+        cursor = self.con.cursor()
+        results = {}
+        try:
+            cursor.execute(f"CREATE OR REPLACE TEMP TABLE {PASS_TABLE} AS {self.pass_sql(table, summaries)}")
+            keys = self.pass_keys(summaries)
+            for i, summary in summaries:
+                sql = self.split_sql(keys, i, summary)
+                path = self.output_path(summary, output_dir)
+                if path:
+                    cursor.execute(meta_utilz.copy_sql(sql, path))
+                    results[summary["name"]] = path
+                else:
+                    results[summary["name"]] = cursor.execute(sql).fetchdf()
+            cursor.execute(f"DROP TABLE IF EXISTS {PASS_TABLE}")
+        finally:
+            cursor.close()
+        return results
+
+    def run(self, output_dir=None, jobs=None):
+        """
+        Run every table pass, up to jobs at a time (default: all), and return
+        {name: DataFrame or output path} in spec order.
+        """
+        plan = self.passes()
+        results = {}
+        with ThreadPoolExecutor(max_workers=jobs or max(len(plan), 1)) as pool:
+            futures = [pool.submit(self.run_pass, table, summaries, output_dir)
+                       for table, summaries in plan.items()]
+            for future in futures:
+                results.update(future.result())
+        print(f"[INFO] Ran {len(self.summaries)} summaries in {len(plan)} table passes")
+        return {summary["name"]: results[summary["name"]] for summary in self.summaries}
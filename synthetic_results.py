@@ -0,0 +1,158 @@
+#!/usr/bin/python
+import argparse
+import numpy as np
+import pathlib as pl
+import polars as po
+import schemas
+
+BEHAVIORS = ["Rest", "Thermoregulate", "Forage", "Search", "Brumation"]
+MICROHABITATS = ["Burrow", "Open"]
+CAUSES_OF_DEATH = ["Starved", "Predation", "Old_Age", "Thermal"]
+
+
+def calendar(n_steps, start_year=2020):
+    """
+    Hour, Day, Month and Year of each hourly time step from Jan 1 of start_year.
+    """
+    hours = np.datetime64(f"{start_year}-01-01T00") + np.arange(n_steps).astype("timedelta64[h]")
+    days = hours.astype("datetime64[D]")
+    months = hours.astype("datetime64[M]")
+    return {
+        "Hour": (np.arange(n_steps) % 24).astype(np.int32),
+        "Day": ((days - months).astype(np.int64) + 1).astype(np.int32),
+        "Month": (months.astype(np.int64) % 12 + 1).astype(np.int32),
+        "Year": (hours.astype("datetime64[Y]").astype(np.int64) + 1970).astype(np.int32),
+    }
+
+
+def write_csv(frame, schema, path):
+    frame.select(schema.csv_names).write_csv(path)
+    return
+
+
+def model_frame(rng, site, sim_id, seed, n_steps, cal, n_agents):
+    snakes = np.maximum(n_agents + np.cumsum(rng.integers(-1, 2, n_steps)) // 200, 0)
+    krats = rng.integers(20, 200, n_steps)
+    active = rng.binomial(snakes, 0.4)
+    cols = {
+        "Time_Step": np.arange(n_steps, dtype=np.int32),
+        **cal,
+        "Site_Name": [site] * n_steps,
+        "Rattlesnakes": snakes,
+        "Krats": krats,
+        "Rattlesnakes_Density": snakes / 100.0,
+        "Krats_Density": krats / 100.0,
+        "Rattlesnakes_Active": active,
+        "Krats_Active": rng.binomial(krats, 0.5),
+        "Foraging": rng.binomial(active, 0.3),
+        "Thermoregulating": rng.binomial(active, 0.3),
+        "Resting": snakes - active,
+        "Searching": rng.binomial(active, 0.2),
+        "Brumating": rng.binomial(snakes, 0.1),
+        "Snakes_in_Burrow": snakes - active,
+        "Snakes_in_Open": active,
+        "mean_thermal_quality": rng.random(n_steps),
+        "mean_thermal_accuracy": rng.gamma(2.0, 2.0, n_steps),
+        "mean_metabolic_state": rng.normal(100, 10, n_steps),
+        "count_interactions": rng.poisson(3, n_steps),
+        "count_successful_interactions": rng.poisson(1, n_steps),
+        "seed": np.full(n_steps, seed),
+        "sim_id": np.full(n_steps, sim_id),
+    }
+    return po.DataFrame(cols)
+
+
+def rattlesnake_frame(rng, site, n_steps, cal, n_agents):
+    n = n_steps * n_agents
+    steps = np.repeat(np.arange(n_steps, dtype=np.int32), n_agents)
+    active = rng.random(n) < 0.4
+    cols = {
+        "Time_Step": steps,
+        **{k: np.repeat(v, n_agents) for k, v in cal.items()},
+        "Site_Name": [site] * n,
+        "Agent_id": np.tile(np.arange(n_agents, dtype=np.int32), n_steps),
+        "Active": active,
+        "Alive": np.ones(n, dtype=bool),
+        "Behavior": np.array(BEHAVIORS)[rng.integers(0, len(BEHAVIORS), n)],
+        "Microhabitat": np.array(MICROHABITATS)[active.astype(int)],
+        "Body_Temperature": rng.normal(25, 5, n),
+        "T_Env": rng.normal(22, 8, n),
+        "Mass": rng.normal(400, 50, n),
+        "Metabolic_State": rng.normal(100, 20, n),
+        "Handling_Time": rng.random(n),
+        "Attack_Rate": rng.random(n),
+        "Prey_Density": rng.random(n),
+        "Prey_Encountered": rng.poisson(0.05, n).astype(float),
+        "Prey_Consumed": rng.poisson(0.01, n).astype(float),
+    }
+    return po.DataFrame(cols)
+
+
+def birthdeath_frame(rng, site, n_steps, cal, n_agents):
+    n = max(n_agents // 2, 1)
+    steps = np.sort(rng.integers(0, n_steps, n)).astype(np.int32)
+    death = rng.random(n) < 0.5
+    cols = {
+        "Time_Step": steps,
+        **{k: v[steps] for k, v in cal.items()},
+        "Site_Name": [site] * n,
+        "Agent_id": (np.arange(n) + n_agents).astype(str),
+        "Species": np.where(rng.random(n) < 0.5, "Rattlesnake", "KangarooRat"),
+        "Age": rng.random(n) * 5,
+        "Sex": np.where(rng.random(n) < 0.5, "Female", "Male"),
+        "Mass": rng.normal(300, 80, n),
+        "Birth_Counter": (~death).astype(float),
+        "Death_Counter": death.astype(float),
+        "Alive": ~death,
+        "Event_Type": np.where(death, "Death", "Birth"),
+        "Cause_Of_Death": [c if d else None for c, d in
+                           zip(np.array(CAUSES_OF_DEATH)[rng.integers(0, len(CAUSES_OF_DEATH), n)], death)],
+        "Litter_Size": np.where(death, 0, rng.integers(1, 8, n)),
+        "Body_Temperature": rng.normal(25, 5, n),
+        "ct_min": np.full(n, 5.0),
+        "ct_max": np.full(n, 40.0),
+    }
+    return po.DataFrame(cols)
+
+
+def generate(root, sites=("Texas", "Nebraska", "Canada"), experiments=("Current", "1", "2"),
+             replicates=10, years=1, agents=20, seed=0):
+    """
+    Write a <Site>_<Experiment>/Results/rep_<id>/{Model,Rattlesnake,BirthDeath}.csv
+    tree under root with the declared therma_sim layout. Returns the number
+    of replicate folders written.
+    """
+    root = pl.Path(root)
+    rng = np.random.default_rng(seed)
+    n_steps = int(years * 8760)
+    cal = calendar(n_steps)
+    sim_ids = rng.choice(10_000_000, size=len(sites) * len(experiments) * replicates, replace=False)
+    count = 0
+    for site in sites:
+        for experiment in experiments:
+            for _ in range(replicates):
+                sim_id = int(sim_ids[count])
+                rep_dir = root / f"{site}_{experiment}" / "Results" / f"rep_{sim_id}"
+                rep_dir.mkdir(parents=True, exist_ok=True)
+                write_csv(model_frame(rng, site, sim_id, int(rng.integers(1 << 30)), n_steps, cal, agents),
+                          schemas.MODEL, rep_dir / "Model.csv")
+                write_csv(rattlesnake_frame(rng, site, n_steps, cal, agents),
+                          schemas.RATTLESNAKE, rep_dir / "Rattlesnake.csv")
+                write_csv(birthdeath_frame(rng, site, n_steps, cal, agents),
+                          schemas.BIRTHDEATH, rep_dir / "BirthDeath.csv")
+                count += 1
+    print(f"[INFO] Wrote {count} synthetic replicates under {root}")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic therma_sim results tree.")
+    parser.add_argument("root")
+    parser.add_argument("--sites", nargs="+", default=["Texas", "Nebraska", "Canada"])
+    parser.add_argument("--experiments", nargs="+", default=["Current", "1", "2"])
+    parser.add_argument("--replicates", type=int, default=10)
+    parser.add_argument("--years", type=float, default=1)
+    parser.add_argument("--agents", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate(args.root, args.sites, args.experiments, args.replicates, args.years, args.agents, args.seed)
@@ -0,0 +1,38 @@
+import pathlib as pl
+import sys
+import pytest
+
+sys.path.insert(0, str(pl.Path(__file__).resolve().parents[1]))
+
+import synthetic_results
+from main import SimSummarizer
+
+SITES = ["Texas", "Canada"]
+EXPERIMENTS = ["Current", "1"]
+SAMPLE_FRACTION = 0.5
+
+
+def write_tree(root, replicates=4, years=0.1, agents=4, seed=0):
+    """
+    A small synthetic results tree (see synthetic_results.generate).
+    """
+    synthetic_results.generate(root, SITES, EXPERIMENTS, replicates=replicates, years=years,
+                               agents=agents, seed=seed)
+    return pl.Path(root)
+
+
+@pytest.fixture(scope="session")
+def results_tree(tmp_path_factory):
+    return write_tree(tmp_path_factory.mktemp("results"))
+
+
+@pytest.fixture(scope="session")
+def summarizer(results_tree):
+    """
+    An in-memory database with every table of results_tree loaded, and
+    replicate samples at SAMPLE_FRACTION.
+    """
+    sim = SimSummarizer(results_tree, SITES)
+    sim.initialize_tables(samples=(SAMPLE_FRACTION,))
+    yield sim
+    sim.con.close()
@@ -0,0 +1,88 @@
+import duckdb
+import numpy as np
+import pytest
+from agent_lifecycle import EVENTS_TABLE, SPANS_TABLE, AgentLifecycle
+
+# (site, experiment, agent, first_step, last_alive_step, birth_step, death_step)
+AGENTS = [
+    ("Texas", "0", 1, 0, 4, 0, 5),
+    ("Texas", "0", 2, 0, 4, 0, 5),
+    ("Texas", "0", 3, 2, 10, 2, None),
+    ("Texas", "0", 4, 0, 9, 0, 10),
+    ("Texas", "0", 5, 3, 7, None, None),
+    ("Canada", "0", 1, 0, 2, 0, 3),
+    ("Canada", "0", 2, 0, 5, 0, None),
+    ("Canada", "0", 3, 1, 4, 1, 4),
+]
+
+
+def kaplan_meier(agents):
+    """
+    {age: (at risk, deaths, survival)} from (age, died) pairs.
+    """
+    curve, survival = {}, 1.0
+    for age in sorted({a for a, _ in agents}):
+        at_risk = sum(a >= age for a, _ in agents)
+        deaths = sum(a == age and d for a, d in agents)
+        survival *= 1 - deaths / at_risk
+        curve[age] = (at_risk, deaths, survival)
+    return curve
+
+
+@pytest.fixture
+def lifecycle():
+    con = duckdb.connect(database=":memory:")
+    index = AgentLifecycle(con)
+    index.create_tables()
+    for site, experiment, agent, first, last_alive, birth, death in AGENTS:
+        con.execute(f"INSERT INTO {SPANS_TABLE} VALUES (?, ?, 1, ?, ?, ?, ?, ?)",
+                    [site, experiment, agent, first, last_alive, last_alive, last_alive - first + 1])
+        if birth is not None or death is not None:
+            con.execute(f"INSERT INTO {EVENTS_TABLE} VALUES (?, ?, 1, ?, ?, ?, ?)",
+                        [site, experiment, agent, birth, death, "Starved" if death is not None else None])
+    yield index
+    con.close()
+
+
+def age(agent):
+    """
+    (age at death or censoring, died) of an AGENTS row.
+    """
+    _, _, _, first, last_alive, birth, death = agent
+    start = first if birth is None else birth
+    return (last_alive if death is None else death) - start, death is not None
+
+
+def expected_curves(agents):
+    groups = {}
+    for agent in agents:
+        groups.setdefault(agent[:2], []).append(age(agent))
+    return {key: kaplan_meier(pairs) for key, pairs in groups.items()}
+
+
+def check_curves(con, sql, expected):
+    rows = con.execute(sql).fetchall()
+    assert len(rows) == sum(len(curve) for curve in expected.values())
+    for site, experiment, steps, at_risk, deaths, survival in rows:
+        assert expected[(site, experiment)][steps][:2] == (at_risk, deaths)
+        assert survival == pytest.approx(expected[(site, experiment)][steps][2], abs=1e-12)
+
+
+def test_survival_matches_kaplan_meier(lifecycle):
+    expected = expected_curves(AGENTS)
+    # Everyone at risk in Texas dies by age 10.
+    assert expected[("Texas", "0")][10][2] == 0
+    check_curves(lifecycle.con, lifecycle.survival_sql(), expected)
+
+
+def test_survival_of_a_cohort(lifecycle):
+    cohort = [a for a in AGENTS if a[5] is not None]
+    check_curves(lifecycle.con, lifecycle.survival_sql(where="born_in_sim"), expected_curves(cohort))
+
+
+def test_survival_by_other_columns(lifecycle):
+    rows = lifecycle.con.execute(lifecycle.survival_sql(by=["Experiment"])).fetchall()
+    pooled = kaplan_meier([age(agent) for agent in AGENTS])
+    assert [r[1] for r in rows] == sorted(pooled)
+    assert [r[2:4] for r in rows] == [pooled[a][:2] for a in sorted(pooled)]
+    assert np.allclose([r[4] for r in rows], [pooled[a][2] for a in sorted(pooled)])
@@ -0,0 +1,82 @@
+import gzip
+import shutil
+import duckdb
+import pandas as pd
+import pytest
+from archive_results import ResultsArchiver, fingerprint
+from conftest import SITES
+from main import SimSummarizer
+
+TABLES = ["model_db", "rattlesnake_db", "birthdeath_db"]
+
+
+def sorted_frame(con, table):
+    frame = con.execute(f"SELECT * FROM {table}").fetchdf()
+    for column in frame.columns:
+        if frame[column].dtype == object or isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].astype(str)
+    return frame.sort_values(list(frame.columns)).reset_index(drop=True)
+
+
+def test_fingerprint_sees_a_row_duplicated_over_another():
+    con = duckdb.connect(database=":memory:")
+    con.execute("CREATE TABLE source AS SELECT * FROM (VALUES (1, 'a'), (2, 'b'), (3, 'c'), (3, 'c')) v(x, y)")
+    con.execute("CREATE TABLE written AS SELECT * FROM (VALUES (1, 'a'), (2, 'b'), (4, 'd'), (4, 'd')) v(x, y)")
+    con.execute("CREATE TABLE shuffled AS SELECT * FROM source ORDER BY x DESC")
+    assert fingerprint(con, "source") != fingerprint(con, "written")
+    assert fingerprint(con, "source") == fingerprint(con, "shuffled")
+    assert fingerprint(con, "source")[0] == 4
+    con.close()
+
+
+@pytest.fixture(scope="module")
+def archived_tree(results_tree, tmp_path_factory):
+    """
+    A copy of results_tree archived to parquet, with one Rattlesnake output
+    gzipped beforehand and one Model csv given a bad header.
+    """
+    root = tmp_path_factory.mktemp("archived") / "results"
+    shutil.copytree(results_tree, root)
+    reps = sorted(root.glob("*/Results/rep_*"))
+    snakes = reps[0] / "Rattlesnake.csv"
+    with open(snakes, "rb") as src, gzip.open(snakes.with_suffix(".csv.gz"), "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    snakes.unlink()
+    bad = reps[1] / "Model.csv"
+    bad.write_text(bad.read_text().replace("Krats,", "Kangaroo_Rats,", 1))
+    reports = ResultsArchiver(root, SITES, workers=2).run()
+    return root, reps, reports
+
+
+def test_archive_converts_every_output(archived_tree):
+    root, reps, reports = archived_tree
+    statuses = [r["status"] for r in reports]
+    assert statuses.count("converted") == len(reps) * 3 - 1
+    skipped = [r for r in reports if r["status"] != "converted"]
+    assert [(r["status"], r["path"]) for r in skipped] == [("skipped", str(reps[1] / "Model.csv"))]
+    assert (reps[1] / "Model.csv").exists() and not (reps[1] / "Model.parquet").exists()
+    assert not list(root.glob("*/Results/rep_*/*.csv.gz"))
+    assert len(list(root.glob("*/Results/rep_*/*.csv"))) == 1
+    assert all(r["rows"] > 0 for r in reports if r["status"] == "converted" and "BirthDeath" not in r["path"])
+
+
+def test_archived_tree_ingests_the_same_rows(summarizer, archived_tree):
+    root, reps, _ = archived_tree
+    archived = SimSummarizer(root, SITES)
+    archived.initialize_tables()
+    bad_sim = int(reps[1].name[4:])
+    for table in TABLES:
+        expected = sorted_frame(summarizer.con, f"(SELECT * FROM {table} WHERE sim_id <> {bad_sim})")
+        actual = sorted_frame(archived.con, f"(SELECT * FROM {table} WHERE sim_id <> {bad_sim})")
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False, obj=table)
+    archived.con.close()
+
+
+def test_keep_csv_leaves_the_csvs(tmp_path, results_tree):
+    root = tmp_path / "results"
+    shutil.copytree(results_tree / "Texas_1", root / "Texas_1")
+    n_csv = len(list(root.glob("*/Results/rep_*/*.csv")))
+    reports = ResultsArchiver(root, SITES, workers=1).run(delete=False)
+    assert len(reports) == n_csv and all(r["status"] == "converted" for r in reports)
+    assert len(list(root.glob("*/Results/rep_*/*.csv"))) == n_csv
+    assert len(list(root.glob("*/Results/rep_*/*.parquet"))) == n_csv
@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+from conftest import SITES
+from main import SimSummarizer
+
+KEYS = ["Study_Site", "Experiment", "sim_id", "Time_Step"]
+
+
+@pytest.fixture(scope="module")
+def calendar_summarizer(results_tree):
+    sim = SimSummarizer(results_tree, SITES)
+    sim.initialize_tables(rattlesnake=False, bd=False, calendar=True)
+    yield sim
+    sim.con.close()
+
+
+def fetch_sorted(con, sql):
+    frame = con.execute(sql).fetchdf()
+    frame["Experiment"] = frame["Experiment"].astype(str)
+    return frame.sort_values(KEYS).reset_index(drop=True)
+
+
+def test_calendar_view_returns_the_original_rows(summarizer, calendar_summarizer):
+    assert calendar_summarizer.table_exists("model_facts")
+    expected = fetch_sorted(summarizer.con, "SELECT * FROM model_db")
+    actual = fetch_sorted(calendar_summarizer.con, "SELECT * FROM model_db")
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("start, end", [
+    ("2020-01-10", "2020-01-20"),
+    ("2020-01-05", None),
+    (None, "2020-01-03"),
+    ("2020-01-07", "2020-01-07"),
+    ("2021-01-01", None),
+])
+def test_step_filter_selects_the_dated_rows(calendar_summarizer, start, end):
+    con = calendar_summarizer.con
+    clauses = [f"make_date(Year, Month, Day) >= DATE '{start}'" if start else "true",
+               f"make_date(Year, Month, Day) <= DATE '{end}'" if end else "true"]
+    expected = fetch_sorted(con, f"SELECT * FROM model_db WHERE {' AND '.join(clauses)}")
+    actual = fetch_sorted(con, f"SELECT * FROM model_db WHERE {calendar_summarizer.date_filter(start, end)}")
+    pd.testing.assert_frame_equal(actual, expected)
+    if start and start.startswith("2021"):
+        assert calendar_summarizer.date_filter(start, end) == "false"
+    else:
+        assert len(expected) > 0
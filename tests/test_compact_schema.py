@@ -0,0 +1,53 @@
+from conftest import SITES, write_tree
+from main import SimSummarizer
+
+KEYS = "Study_Site, Experiment, sim_id, Time_Step"
+
+
+def column_types(con, table):
+    return dict(con.execute(
+        "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = ?", [table]).fetchall())
+
+
+def out_of_order(con, table, start, end):
+    """
+    Rows stored from rowid start to end that sort before the row stored before them.
+    """
+    return con.execute(f"""
+        SELECT COUNT(*) FROM (
+            SELECT ({KEYS}) < LAG(({KEYS})) OVER (ORDER BY rowid) AS unsorted
+            FROM {table}
+            WHERE rowid >= {start} AND rowid < {end}
+        )
+        WHERE unsorted
+    """).fetchone()[0]
+
+
+def test_incremental_batches_stay_clustered(tmp_path):
+    root = write_tree(tmp_path / "results", replicates=2, years=0.01)
+    sim = SimSummarizer(root, SITES, db_path=tmp_path / "sim.duckdb")
+    sim.initialize_tables(rattlesnake=False, bd=False, compact=True)
+    con = sim.con
+    types = column_types(con, "model_db")
+    assert types["Study_Site"].startswith("ENUM") and types["Experiment"].startswith("ENUM")
+    assert types["Hour"] == "UTINYINT" and types["Year"] == "USMALLINT"
+    n_rows = con.execute("SELECT COUNT(*) FROM model_db").fetchone()[0]
+    assert out_of_order(con, "model_db", 0, n_rows) == 0
+
+    write_tree(root, replicates=2, years=0.01, seed=1)
+    sim.make_path_db()
+    sim.initialize_tables(rattlesnake=False, bd=False, compact=True, incremental=True, batch_size=4)
+    assert column_types(con, "model_db") == types
+    assert con.execute("SELECT COUNT(DISTINCT sim_id) FROM model_db").fetchone()[0] == 16
+    batch_rows = [r[0] for r in con.execute("""
+        SELECT rows FROM ingest_batch_metrics
+        WHERE run_id = (SELECT MAX(run_id) FROM ingest_batch_metrics)
+        ORDER BY batch_id
+    """).fetchall()]
+    assert len(batch_rows) == 2
+    # Each appended batch is stored in key order.
+    for batch in batch_rows:
+        assert out_of_order(con, "model_db", n_rows, n_rows + batch) == 0
+        n_rows += batch
+    assert con.execute("SELECT COUNT(*) FROM model_db").fetchone()[0] == n_rows
+    sim.con.close()
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from dashboard_data import DashboardData
+from downsample import lttb
+
+
+def test_short_series_is_returned_whole():
+    x, y = lttb([0, 1, 2], [3, 1, 2], 10)
+    assert x.tolist() == [0, 1, 2] and y.tolist() == [3, 1, 2]
+
+
+@pytest.mark.parametrize("n_out", [3, 10, 257])
+def test_lttb_keeps_endpoints_and_input_points(n_out):
+    rng = np.random.default_rng(0)
+    x = np.cumsum(rng.uniform(0.5, 1.5, 5000))
+    y = rng.normal(size=5000)
+    xs, ys = lttb(x, y, n_out)
+    assert len(xs) == n_out
+    assert xs[0] == x[0] and xs[-1] == x[-1]
+    assert (np.diff(xs) > 0).all()
+    index = np.searchsorted(x, xs)
+    assert (x[index] == xs).all() and (y[index] == ys).all()
+
+
+def test_lttb_keeps_peaks():
+    x = np.arange(10000)
+    y = np.zeros(10000)
+    y[[1234, 5678]] = [50, -80]
+    xs, ys = lttb(x, y, 50)
+    assert {1234, 5678} <= set(xs.astype(int).tolist())
+    assert ys.max() == 50 and ys.min() == -80
+
+
+@pytest.fixture
+def dashboard(summarizer):
+    return DashboardData(summarizer.con)
+
+
+def test_full_resolution_series_matches_sql(summarizer, dashboard):
+    lines = dashboard.series("Krats", sites=["Texas"], experiments=["0"], max_points=100000)
+    assert list(lines) == [("Texas", "0")]
+    line = lines[("Texas", "0")]
+    mean, sd, n_sims = [np.array(c) for c in zip(*summarizer.con.execute("""
+        SELECT AVG(Krats), STDDEV_SAMP(Krats), COUNT(*) FROM model_db
+        WHERE Study_Site = 'Texas' AND Experiment = '0'
+        GROUP BY Time_Step ORDER BY Time_Step
+    """).fetchall())]
+    assert np.allclose(line["mean"], mean) and np.allclose(line["sd"], sd)
+    assert (line["n_sims"] == n_sims).all()
+
+
+def test_long_ranges_are_bucketed_and_downsampled(dashboard):
+    lines = dashboard.series("Krats", max_points=50)
+    assert len(lines) == 4
+    for line in lines.values():
+        assert len(line["time"]) == len(line["mean"]) == len(line["sd"]) == 50
+        assert (np.diff(line["time"].astype(np.int64)) > 0).all()
+    assert dashboard.series("Krats", max_points=50) is lines
+
+
+def test_date_range_limits_the_series(dashboard):
+    lines = dashboard.series("Krats", sites=["Canada"], start="2020-01-03", end="2020-01-05")
+    time = lines[("Canada", "0")]["time"]
+    assert time.min() == np.datetime64("2020-01-03T00") and time.max() == np.datetime64("2020-01-05T23")
+    assert len(time) == 72
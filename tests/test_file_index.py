@@ -0,0 +1,58 @@
+import os
+import shutil
+import polars as po
+from conftest import EXPERIMENTS, SITES, write_tree
+from file_index import FileIndex
+
+
+def test_scan_skips_folders_that_are_not_replicates(tmp_path, capsys):
+    root = write_tree(tmp_path / "results", replicates=2, years=0.01)
+    results = root / f"{SITES[0]}_{EXPERIMENTS[0]}" / "Results"
+    source = next(results.glob("rep_*"))
+    for name in ("rep_old", "rep_12_backup", "scratch"):
+        shutil.copytree(source, results / name)
+    files = FileIndex(root, SITES).scan()
+    assert files.height == len(SITES) * len(EXPERIMENTS) * 2 * 3
+    assert not files.filter(po.col("path").str.contains("rep_old|rep_12_backup|scratch")).height
+    expected = {int(p.name[4:]) for p in root.glob("*/Results/rep_*") if p.name[4:].isdigit()}
+    assert set(files["sim_id"].to_list()) == expected
+    out = capsys.readouterr().out
+    assert "rep_old: not a rep_<sim_id> folder" in out
+    assert "rep_12_backup: not a rep_<sim_id> folder" in out
+
+
+def test_cached_scan_sees_files_rewritten_in_place(tmp_path):
+    root = write_tree(tmp_path / "results", replicates=2, years=0.01)
+    cache = tmp_path / "index.parquet"
+    files = FileIndex(root, SITES, cache_path=cache).scan()
+    path = files.filter(po.col("csv_type") == "Model")["path"][0]
+    folder = os.path.dirname(path)
+    folder_mtime = os.stat(folder).st_mtime
+    with open(path, "a") as f:
+        f.write("\n")
+    os.utime(folder, (folder_mtime, folder_mtime))
+    rescanned = FileIndex(root, SITES, cache_path=cache).scan()
+    assert rescanned.height == files.height
+    assert rescanned.filter(po.col("path") == path)["size"][0] == os.path.getsize(path)
+
+
+def test_cached_scan_rescans_folders_with_missing_files(tmp_path):
+    root = write_tree(tmp_path / "results", replicates=2, years=0.01)
+    cache = tmp_path / "index.parquet"
+    files = FileIndex(root, SITES, cache_path=cache).scan()
+    path = files.filter(po.col("csv_type") == "BirthDeath")["path"][0]
+    folder = os.path.dirname(path)
+    folder_mtime = os.stat(folder).st_mtime
+    os.remove(path)
+    os.utime(folder, (folder_mtime, folder_mtime))
+    rescanned = FileIndex(root, SITES, cache_path=cache).scan()
+    assert rescanned.height == files.height - 1
+    assert path not in rescanned["path"].to_list()
+
+
+def test_scan_limited_to_experiments(tmp_path):
+    root = write_tree(tmp_path / "results", replicates=2, years=0.01)
+    files = FileIndex(root, SITES, experiments=[(SITES[1], EXPERIMENTS[1])]).scan()
+    assert files.height == 2 * 3
+    assert set(files["site"].cast(po.Utf8)) == {SITES[1]}
+    assert set(files["experiment"].cast(po.Utf8)) == {EXPERIMENTS[1]}
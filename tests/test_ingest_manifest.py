@@ -0,0 +1,91 @@
+import os
+import pandas as pd
+import polars as po
+import pytest
+from conftest import SITES, write_tree
+from main import SimSummarizer
+from model_rollups import ModelRollups
+
+
+def sorted_model(con):
+    frame = con.execute("SELECT * FROM model_db").fetchdf()
+    for column in frame.columns:
+        if isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].astype(str)
+    return frame.sort_values(["sim_id", "Time_Step"]).reset_index(drop=True)
+
+
+def last_run_files(con):
+    return con.execute("""
+        SELECT COALESCE(SUM(files), 0) FROM ingest_batch_metrics
+        WHERE run_id = (SELECT MAX(run_id) FROM ingest_runs)
+    """).fetchone()[0]
+
+
+def fresh_model(root):
+    sim = SimSummarizer(root, SITES)
+    sim.initialize_tables(rattlesnake=False, bd=False)
+    frame = sorted_model(sim.con)
+    sim.con.close()
+    return frame
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = write_tree(tmp_path / "results", replicates=2, years=0.01)
+    sim = SimSummarizer(root, SITES, db_path=tmp_path / "sim.duckdb")
+    sim.initialize_tables(rattlesnake=False, bd=False)
+    yield root, sim
+    sim.con.close()
+
+
+def test_rerun_skips_unchanged_and_touched_files(tree):
+    root, sim = tree
+    before = sorted_model(sim.con)
+    touched = next(root.glob("*/Results/rep_*/Model.csv"))
+    os.utime(touched, (touched.stat().st_atime, touched.stat().st_mtime + 60))
+    sim.initialize_tables(rattlesnake=False, bd=False, incremental=True)
+    assert last_run_files(sim.con) == 0
+    pd.testing.assert_frame_equal(sorted_model(sim.con), before)
+    # The touched file's new mtime is recorded, so it is not hashed again.
+    mtime = sim.con.execute("SELECT mtime FROM ingest_manifest WHERE path = ?", [str(touched)]).fetchone()[0]
+    assert mtime == touched.stat().st_mtime
+
+
+def test_changed_and_new_files_replace_their_rows(tree):
+    root, sim = tree
+    changed = next(root.glob("*/Results/rep_*/Model.csv"))
+    frame = po.read_csv(changed)
+    frame.with_columns(po.col("Krats") + 1000).write_csv(changed)
+    write_tree(root, replicates=1, years=0.01, seed=1)
+    sim.make_path_db()
+    sim.initialize_tables(rattlesnake=False, bd=False, incremental=True)
+    assert last_run_files(sim.con) == 1 + len(SITES) * 2
+    sim_id = int(frame["sim_id"][0])
+    assert sim.con.execute(f"SELECT MIN(Krats) FROM model_db WHERE sim_id = {sim_id}").fetchone()[0] >= 1000
+    pd.testing.assert_frame_equal(sorted_model(sim.con), fresh_model(root), check_dtype=False)
+
+
+def test_interrupted_run_resumes_from_its_last_batch(tmp_path, monkeypatch):
+    root = write_tree(tmp_path / "results", replicates=2, years=0.01)
+    sim = SimSummarizer(root, SITES, db_path=tmp_path / "sim.duckdb")
+    refresh = ModelRollups.refresh
+    calls = []
+
+    def crash_on_second_batch(self, staging_table, csv_list):
+        calls.append(len(csv_list))
+        if len(calls) == 2:
+            raise RuntimeError("killed")
+        return refresh(self, staging_table, csv_list)
+
+    monkeypatch.setattr(ModelRollups, "refresh", crash_on_second_batch)
+    with pytest.raises(RuntimeError):
+        sim.initialize_tables(rattlesnake=False, bd=False, batch_size=3)
+    monkeypatch.setattr(ModelRollups, "refresh", refresh)
+    # Only the first batch was committed, rows and manifest alike.
+    assert sim.con.execute("SELECT COUNT(DISTINCT sim_id) FROM model_db").fetchone()[0] == 3
+    assert sim.con.execute("SELECT COUNT(*) FROM ingest_manifest WHERE table_name = 'model_db'").fetchone()[0] == 3
+    sim.initialize_tables(rattlesnake=False, bd=False, batch_size=3, incremental=True)
+    assert last_run_files(sim.con) == 5
+    pd.testing.assert_frame_equal(sorted_model(sim.con), fresh_model(root), check_dtype=False)
+    sim.con.close()
@@ -0,0 +1,98 @@
+import gzip
+import shutil
+import polars as po
+import pytest
+from conftest import SITES, write_tree
+from file_index import FileIndex
+from integrity_check import IntegrityCheck
+from main import SimSummarizer
+
+
+def cut_last_row(path):
+    """
+    Drop the second half of the last row, as a writer killed mid-row would.
+    """
+    data = path.read_bytes()
+    start = data.rstrip(b"\n").rfind(b"\n") + 1
+    path.write_bytes(data[:start + (len(data) - start) // 2])
+
+
+def drop_last_rows(path, n):
+    lines = path.read_text().splitlines(keepends=True)
+    path.write_text("".join(lines[:-n]))
+
+
+@pytest.fixture(scope="module")
+def damaged_tree(tmp_path_factory):
+    """
+    A tree with one damaged replicate per reason, keyed by what was done to it.
+    """
+    root = write_tree(tmp_path_factory.mktemp("damaged"), replicates=4, years=0.01)
+    texas = sorted((root / "Texas_Current" / "Results").glob("rep_*"))
+    canada = sorted((root / "Canada_1" / "Results").glob("rep_*"))
+    cut_last_row(texas[0] / "Model.csv")
+    (texas[1] / "Rattlesnake.csv").unlink()
+    drop_last_rows(texas[2] / "Model.csv", 5)
+    model = canada[0] / "Model.csv"
+    model.write_text(model.read_text().replace("Rattlesnakes,", "Snakes,", 1))
+    gz = canada[1] / "Rattlesnake.csv"
+    cut_last_row(gz)
+    with open(gz, "rb") as src, gzip.open(gz.with_suffix(".csv.gz"), "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    gz.unlink()
+    # A complete parquet copy next to a truncated csv: ingest reads the parquet.
+    po.read_csv(canada[2] / "Model.csv").write_parquet(canada[2] / "Model.parquet")
+    cut_last_row(canada[2] / "Model.csv")
+    # A leftover folder that is not a replicate is never indexed.
+    shutil.copytree(texas[0], texas[0].parent / "rep_old")
+    damaged = {
+        "truncated": texas[0], "missing": texas[1], "short": texas[2],
+        "header": canada[0], "compressed": canada[1], "parquet": canada[2],
+    }
+    return root, {reason: int(path.name[4:]) for reason, path in damaged.items()}
+
+
+@pytest.fixture(scope="module")
+def quarantine(damaged_tree):
+    root, _ = damaged_tree
+    return IntegrityCheck(workers=4).run(FileIndex(root, SITES).scan())
+
+
+def reason(quarantine, sim_id):
+    reasons = quarantine.filter(po.col("sim_id") == sim_id)["reason"].unique().to_list()
+    assert len(reasons) == 1, sim_id
+    return reasons[0]
+
+
+def test_quarantine_lists_each_damaged_replicate(damaged_tree, quarantine):
+    _, sim_ids = damaged_tree
+    bad = {k: v for k, v in sim_ids.items() if k != "parquet"}
+    assert set(quarantine["sim_id"].to_list()) == set(bad.values())
+    assert reason(quarantine, bad["truncated"]) == "Model: last row is incomplete"
+    assert reason(quarantine, bad["missing"]) == "missing Rattlesnake"
+    assert reason(quarantine, bad["short"]).startswith("Model: ends at Time_Step")
+    assert reason(quarantine, bad["header"]) == "Model: header does not match the Model schema"
+    assert reason(quarantine, bad["compressed"]) == "Rattlesnake: last row is incomplete"
+
+
+def test_quarantine_covers_every_file_of_a_replicate(damaged_tree, quarantine):
+    _, sim_ids = damaged_tree
+    files = quarantine.filter(po.col("sim_id") == sim_ids["truncated"])
+    assert sorted(files["csv_type"].to_list()) == ["BirthDeath", "Model", "Rattlesnake"]
+
+
+def test_checks_the_encoding_ingest_reads(damaged_tree, quarantine):
+    _, sim_ids = damaged_tree
+    assert sim_ids["parquet"] not in quarantine["sim_id"].to_list()
+    assert not quarantine.filter(po.col("path").str.contains("rep_old")).height
+
+
+def test_validated_ingest_skips_quarantined_replicates(damaged_tree):
+    root, sim_ids = damaged_tree
+    sim = SimSummarizer(root, SITES)
+    sim.initialize_tables(rattlesnake=False, bd=False, validate=True)
+    loaded = {r[0] for r in sim.con.execute("SELECT DISTINCT sim_id FROM model_db").fetchall()}
+    assert len(loaded) == 16 - 5
+    assert sim_ids["parquet"] in loaded
+    assert not loaded & {v for k, v in sim_ids.items() if k != "parquet"}
+    sim.con.close()
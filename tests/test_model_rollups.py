@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from model_rollups import GRAINS, MEAN_METRICS, SUM_METRICS, WEIGHTED_METRICS, WEIGHT, ModelRollups
+
+
+def hourly_sql(grain, where=None):
+    """
+    The cross-sim summary computed straight from the hourly model_db rows.
+    """
+    keys = ["Study_Site", "Experiment"] + GRAINS[grain]
+    cols = [f"AVG({m}) AS {alias}" for m, alias in MEAN_METRICS.items()]
+    cols += [f"SUM({m}) AS {alias}" for m, alias in SUM_METRICS.items()]
+    cols += [f"SUM({m} * {WEIGHT}) / SUM({WEIGHT}) AS {alias}" for m, alias in WEIGHTED_METRICS.items()]
+    cols += ["COUNT(DISTINCT sim_id) AS Num_Sims"]
+    where_sql = f"WHERE {where}" if where else ""
+    return f"""
+        SELECT {", ".join(keys)}, {", ".join(cols)}
+        FROM model_db
+        {where_sql}
+        GROUP BY {", ".join(keys)}
+    """
+
+
+def fetch_sorted(con, sql, keys):
+    frame = con.execute(sql).fetchdf()
+    frame["Experiment"] = frame["Experiment"].astype(str)
+    return frame.sort_values(keys).reset_index(drop=True)
+
+
+def assert_frames_close(actual, expected, keys):
+    assert len(expected) > 0
+    assert list(actual.columns) == list(expected.columns)
+    assert actual[keys].astype(str).equals(expected[keys].astype(str))
+    for column in expected.columns:
+        if column not in keys:
+            assert np.allclose(actual[column].astype(float), expected[column].astype(float), equal_nan=True), column
+
+
+@pytest.mark.parametrize("grain", list(GRAINS))
+@pytest.mark.parametrize("where", [None, "Experiment = '0' AND Study_Site = 'Texas'"])
+def test_rollup_summary_matches_hourly_query(summarizer, grain, where):
+    con = summarizer.con
+    keys = ["Study_Site", "Experiment"] + GRAINS[grain]
+    expected = fetch_sorted(con, hourly_sql(grain, where), keys)
+    actual = fetch_sorted(con, ModelRollups(con).summary_sql(grain, where), keys)
+    assert_frames_close(actual, expected, keys)
+
+
+def test_refreshed_rollups_match_rebuild(summarizer):
+    con = summarizer.con
+    rollups = ModelRollups(con)
+    keys = {grain: ["Study_Site", "Experiment", "sim_id"] + time_keys for grain, time_keys in GRAINS.items()}
+    refreshed = {grain: fetch_sorted(con, f"SELECT * FROM {rollups.table_name(grain)}", keys[grain])
+                 for grain in GRAINS}
+    rollups.rebuild()
+    for grain in GRAINS:
+        rebuilt = fetch_sorted(con, f"SELECT * FROM {rollups.table_name(grain)}", keys[grain])
+        assert_frames_close(rebuilt, refreshed[grain], keys[grain])
@@ -0,0 +1,46 @@
+import shutil
+import pandas as pd
+import pytest
+from conftest import SITES
+from main import SimSummarizer
+
+TABLES = ["model_db", "rattlesnake_db", "birthdeath_db"]
+
+
+def sorted_frame(con, table):
+    frame = con.execute(f"SELECT * FROM {table}").fetchdf()
+    for column in frame.columns:
+        if frame[column].dtype == object or isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].astype(str)
+    return frame.sort_values(list(frame.columns)).reset_index(drop=True)
+
+
+@pytest.fixture(scope="module")
+def damaged_tree(results_tree, tmp_path_factory):
+    """
+    A copy of results_tree with one Model csv that cannot be parsed.
+    """
+    root = tmp_path_factory.mktemp("parallel") / "results"
+    shutil.copytree(results_tree, root)
+    bad = sorted(root.glob("*/Results/rep_*/Model.csv"))[-1]
+    bad.write_text("Time_Step,Hour\nnot,a number\n")
+    return root, bad
+
+
+def load(root, **kwargs):
+    sim = SimSummarizer(root, SITES)
+    sim.initialize_tables(**kwargs)
+    return sim
+
+
+def test_parallel_ingest_matches_serial_ingest(damaged_tree):
+    root, bad = damaged_tree
+    serial = load(root)
+    parallel = load(root, workers=2, batch_size=3)
+    assert [str(f) for f in parallel.failed_files["model"]] == [str(bad)]
+    assert parallel.failed_files == serial.failed_files
+    for table in TABLES:
+        pd.testing.assert_frame_equal(sorted_frame(parallel.con, table), sorted_frame(serial.con, table),
+                                      obj=table)
+    serial.con.close()
+    parallel.con.close()
@@ -0,0 +1,66 @@
+import re
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import SITES
+from main import SimSummarizer
+from model_rollups import GRAINS
+
+
+@pytest.fixture(scope="module")
+def dataset_dir(results_tree, tmp_path_factory):
+    dataset_dir = tmp_path_factory.mktemp("dataset")
+    sim = SimSummarizer(results_tree, SITES, storage="parquet", dataset_dir=dataset_dir)
+    sim.initialize_tables(rattlesnake=False, bd=False)
+    sim.con.close()
+    return dataset_dir
+
+
+@pytest.fixture
+def reopened(results_tree, dataset_dir):
+    sim = SimSummarizer(results_tree, SITES, storage="parquet", dataset_dir=dataset_dir)
+    yield sim
+    sim.con.close()
+
+
+def sorted_summary(sim, grain):
+    frame = sim.summarize_model(grain)
+    frame["Experiment"] = frame["Experiment"].astype(str)
+    return frame.sort_values(["Study_Site", "Experiment"] + GRAINS[grain]).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("grain", list(GRAINS))
+def test_reopened_dataset_answers_model_summaries(summarizer, reopened, grain):
+    expected = sorted_summary(summarizer, grain)
+    actual = sorted_summary(reopened, grain)
+    assert list(actual.columns) == list(expected.columns)
+    assert len(actual) == len(expected) > 0
+    for column in expected.columns:
+        if expected[column].dtype.kind in "fi":
+            assert np.allclose(actual[column].astype(float), expected[column].astype(float)), column
+        else:
+            assert actual[column].astype(str).equals(expected[column].astype(str)), column
+
+
+def test_dataset_is_partitioned_by_site_and_experiment(summarizer, reopened, dataset_dir):
+    partitions = sorted(p.relative_to(dataset_dir / "model_db").as_posix()
+                        for p in (dataset_dir / "model_db").glob("*/*") if p.is_dir())
+    assert partitions == sorted(f"Study_Site={site}/Experiment={experiment}"
+                                for site in SITES for experiment in ["0", "1"])
+    columns = [r[0] for r in summarizer.con.execute("DESCRIBE model_db").fetchall()]
+    select = f"SELECT {', '.join(columns)} FROM model_db ORDER BY sim_id, Time_Step"
+    expected = summarizer.con.execute(select).fetchdf()
+    actual = reopened.con.execute(select).fetchdf()
+    for frame in (expected, actual):
+        for column in ("Study_Site", "Experiment"):
+            frame[column] = frame[column].astype(str)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_partition_filters_read_only_matching_files(reopened):
+    plan = reopened.con.execute(
+        "EXPLAIN ANALYZE SELECT COUNT(*) FROM model_db WHERE Study_Site = 'Texas' AND Experiment = '1'"
+    ).fetchall()[0][1]
+    assert re.search(r"Total Files Read: 1\b", plan)
+    plan = reopened.con.execute("EXPLAIN ANALYZE SELECT COUNT(*) FROM model_db").fetchall()[0][1]
+    assert re.search(rf"Total Files Read: {len(SITES) * 2}\b", plan)
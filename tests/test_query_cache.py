@@ -0,0 +1,76 @@
+import shutil
+import subprocess
+import sys
+import textwrap
+import pathlib as pl
+import pyarrow as pa
+import pytest
+from conftest import SITES, write_tree
+from main import SimSummarizer
+from query_cache import QueryCache, normalize_sql
+
+REPO = pl.Path(__file__).resolve().parents[1]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("SELECT  1 ;", "SELECT 1"),
+    ("SELECT 1 -- note\nFROM t", "SELECT 1 FROM t"),
+    ("SELECT /* a\nb */ x FROM t;;", "SELECT x FROM t"),
+    ("SELECT 'a--b', 'c  /* d */' FROM t", "SELECT 'a--b', 'c  /* d */' FROM t"),
+    ("SELECT 'it''s  -- x' AS \"my  col\" -- don't\nFROM t", "SELECT 'it''s  -- x' AS \"my  col\" FROM t"),
+])
+def test_normalize_sql_keeps_quoted_text(query, expected):
+    assert normalize_sql(query) == expected
+
+
+def test_literals_that_differ_after_dashes_get_their_own_entries(tmp_path):
+    cache = QueryCache(tmp_path)
+    cache.put("SELECT * FROM t WHERE x = 'a--b'", "v", pa.table({"n": [1]}))
+    assert cache.get("SELECT * FROM t WHERE x = 'a--zzz'", "v") is None
+    assert cache.get("SELECT * FROM t  WHERE x = 'a--b' -- again", "v")["n"].to_pylist() == [1]
+
+
+def test_in_memory_databases_do_not_share_results(results_tree, tmp_path):
+    query = "SELECT Study_Site, COUNT(*) AS n FROM model_db GROUP BY ALL ORDER BY ALL"
+    counts = {}
+    for site in SITES:
+        sim = SimSummarizer(results_tree, [site], cache_dir=tmp_path / "cache")
+        sim.initialize_tables(rattlesnake=False, bd=False)
+        counts[site] = sim.query_sim_table(query)["Study_Site"].tolist()
+        sim.con.close()
+    assert counts == {site: [site] for site in SITES}
+
+
+def test_ingest_invalidates_cached_results(tmp_path):
+    root = write_tree(tmp_path / "results", replicates=2, years=0.01)
+    sim = SimSummarizer(root, SITES, db_path=tmp_path / "sim.duckdb", cache_dir=tmp_path / "cache")
+    sim.initialize_tables(rattlesnake=False, bd=False)
+    query = "SELECT COUNT(DISTINCT sim_id) AS n FROM model_db"
+    assert sim.query_sim_table(query)["n"][0] == 8
+    assert sim.query_sim_table(query)["n"][0] == 8
+    assert sim.cache_stats()["hits"] == 1
+    results = root / "Texas_Current" / "Results"
+    shutil.copytree(next(results.glob("rep_*")), results / "rep_1")
+    sim.make_path_db()
+    sim.initialize_tables(rattlesnake=False, bd=False, incremental=True)
+    assert sim.query_sim_table(query)["n"][0] == 9
+    stats = sim.cache_stats()
+    assert stats["entries"] == 1 and stats["evictions"] == 1
+    sim.con.close()
+
+
+def test_processes_share_a_cache_directory(tmp_path):
+    cache = QueryCache(tmp_path)
+    cache.put("SELECT 1", "v", pa.table({"n": [1]}))
+    script = textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {str(REPO)!r})
+        import pyarrow as pa
+        from query_cache import QueryCache
+        cache = QueryCache({str(tmp_path)!r})
+        assert cache.get("SELECT 1", "v")["n"].to_pylist() == [1]
+        cache.put("SELECT 2", "v", pa.table({{"n": [2]}}))
+    """)
+    subprocess.run([sys.executable, "-c", script], check=True)
+    assert cache.get("SELECT 2", "v")["n"].to_pylist() == [2]
+    assert cache.stats()["entries"] == 2
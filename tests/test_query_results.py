@@ -0,0 +1,43 @@
+import pandas as pd
+import polars as po
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+QUERY = "SELECT sim_id, Time_Step, Krats FROM model_db WHERE Study_Site = 'Texas' ORDER BY sim_id, Time_Step"
+
+
+@pytest.fixture(scope="module")
+def expected(summarizer):
+    return summarizer.con.execute(QUERY).fetchdf()
+
+
+@pytest.mark.parametrize("result", ["pandas", "arrow", "batches", "polars", "lazy"])
+def test_result_forms_hold_the_same_rows(summarizer, expected, result):
+    out = summarizer.query_sim_table(QUERY, result=result, batch_size=500)
+    if result == "batches":
+        batches = list(out)
+        assert max(b.num_rows for b in batches) <= 500 and len(batches) > 1
+        out = pa.Table.from_batches(batches)
+    if result == "lazy":
+        assert isinstance(out, po.LazyFrame)
+        out = out.collect()
+    frame = out if result == "pandas" else out.to_pandas()
+    pd.testing.assert_frame_equal(frame, expected, check_dtype=False)
+
+
+def test_unknown_result_form(summarizer):
+    with pytest.raises(ValueError):
+        summarizer.query_sim_table(QUERY, result="excel")
+
+
+@pytest.mark.parametrize("name", ["out.parquet", "out.csv"])
+def test_export_query_writes_the_result(summarizer, expected, tmp_path, name):
+    path = summarizer.export_query(QUERY + ";", tmp_path / "nested" / name)
+    frame = pq.read_table(path).to_pandas() if path.suffix == ".parquet" else pd.read_csv(path)
+    pd.testing.assert_frame_equal(frame, expected, check_dtype=False)
+
+
+def test_export_query_rejects_other_formats(summarizer, tmp_path):
+    with pytest.raises(ValueError):
+        summarizer.export_query(QUERY, tmp_path / "out.xlsx")
@@ -0,0 +1,100 @@
+import json
+import time
+import urllib.error
+import urllib.request
+import duckdb
+import pytest
+from query_server import QueryClient, QueryServer
+
+SLOW_SQL = "SELECT SUM(hash(range)) FROM range(100000000000)"
+
+
+@pytest.fixture(scope="module")
+def db_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("server") / "sim.duckdb"
+    con = duckdb.connect(str(path))
+    con.execute("CREATE TABLE model_db AS SELECT range AS Time_Step FROM range(1000)")
+    con.close()
+    return path
+
+
+@pytest.fixture
+def server(db_path):
+    server = QueryServer(db_path, port=0, pool_size=2, max_heavy=1, timeout=1)
+    server.start()
+    yield server
+    server.shutdown()
+
+
+def post(server, body):
+    data = body if isinstance(body, bytes) else json.dumps(body).encode()
+    request = urllib.request.Request(f"{server.url}/query", data=data)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def wait_for_idle(server, deadline=5):
+    # Cursors go back to the pool just after the response is sent.
+    end = time.monotonic() + deadline
+    while server.health()["idle_cursors"] < server.pool_size and time.monotonic() < end:
+        time.sleep(0.01)
+    return server.health()["idle_cursors"]
+
+
+def test_query_streams_arrow(server):
+    frame = QueryClient(server.url).query_sim_table("SELECT COUNT(*) AS n FROM model_db", batch_size=10)
+    assert frame["n"].tolist() == [1000]
+    table = QueryClient(server.url).query_sim_table("SELECT * FROM model_db", result="arrow", batch_size=100)
+    assert table.num_rows == 1000
+    assert wait_for_idle(server) == 2
+
+
+@pytest.mark.parametrize("body", [
+    b"not json",
+    b"[1, 2]",
+    {"sql": 1},
+    {"query": "SELECT 1"},
+    {"sql": "SELECT 1", "timeout": "soon"},
+    {"sql": "SELECT 1", "timeout": -1},
+    {"sql": "SELECT 1", "timeout": 0},
+    {"sql": "SELECT 1", "batch_size": 0},
+    {"sql": "SELECT 1", "batch_size": [10]},
+    {"sql": "SELECT * FROM missing_table"},
+])
+def test_bad_requests_get_400(server, body):
+    status, reply = post(server, body)
+    assert status == 400 and "error" in reply
+
+
+def test_unknown_path_gets_404(server):
+    request = urllib.request.Request(f"{server.url}/other", data=b"{}")
+    with pytest.raises(urllib.error.HTTPError) as e:
+        urllib.request.urlopen(request)
+    assert e.value.code == 404
+
+
+def test_timeout_is_capped_by_the_server(server):
+    start = time.monotonic()
+    status, reply = post(server, {"sql": SLOW_SQL, "timeout": 600})
+    assert status == 504 and "exceeded" in reply["error"]
+    assert time.monotonic() - start < 30
+    assert wait_for_idle(server) == 2
+
+
+def test_clients_cannot_exempt_heavy_queries(server):
+    # Hold the only heavy slot, as a running heavy query would.
+    server.heavy_slots.acquire()
+    try:
+        status, reply = post(server, {"sql": "SELECT COUNT(*) FROM model_db", "heavy": False, "timeout": 0.2})
+        assert status == 504 and "heavy-query slot" in reply["error"]
+        status, reply = post(server, {"sql": "SELECT 42", "heavy": True, "timeout": 0.2})
+        assert status == 504
+        status, _ = post(server, {"sql": "SELECT 42", "timeout": 0.2})
+        assert status == 200
+    finally:
+        server.heavy_slots.release()
+    status, _ = post(server, {"sql": "SELECT COUNT(*) FROM model_db", "heavy": False})
+    assert status == 200
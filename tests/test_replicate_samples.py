@@ -0,0 +1,65 @@
+import numpy as np
+from conftest import SAMPLE_FRACTION
+from replicate_samples import ReplicateSamples
+
+PER_REPLICATE = """
+    SELECT Study_Site, Experiment, sim_id, AVG(Rattlesnakes) AS avg_snakes, SUM(count_interactions) AS interactions
+    FROM model_db
+    GROUP BY ALL
+"""
+KEYS = ["Study_Site", "Experiment"]
+
+
+def per_replicate(con, table="model_db"):
+    frame = con.execute(PER_REPLICATE.replace("model_db", table)).fetchdf()
+    frame["Experiment"] = frame["Experiment"].astype(str)
+    return frame
+
+
+def test_sample_holds_every_row_of_its_replicates(summarizer):
+    con = summarizer.con
+    sample = ReplicateSamples(con).sample_table("model_db", SAMPLE_FRACTION)
+    members = f"(Study_Site, Experiment, sim_id) IN (SELECT DISTINCT Study_Site, Experiment, sim_id FROM {sample})"
+    assert con.execute(f"""
+        SELECT COUNT(*) FROM (
+            (SELECT * FROM {sample} EXCEPT ALL SELECT * FROM model_db WHERE {members})
+            UNION ALL
+            (SELECT * FROM model_db WHERE {members} EXCEPT ALL SELECT * FROM {sample})
+        )
+    """).fetchone()[0] == 0
+    strata = con.execute(f"SELECT COUNT(DISTINCT sim_id) FROM {sample} GROUP BY Study_Site, Experiment").fetchall()
+    assert len(strata) == 4
+    assert all(n >= ReplicateSamples.min_replicates for n, in strata)
+
+
+def test_estimate_of_every_replicate_is_exact(summarizer):
+    con = summarizer.con
+    samples = ReplicateSamples(con)
+    full = per_replicate(con)
+    estimate = samples.estimate(full, samples.population("model_db"))
+    expected = full.groupby(KEYS)[["avg_snakes", "interactions"]].agg(["mean", "sum", "count"])
+    for row in estimate.itertuples():
+        mean, total, n = expected.loc[(row.Study_Site, row.Experiment), row.metric]
+        assert row.n_reps == row.n_total == n
+        assert np.isclose(row.mean, mean) and np.isclose(row.total, total)
+        assert np.isclose(row.mean_low, row.mean) and np.isclose(row.mean_high, row.mean)
+        assert np.isclose(row.total_low, total) and np.isclose(row.total_high, total)
+
+
+def test_approximate_query_scales_the_sampled_replicates(summarizer):
+    con = summarizer.con
+    samples = ReplicateSamples(con)
+    estimate = summarizer.query_sim_table(PER_REPLICATE, approx=SAMPLE_FRACTION)
+    sampled = per_replicate(con, samples.sample_table("model_db", SAMPLE_FRACTION))
+    population = per_replicate(con).groupby(KEYS)["sim_id"].nunique()
+    expected = sampled.groupby(KEYS)[["avg_snakes", "interactions"]].agg(["mean", "std", "count"])
+    assert len(estimate) == 2 * len(expected)
+    for row in estimate.itertuples():
+        mean, sd, n = expected.loc[(row.Study_Site, row.Experiment), row.metric]
+        n_total = population[(row.Study_Site, row.Experiment)]
+        assert row.n_reps == n and row.n_total == n_total
+        assert np.isclose(row.mean, mean) and np.isclose(row.sd, sd)
+        assert np.isclose(row.total, mean * n_total)
+        half = (row.mean_high - row.mean_low) / 2
+        assert np.isclose(half, 1.959964 * sd / np.sqrt(n) * np.sqrt(1 - n / n_total), rtol=1e-5)
+        assert row.mean_low <= mean <= row.mean_high
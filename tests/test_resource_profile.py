@@ -0,0 +1,74 @@
+import duckdb
+import pytest
+from conftest import SITES
+from ingest_manifest import IngestManifest
+from main import SimSummarizer
+from resource_profile import MIN_WORKER_MEMORY, ResourceProfile, parse_bytes
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("12GB", 12_000_000_000),
+    ("11.1 GiB", int(11.1 * 2 ** 30)),
+    ("512KiB", 512 * 1024),
+    ("1000", 1000),
+])
+def test_parse_bytes(value, expected):
+    assert parse_bytes(value) == expected
+
+
+def test_parse_bytes_rejects_unknown_units():
+    with pytest.raises(ValueError):
+        parse_bytes("3 parsecs")
+
+
+def test_workers_and_batches_share_the_memory_limit(tmp_path):
+    sim = SimSummarizer(tmp_path, SITES, memory_limit="1GiB")
+    profile = sim.resources
+    memory = profile.memory_bytes(sim.con)
+    assert memory == 2 ** 30
+    assert profile.batch_bytes(sim.con) == memory // 4
+    fitting = (memory - memory // 4) // MIN_WORKER_MEMORY
+    assert profile.worker_count(sim.con, 4) == 4
+    assert profile.worker_count(sim.con, 64) == fitting
+    settings = profile.worker_settings(sim.con, 4)
+    assert settings["threads"] == 1
+    worker_memory = parse_bytes(settings["memory_limit"])
+    assert parse_bytes(profile.main_memory(sim.con)) + 4 * worker_memory <= memory
+    sim.con.close()
+
+
+def test_batches_are_capped_by_bytes(tmp_path):
+    sizes = [40, 40, 40, 150, 10, 10]
+    files = []
+    for i, size in enumerate(sizes):
+        path = tmp_path / f"{i}.csv"
+        path.write_bytes(b"x" * size)
+        files.append((path, False))
+    manifest = IngestManifest(duckdb.connect(database=":memory:"))
+    batches = manifest.batches(files, batch_size=10, batch_bytes=100)
+    assert [[sizes[files.index(f)] for f in batch] for batch in batches] == [[40, 40], [40], [150], [10, 10]]
+    assert len(manifest.batches(files, batch_size=4)) == 2
+    manifest.con.close()
+
+
+def test_ingest_commits_memory_sized_batches(results_tree):
+    sim = SimSummarizer(results_tree, SITES, memory_limit="256MB")
+    model_bytes = sorted(f.stat().st_size for f in results_tree.glob("*/Results/rep_*/Model.csv"))
+    budget = int(model_bytes[-1] * 2.5)
+    sim.resources.batch_fraction = budget / sim.resources.memory_bytes(sim.con)
+    sim.initialize_tables(rattlesnake=False, bd=False, batch_size=100)
+    files, sizes = zip(*sim.con.execute("""
+        SELECT files, bytes FROM ingest_batch_metrics WHERE table_name = 'model_db'
+    """).fetchall())
+    assert sum(files) == len(model_bytes) and max(files) == 2
+    assert max(sizes) <= sim.resources.batch_bytes(sim.con)
+    assert sim.con.execute("SELECT COUNT(DISTINCT sim_id) FROM model_db").fetchone()[0] == len(model_bytes)
+    sim.con.close()
+
+
+def test_parallel_ingest_restores_the_memory_limit(results_tree):
+    sim = SimSummarizer(results_tree, SITES, memory_limit="1GiB")
+    before = sim.con.execute("SELECT current_setting('memory_limit')").fetchone()[0]
+    sim.initialize_tables(rattlesnake=False, bd=False, workers=2)
+    assert sim.con.execute("SELECT current_setting('memory_limit')").fetchone()[0] == before
+    sim.con.close()
@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+import schemas
+from conftest import SITES, write_tree
+from main import SimSummarizer
+
+TABLES = {"model_db": schemas.MODEL, "rattlesnake_db": schemas.RATTLESNAKE, "birthdeath_db": schemas.BIRTHDEATH}
+
+
+@pytest.fixture(scope="module")
+def renamed_tree(tmp_path_factory):
+    """
+    A small tree whose first Model csv names a column differently.
+    """
+    root = write_tree(tmp_path_factory.mktemp("schemas") / "results", replicates=1, years=0.01)
+    renamed = sorted(root.glob("*/Results/rep_*/Model.csv"))[0]
+    renamed.write_text(renamed.read_text().replace("Krats,", "Kangaroo_Rats,", 1))
+    return root, renamed
+
+
+def load(root, **kwargs):
+    sim = SimSummarizer(root, SITES)
+    sim.initialize_tables(**kwargs)
+    return sim
+
+
+@pytest.mark.parametrize("table", list(TABLES))
+def test_tables_have_the_declared_types(summarizer, table):
+    types = summarizer.con.execute(
+        "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = ? ORDER BY column_index",
+        [table]).fetchall()
+    declared = [(name, "VARCHAR" if dtype == "TEXT" else dtype) for name, dtype, _ in TABLES[table].table_columns]
+    assert types == declared
+
+
+def test_declared_read_matches_sniffed_read(summarizer, results_tree):
+    sniffed = load(results_tree, bd=False, declared=False)
+    for table, keys in (("model_db", "sim_id, Time_Step"), ("rattlesnake_db", "sim_id, Time_Step, Agent_id")):
+        select = f"SELECT * FROM {table} ORDER BY {keys}"
+        pd.testing.assert_frame_equal(sniffed.con.execute(select).fetchdf(), summarizer.con.execute(select).fetchdf(),
+                                      check_dtype=False, obj=table)
+    sniffed.con.close()
+
+
+def test_strict_rejects_a_renamed_column(renamed_tree):
+    root, renamed = renamed_tree
+    lenient = load(root, rattlesnake=False, bd=False)
+    strict = load(root, rattlesnake=False, bd=False, strict=True)
+    assert lenient.failed_files["model"] == []
+    assert [str(f) for f in strict.failed_files["model"]] == [str(renamed)]
+    assert "header does not match" in strict.mdb.errors[str(renamed)]
+    count = "SELECT COUNT(DISTINCT sim_id) FROM model_db"
+    assert strict.con.execute(count).fetchone()[0] == lenient.con.execute(count).fetchone()[0] - 1
+    lenient.con.close()
+    strict.con.close()
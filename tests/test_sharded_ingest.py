@@ -0,0 +1,109 @@
+import json
+import pandas as pd
+import pytest
+from conftest import SITES
+from main import SimSummarizer
+from sharded_ingest import ShardPlan
+
+LAYOUTS = {"plain": {}, "calendar": {"calendar": True}}
+
+
+def sorted_frame(con, sql):
+    frame = con.execute(sql).fetchdf()
+    for column in frame.columns:
+        if frame[column].dtype == object or isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].astype(str)
+    return frame.sort_values(list(frame.columns)).reset_index(drop=True)
+
+
+@pytest.fixture(scope="module")
+def shard_dir(results_tree, tmp_path_factory):
+    shard_dir = tmp_path_factory.mktemp("shards")
+    plan = ShardPlan.build(results_tree, SITES, shard_dir, 3)
+    for shard in plan.shards:
+        plan.ingest(shard["id"])
+    return shard_dir
+
+
+@pytest.fixture
+def federated(results_tree, shard_dir):
+    sim = SimSummarizer(results_tree, SITES)
+    sim.attach_shards(shard_dir)
+    yield sim
+    sim.con.close()
+
+
+@pytest.fixture(scope="module", params=list(LAYOUTS))
+def layout(request, results_tree, tmp_path_factory):
+    """
+    (single-database ingest, shard directory) of results_tree with the same options.
+    """
+    options = LAYOUTS[request.param]
+    single = SimSummarizer(results_tree, SITES)
+    single.initialize_tables(**options)
+    shard_dir = tmp_path_factory.mktemp(f"shards_{request.param}")
+    plan = ShardPlan.build(results_tree, SITES, shard_dir, 3)
+    for shard in plan.shards:
+        plan.ingest(shard["id"], **options)
+    yield single, shard_dir
+    single.con.close()
+
+
+def test_survival_curves_over_attached_shards(summarizer, federated):
+    pd.testing.assert_frame_equal(
+        sorted_frame(federated.con, "SELECT * FROM agent_lifecycle"),
+        sorted_frame(summarizer.con, "SELECT * FROM agent_lifecycle"))
+    expected = summarizer.survival_curves()
+    actual = federated.survival_curves()
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_federated_views_match_single_database(layout, results_tree):
+    single, shard_dir = layout
+    sim = SimSummarizer(results_tree, SITES)
+    views = sim.attach_shards(shard_dir)
+    expected = {"model_db", "rattlesnake_db", "birthdeath_db", "agent_lifecycle", "agent_spans", "agent_events",
+                "model_rollup_daily", "model_rollup_monthly", "model_rollup_yearly", "shard_data_versions"}
+    if single.table_exists("calendar"):
+        expected |= {"calendar", "model_facts", "rattlesnake_facts", "birthdeath_facts"}
+    assert expected <= set(views)
+    for view in sorted(set(views) - {"shard_data_versions"}):
+        pd.testing.assert_frame_equal(sorted_frame(sim.con, f"SELECT * FROM {view}"),
+                                      sorted_frame(single.con, f"SELECT * FROM {view}"),
+                                      check_dtype=False, obj=view)
+    assert sim.con.execute("SELECT COUNT(*) FROM shard_data_versions").fetchone()[0] > 0
+    sim.con.close()
+
+
+def test_filters_prune_other_shards(layout, results_tree):
+    _, shard_dir = layout
+    plan = ShardPlan.load(shard_dir)
+    sim = SimSummarizer(results_tree, SITES)
+    sim.attach_shards(shard_dir)
+    for site, experiment, value in [("Texas", "Current", "0"), ("Canada", "1", "1")]:
+        plan_text = "".join(r[1] for r in sim.con.execute(
+            f"EXPLAIN SELECT COUNT(*) FROM model_db WHERE Study_Site = '{site}' AND Experiment = '{value}'"
+        ).fetchall())
+        for shard in plan.shards:
+            scanned = f"shard_{shard['id']:03d}.main.model_" in plan_text
+            assert scanned == ([site, experiment] in shard["keys"]), (site, experiment, shard["id"])
+    sim.con.close()
+
+
+def test_views_keep_only_each_shards_planned_folders(layout, results_tree, tmp_path):
+    _, shard_dir = layout
+    plan = json.loads((shard_dir / "shards.json").read_text())
+    shard = max(plan["shards"], key=lambda s: len(s["keys"]))
+    dropped = shard["keys"].pop()
+    (tmp_path / "shards.json").write_text(json.dumps(plan))
+    for s in plan["shards"]:
+        (tmp_path / s["db"]).symlink_to(shard_dir / s["db"])
+    sim = SimSummarizer(results_tree, SITES)
+    sim.attach_shards(tmp_path)
+    value = "0" if dropped[1] == "Current" else dropped[1]
+    for view in ("model_db", "model_rollup_daily", "agent_spans"):
+        assert sim.con.execute(f"SELECT COUNT(*) FROM {view} WHERE Study_Site = ? AND Experiment = ?",
+                               [dropped[0], value]).fetchone()[0] == 0, view
+        assert sim.con.execute(f"SELECT COUNT(*) FROM {view}").fetchone()[0] > 0, view
+    sim.con.close()
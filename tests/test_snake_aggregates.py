@@ -0,0 +1,72 @@
+import pandas as pd
+import polars as po
+import pytest
+from conftest import SITES, write_tree
+from main import SimSummarizer
+from snake_aggregates import OCCUPANCY_DIMENSIONS, RattlesnakeAggregates
+
+TABLES = RattlesnakeAggregates(None).table_names()
+
+
+def sorted_frame(con, sql):
+    frame = con.execute(sql).fetchdf()
+    for column in frame.columns:
+        if frame[column].dtype == object or isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].astype(str)
+    return frame.sort_values(list(frame.columns)).reset_index(drop=True)
+
+
+def expected(con, table):
+    return sorted_frame(con, RattlesnakeAggregates(con).aggregate_sql("rattlesnake_db", table))
+
+
+@pytest.fixture(scope="module")
+def aggregated(results_tree):
+    sim = SimSummarizer(results_tree, SITES)
+    sim.initialize_tables(model=False, bd=False, aggregate_snakes=True, batch_size=5)
+    yield sim
+    sim.con.close()
+
+
+@pytest.mark.parametrize("table", TABLES)
+def test_batched_aggregates_match_the_hourly_rows(summarizer, aggregated, table):
+    actual = sorted_frame(aggregated.con, f"SELECT * FROM {table}")
+    assert len(actual) > 0
+    pd.testing.assert_frame_equal(actual, expected(summarizer.con, table), check_dtype=False, obj=table)
+
+
+def test_hourly_rows_are_not_kept(aggregated):
+    assert not aggregated.table_exists("rattlesnake_db")
+
+
+@pytest.mark.parametrize("dimension", list(OCCUPANCY_DIMENSIONS))
+def test_occupancy_proportions(summarizer, aggregated, dimension):
+    frame = aggregated.summarize_snakes(dimension)
+    totals = frame.groupby(["Study_Site", "Experiment", "Time_Step"], observed=True)["proportion"].sum()
+    assert (totals - 1).abs().max() < 1e-9
+    hourly = summarizer.con.execute("""
+        SELECT COUNT(*) FROM rattlesnake_db WHERE Alive AND Study_Site = 'Texas' AND Time_Step = 0
+    """).fetchone()[0]
+    texas = frame[(frame["Study_Site"] == "Texas") & (frame["Time_Step"] == 0)]
+    assert texas["n_agents"].sum() == hourly
+
+
+def test_changed_file_replaces_its_aggregates(tmp_path):
+    root = write_tree(tmp_path / "results", replicates=1, years=0.01)
+    sim = SimSummarizer(root, SITES, db_path=tmp_path / "sim.duckdb")
+    sim.initialize_tables(model=False, bd=False, aggregate_snakes=True)
+    changed = next(root.glob("*/Results/rep_*/Rattlesnake.csv"))
+    po.read_csv(changed).with_columns(po.lit("Rest").alias("Behavior")).write_csv(changed)
+    sim.initialize_tables(model=False, bd=False, aggregate_snakes=True, incremental=True)
+    reference = SimSummarizer(root, SITES)
+    reference.initialize_tables(model=False, bd=False)
+    for table in TABLES:
+        actual = sorted_frame(sim.con, f"SELECT * FROM {table}")
+        pd.testing.assert_frame_equal(actual, expected(reference.con, table), check_dtype=False, obj=table)
+    sim_id = int(changed.parent.name[4:])
+    behaviors = sim.con.execute(f"""
+        SELECT DISTINCT Behavior FROM rattlesnake_behavior_counts WHERE sim_id = {sim_id}
+    """).fetchall()
+    assert behaviors == [("Rest",)]
+    sim.con.close()
+    reference.con.close()
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+from summary_batch import SummaryBatch, is_aggregate_call
+
+SPEC = [
+    {"name": "snakes_by_site", "table": "rattlesnake_db", "by": ["Study_Site"],
+     "metrics": {"mean_temp": "AVG(Body_Temperature)", "n_agents": "COUNT(DISTINCT Agent_id)"}},
+    {"name": "snakes_by_experiment", "table": "rattlesnake_db", "by": ["Experiment"],
+     "metrics": {"max_mass": "MAX(Mass)"}},
+    {"name": "active_by_site_behavior", "table": "rattlesnake_db", "by": ["Study_Site", "Experiment", "Behavior"],
+     "metrics": {"rows": "COUNT(*)", "mean_mass": "AVG(Mass)"}, "where": "Active"},
+    {"name": "open_microhabitat", "table": "rattlesnake_db", "by": ["Microhabitat"],
+     "metrics": {"rows": "COUNT(*)"}, "where": "Microhabitat = 'Open'"},
+    {"name": "snakes_total", "table": "rattlesnake_db",
+     "metrics": {"rows": "COUNT(*)", "sd_temp": "STDDEV_SAMP(Body_Temperature)"}},
+    {"name": "model_by_site", "table": "model_db", "by": ["Study_Site", "Experiment"],
+     "metrics": {"mean_krats": "AVG(Krats)", "interactions": "SUM(count_interactions)"},
+     "where": "Time_Step >= 100", "derived": {"share": "interactions / SUM(interactions) OVER ()"}},
+]
+
+
+def direct_sql(summary):
+    by = summary["by"]
+    columns = by + [f"{e} AS {c}" for c, e in summary["metrics"].items()]
+    where = f"WHERE {summary['where']}" if summary.get("where") else ""
+    group = f"GROUP BY {', '.join(by)}" if by else ""
+    sql = f"SELECT {', '.join(columns)} FROM {summary['table']} {where} {group}"
+    derived = summary.get("derived")
+    if derived:
+        sql = f"SELECT *, {', '.join(f'{e} AS {c}' for c, e in derived.items())} FROM ({sql})"
+    return sql
+
+
+def normalized(frame, by):
+    frame = frame.copy()
+    for key in by:
+        frame[key] = frame[key].astype(str)
+    return frame.sort_values(by).reset_index(drop=True) if by else frame
+
+
+@pytest.fixture(scope="module")
+def batch_results(summarizer):
+    return SummaryBatch(summarizer.con, SPEC).run()
+
+
+@pytest.mark.parametrize("summary", SPEC, ids=[s["name"] for s in SPEC])
+def test_batch_matches_separate_group_by(summarizer, batch_results, summary):
+    by = list(summary.get("by", []))
+    expected = normalized(summarizer.con.execute(direct_sql(dict(summary, by=by))).fetchdf(), by)
+    actual = normalized(batch_results[summary["name"]], by)
+    assert len(expected) > 0
+    assert list(actual.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(actual[by], expected[by])
+    for column in expected.columns:
+        if column not in by:
+            assert np.allclose(actual[column].astype(float), expected[column].astype(float)), column
+
+
+def test_filtered_groups_without_rows_are_dropped(batch_results):
+    assert batch_results["open_microhabitat"]["Microhabitat"].tolist() == ["Open"]
+
+
+def test_batch_writes_outputs(summarizer, tmp_path):
+    spec = [dict(SPEC[0], output="site.csv"), dict(SPEC[4], output="total.parquet")]
+    results = SummaryBatch(summarizer.con, spec).run(output_dir=tmp_path)
+    assert results == {"snakes_by_site": tmp_path / "site.csv", "snakes_total": tmp_path / "total.parquet"}
+    assert len(pd.read_csv(results["snakes_by_site"])) == 2
+    assert len(pd.read_parquet(results["snakes_total"])) == 1
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("AVG(Mass)", True),
+    ("COUNT(DISTINCT Agent_id)", True),
+    (" SUM(CASE WHEN Active THEN 1 ELSE 0 END) ", True),
+    ("SUM(a) / COUNT(b)", False),
+    ("AVG(Mass) + 1", False),
+    ("Mass", False),
+    ("(AVG(Mass))", False),
+])
+def test_is_aggregate_call(expression, expected):
+    assert is_aggregate_call(expression) == expected
+
+
+def test_spec_rejects_expressions_and_duplicate_names(summarizer):
+    with pytest.raises(ValueError):
+        SummaryBatch(summarizer.con, [dict(SPEC[0], metrics={"ratio": "SUM(Mass) / COUNT(*)"})])
+    with pytest.raises(ValueError):
+        SummaryBatch(summarizer.con, [SPEC[0], SPEC[0]])
@@ -0,0 +1,46 @@
+import polars as po
+import benchmark_summarizer
+import schemas
+import synthetic_results
+from conftest import EXPERIMENTS, SITES
+
+OUTPUTS = {"Model.csv": schemas.MODEL, "Rattlesnake.csv": schemas.RATTLESNAKE, "BirthDeath.csv": schemas.BIRTHDEATH}
+
+
+def test_generated_tree_has_the_declared_layout(tmp_path):
+    count = synthetic_results.generate(tmp_path, SITES, EXPERIMENTS, replicates=2, years=0.01, agents=6)
+    assert count == len(SITES) * len(EXPERIMENTS) * 2
+    reps = sorted(tmp_path.glob("*/Results/rep_*"))
+    assert len(reps) == count
+    assert {r.parents[1].name for r in reps} == {f"{s}_{e}" for s in SITES for e in EXPERIMENTS}
+    n_steps = int(0.01 * 8760)
+    for rep in reps:
+        for name, schema in OUTPUTS.items():
+            frame = po.read_csv(rep / name)
+            assert frame.columns == schema.csv_names, name
+        assert len(po.read_csv(rep / "Model.csv")) == n_steps
+        assert len(po.read_csv(rep / "Rattlesnake.csv")) == n_steps * 6
+        assert po.read_csv(rep / "Model.csv")["sim_id"].unique().to_list() == [int(rep.name[4:])]
+
+
+def test_same_seed_writes_the_same_tree(tmp_path):
+    for name in ("a", "b"):
+        synthetic_results.generate(tmp_path / name, SITES, EXPERIMENTS, replicates=1, years=0.01, seed=3)
+    first = sorted(p.relative_to(tmp_path / "a") for p in (tmp_path / "a").rglob("*.csv"))
+    assert first == sorted(p.relative_to(tmp_path / "b") for p in (tmp_path / "b").rglob("*.csv"))
+    for path in first:
+        assert (tmp_path / "a" / path).read_bytes() == (tmp_path / "b" / path).read_bytes()
+
+
+def test_benchmark_reports_every_table(tmp_path):
+    root = tmp_path / "results"
+    synthetic_results.generate(root, SITES, EXPERIMENTS, replicates=1, years=0.01, agents=2)
+    report = benchmark_summarizer.run(root, SITES, tmp_path, repeats=1)
+    assert report["files"] == len(SITES) * len(EXPERIMENTS) * 3
+    n_reps = len(SITES) * len(EXPERIMENTS)
+    assert report["tables"]["model_db"]["rows"] == n_reps * int(0.01 * 8760)
+    assert report["tables"]["rattlesnake_db"]["rows"] == n_reps * int(0.01 * 8760) * 2
+    assert all(t["files"] == n_reps for t in report["tables"].values())
+    assert set(report["queries_s"]) == {"daily_summary_hourly", "daily_summary_rollup",
+                                        "monthly_summary_rollup", "death_cause_summary"}
+    assert report["db_bytes"] > 0
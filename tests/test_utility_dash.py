@@ -0,0 +1,28 @@
+import pathlib as pl
+import sys
+import numpy as np
+import pytest
+
+pytest.importorskip("dash")
+sys.path.insert(0, str(pl.Path(__file__).resolve().parents[1] / "JupiterNotebooks"))
+import utility_dash as ud
+
+
+@pytest.mark.parametrize("method", ["sparsemax", "softmax"])
+def test_lookup_matches_scalar_probabilities(method):
+    rng = np.random.default_rng(0)
+    n = 2000
+    M = rng.uniform(-100, 400, n)
+    T_b = rng.uniform(0, 45, n)
+    P = ud.lookup_probabilities(M, T_b, 28, 5, 2, method)
+    U = ud.utility_matrix(M, T_b, 28, 5, 2)
+    expected = np.array([ud.sparsemax(u) if method == "sparsemax" else ud.softmax(u) for u in U])
+    # The table is read at the nearest grid point, 1 / (LUT_SIZE - 1) apart.
+    assert np.allclose(P, expected, atol=2.0 / (ud.LUT_SIZE - 1))
+    assert (P[M < 0].argmax(axis=1) == expected[M < 0].argmax(axis=1)).all()
+
+
+def test_starving_snake_forages():
+    P = ud.lookup_probabilities(-10, 30, 28, 5, 2)
+    assert ud.BEHAVIORS[P[0].argmax()] == "Forage"
+    assert np.allclose(P, ud.behavior_probabilities(ud.utility_matrix(-10, 30, 28, 5, 2)))